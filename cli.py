@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Command Line Interface for PDF Term Extractor
+
+This script provides command line access to the PDF extraction pipeline, for
+batch use and for profiling slow documents without starting the web interface.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+from pypdf import PdfReader
+
+from src.async_bedrock_client import DEFAULT_MAX_CONCURRENCY, AsyncBedrockClient
+from src.bedrock_client import MODEL_PRICES
+from src.chunked_extractor import DEFAULT_CHUNK_TOKENS, DEFAULT_PARALLELISM, ChunkedExtractor
+from src.pdf_backends import BACKENDS, benchmark_backends, pick_backend
+from src.pdf_metadata import estimate_job, get_metadata
+from src.pdf_processor import PDFProcessor, select_pages
+from src.retry import retry_metrics
+from src.section_aligner import align_sections
+from src.term_extractor import TermExtractor
+from src.text_normalizer import TextNormalizer
+
+logger = logging.getLogger(__name__)
+
+
+def run_extract(args):
+    """
+    Extract the text of each PDF and optionally print a per-page profile.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments
+
+    Returns:
+        int: Process exit code
+    """
+    processor = PDFProcessor(
+        max_workers=args.workers,
+        backend=args.backend,
+        normalizer=TextNormalizer() if args.normalize else None,
+        ocr_languages=args.ocr,
+        cache_fonts=args.cache_fonts,
+    )
+    exit_code = 0
+    for pdf_path in args.pdfs:
+        try:
+            text, stats = processor.extract_text_with_stats(pdf_path, max_chars=args.max_chars)
+        except Exception as e:
+            logger.error(f"Failed to extract {pdf_path}: {str(e)}")
+            exit_code = 1
+            continue
+
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+            name = os.path.splitext(os.path.basename(pdf_path))[0] + ".txt"
+            with open(os.path.join(args.output_dir, name), "w", encoding="utf-8") as f:
+                f.write(text)
+
+        if args.profile_pages:
+            print(stats.format_report(args.top))
+        else:
+            print(f"{pdf_path}: {len(stats.pages)} pages, {len(text)} characters in {stats.total_seconds:.2f}s")
+    return exit_code
+
+
+def run_benchmark(args):
+    """
+    Benchmark every installed backend on sample pages of each PDF.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments
+
+    Returns:
+        int: Process exit code
+    """
+    for pdf_path in args.pdfs:
+        reader = PdfReader(pdf_path)
+        num_pages = len(reader.pages)
+        sample = select_pages(num_pages, every_nth=max(1, num_pages // args.pages))[:args.pages]
+        results = benchmark_backends(pdf_path, reader, sample)
+        print(f"{pdf_path}: {len(sample)} sample pages, best backend {pick_backend(results)}")
+        print(f"    {'backend':<14} {'seconds':>9} {'chars':>8} {'garbage':>8}  acceptable")
+        for result in results:
+            verdict = "yes" if result["acceptable"] else f"no ({result['error']})" if result["error"] else "no"
+            print(f"    {result['name']:<14} {result['seconds']:>9.3f} {result['chars']:>8} "
+                  f"{result['garbage_ratio']:>8.2%}  {verdict}")
+    return 0
+
+
+def run_inspect(args):
+    """
+    Print the pre-flight metadata of each PDF and the estimate for extracting terms from all of them.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments
+
+    Returns:
+        int: Process exit code
+    """
+    documents = []
+    exit_code = 0
+    for pdf_path in args.pdfs:
+        try:
+            metadata = get_metadata(pdf_path)
+        except Exception as e:
+            logger.error(f"Failed to inspect {pdf_path}: {str(e)}")
+            exit_code = 1
+            continue
+        documents.append(metadata)
+        print(f"{pdf_path}: {metadata.page_count} pages, {metadata.text_coverage:.0%} with a text layer "
+              f"({metadata.scanned_pages} scanned), ~{metadata.estimated_chars} characters, "
+              f"{metadata.han_share:.0%} Han / {metadata.latin_share:.0%} Latin, "
+              f"outline: {'yes' if metadata.has_outline else 'no'}")
+    if documents:
+        estimate = estimate_job(documents, args.model)
+        cost = f"${estimate['cost_usd']:.4f}" if estimate["cost_usd"] is not None else "unknown"
+        print(f"Estimate with {args.model}: {estimate['input_tokens']} input / {estimate['output_tokens']} output "
+              f"tokens in {estimate['chunks']} calls, cost {cost}, ~{estimate['extract_seconds']:.0f}s extraction + "
+              f"~{estimate['model_seconds']:.0f}s model time")
+    return exit_code
+
+
+async def _extract_pair_terms(processor, extractor, zh_path, en_path, custom_prompt, output_dir):
+    """Extract the text of one document pair, its terms, and write them to a CSV file."""
+    loop = asyncio.get_running_loop()
+    # PDF parsing is synchronous; run it on the default thread pool so model calls keep flowing
+    (zh_text, _), (en_text, _), sections = await asyncio.gather(
+        loop.run_in_executor(None, processor.extract_page_text, zh_path),
+        loop.run_in_executor(None, processor.extract_page_text, en_path),
+        loop.run_in_executor(None, align_sections, zh_path, en_path),
+    )
+    if not str(zh_text).strip() or not str(en_text).strip():
+        raise ValueError("No text extracted from one of the documents")
+    terms = await extractor.extract_async(zh_text, en_text, custom_prompt, sections)
+
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in (zh_path, en_path)]
+    csv_path = os.path.join(output_dir, f"{stems[0]}__{stems[1]}.csv")
+    TermExtractor(extractor.bedrock_client).save_to_csv(terms, csv_path)
+    return csv_path, len(terms)
+
+
+async def _run_terms(args, pairs, custom_prompt):
+    processor = PDFProcessor(max_workers=args.workers, normalizer=TextNormalizer(), cache_fonts=args.cache_fonts)
+    async with AsyncBedrockClient(model_id=args.model, max_concurrency=args.concurrency) as client:
+        extractor = ChunkedExtractor(client, chunk_tokens=args.chunk_tokens, parallelism=args.parallelism)
+        return await asyncio.gather(
+            *(_extract_pair_terms(processor, extractor, zh, en, custom_prompt, args.output_dir) for zh, en in pairs),
+            return_exceptions=True
+        )
+
+
+def run_terms(args):
+    """
+    Extract terminology from a batch of Chinese/English document pairs concurrently.
+
+    Every pair's chunk calls share one event loop and one client, which keeps at
+    most --concurrency model requests in flight across the whole batch.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments
+
+    Returns:
+        int: Process exit code
+    """
+    if len(args.pdfs) % 2:
+        logger.error("Expected Chinese/English PDF pairs: an even number of files")
+        return 2
+    pairs = list(zip(args.pdfs[0::2], args.pdfs[1::2]))
+    custom_prompt = None
+    if args.prompt_file:
+        with open(args.prompt_file, "r", encoding="utf-8") as f:
+            custom_prompt = f.read()
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    exit_code = 0
+    for (zh_path, en_path), outcome in zip(pairs, asyncio.run(_run_terms(args, pairs, custom_prompt))):
+        if isinstance(outcome, BaseException):
+            logger.error(f"Failed to extract terms from {zh_path} / {en_path}: {str(outcome)}")
+            exit_code = 1
+        else:
+            print(f"{zh_path} / {en_path}: {outcome[1]} terms -> {outcome[0]}")
+    metrics = retry_metrics.snapshot()
+    if metrics.get("retry"):
+        by_code = ", ".join(f"{code} x{count}" for code, count in sorted(metrics["retries_by_code"].items()))
+        print(f"Model calls: {metrics.get('call', 0)} attempts, {metrics['retry']} retries ({by_code}), "
+              f"{metrics.get('recovered', 0)} recovered")
+    return exit_code
+
+
+def build_parser():
+    """Build the argument parser with one sub-command per pipeline stage."""
+    parser = argparse.ArgumentParser(description="Extract terminology pairs from Chinese-English PDF documents")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log debug messages")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    extract = subparsers.add_parser("extract", help="Extract the text of PDF files")
+    extract.add_argument("pdfs", nargs="+", help="PDF files to extract")
+    extract.add_argument("--workers", type=int, default=1, help="Worker processes per document (default: 1)")
+    extract.add_argument("--backend", choices=["auto"] + list(BACKENDS), default="pypdf",
+                         help="Text extraction backend (default: pypdf)")
+    extract.add_argument("--max-chars", type=int, default=None, help="Stop after this many characters")
+    extract.add_argument("--normalize", action="store_true", help="Strip boilerplate and normalize whitespace")
+    extract.add_argument("--ocr", metavar="LANGUAGES", default=None,
+                         help="OCR scanned pages with these Tesseract languages, e.g. chi_sim+eng")
+    extract.add_argument("--output-dir", default=None, help="Write the extracted text of each PDF here")
+    extract.add_argument("--profile-pages", action="store_true",
+                         help="Report decode time, characters, fonts and text layer per page")
+    extract.add_argument("--top", type=int, default=10, help="Number of slowest pages to report (default: 10)")
+    extract.add_argument("--cache-fonts", action="store_true",
+                         help="Decode each shared font once instead of on every page (patches pypdf internals)")
+    extract.set_defaults(func=run_extract)
+
+    benchmark = subparsers.add_parser("benchmark", help="Compare the installed extraction backends")
+    benchmark.add_argument("pdfs", nargs="+", help="PDF files to benchmark on")
+    benchmark.add_argument("--pages", type=int, default=8, help="Sample pages per document (default: 8)")
+    benchmark.set_defaults(func=run_benchmark)
+
+    inspect = subparsers.add_parser("inspect", help="Show page counts, text coverage and a cost estimate")
+    inspect.add_argument("pdfs", nargs="+", help="PDF files of one job")
+    inspect.add_argument("--model", default=next(iter(MODEL_PRICES)), help="Bedrock model id to estimate for")
+    inspect.set_defaults(func=run_inspect)
+
+    terms = subparsers.add_parser("terms", help="Extract terminology from Chinese/English PDF pairs")
+    terms.add_argument("pdfs", nargs="+", metavar="ZH_PDF EN_PDF", help="Chinese and English PDF of each pair, in turn")
+    terms.add_argument("--model", default=next(iter(MODEL_PRICES)), help="Bedrock model id")
+    terms.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY,
+                       help=f"Model requests in flight across the batch (default: {DEFAULT_MAX_CONCURRENCY})")
+    terms.add_argument("--parallelism", type=int, default=DEFAULT_PARALLELISM,
+                       help=f"Chunk requests in flight per document pair (default: {DEFAULT_PARALLELISM})")
+    terms.add_argument("--chunk-tokens", type=int, default=DEFAULT_CHUNK_TOKENS,
+                       help=f"Estimated text tokens per chunk (default: {DEFAULT_CHUNK_TOKENS})")
+    terms.add_argument("--workers", type=int, default=1, help="Worker processes per document (default: 1)")
+    terms.add_argument("--cache-fonts", action="store_true",
+                       help="Decode each shared font once instead of on every page (patches pypdf internals)")
+    terms.add_argument("--prompt-file", default=None, help="Custom prompt template with {chinese_text}/{english_text}")
+    terms.add_argument("--output-dir", default="glossary_files", help="Directory for the CSV files")
+    terms.set_defaults(func=run_terms)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.WARNING,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt="%H:%M:%S"
+    )
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,13 +8,21 @@ terminology pairs from Chinese-English PDF documents using AWS Bedrock Converse
 import os
 import tempfile
 import logging
+import threading
+import time
+from concurrent.futures import as_completed
 import pandas as pd
 import gradio as gr
 from pathlib import Path
 from dotenv import load_dotenv
 
+from src.pdf_metadata import estimate_job, get_metadata, load_metadata
 from src.pdf_processor import PDFProcessor
-from src.bedrock_client import BedrockClient
+from src.pdf_worker import PDFWorkerService
+from src.section_aligner import align_sections
+from src.text_cache import PageIndex, TextCache
+from src.text_normalizer import TextNormalizer
+from src.bedrock_client import get_bedrock_client
 from src.term_extractor import TermExtractor
 
 # Configure logging with a custom formatter for the web interface
@@ -48,6 +56,15 @@ logger.addHandler(log_handler)
 logging.getLogger("src.pdf_processor").addHandler(log_handler)
 logging.getLogger("src.bedrock_client").addHandler(log_handler)
 logging.getLogger("src.term_extractor").addHandler(log_handler)
+logging.getLogger("src.text_cache").addHandler(log_handler)
+logging.getLogger("src.text_normalizer").addHandler(log_handler)
+logging.getLogger("src.ocr").addHandler(log_handler)
+logging.getLogger("src.pdf_worker").addHandler(log_handler)
+logging.getLogger("src.pdf_metadata").addHandler(log_handler)
+logging.getLogger("src.retry").addHandler(log_handler)
+logging.getLogger("src.chunked_extractor").addHandler(log_handler)
+logging.getLogger("src.section_aligner").addHandler(log_handler)
+logging.getLogger("src.font_cache").addHandler(log_handler)
 
 # Load environment variables
 load_dotenv()
@@ -56,6 +73,55 @@ load_dotenv()
 required_env_vars = ["AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_REGION"]
 missing_vars = [var for var in required_env_vars if not os.environ.get(var)]
 
+# Extracted text cache shared by all requests; repeat uploads skip PDF parsing
+text_cache = TextCache()
+# Page-level index; revised documents only decode the pages that changed
+page_index = PageIndex()
+
+# Scanned pages are OCRed with these Tesseract languages when Tesseract is installed ("" disables OCR)
+OCR_LANGUAGES = os.environ.get("PDF_OCR_LANGUAGES", "chi_sim+eng")
+OCR_WORKERS = int(os.environ.get("PDF_OCR_WORKERS", "2"))
+# OCR results keyed by page image hash, so re-uploads of scanned documents skip recognition
+ocr_cache = PageIndex(os.path.join(text_cache.cache_dir, "ocr_index.sqlite"))
+
+# Limits for decoding a single page; pathological pages are skipped instead of stalling the worker
+PAGE_TIMEOUT = float(os.environ.get("PDF_PAGE_TIMEOUT", "60"))
+WORKER_MEMORY_LIMIT_MB = int(os.environ.get("PDF_WORKER_MEMORY_MB", "2048"))
+
+# Opt-in shared font decoding cache; it patches pypdf internals in the extraction processes
+CACHE_FONTS = os.environ.get("PDF_CACHE_FONTS", "0") == "1"
+
+# Optional cap on the characters extracted from each document (0 = whole document); the
+# terminology step covers everything extracted, in chunks
+MAX_DOCUMENT_CHARS = int(os.environ.get("PDF_MAX_DOCUMENT_CHARS", "0")) or None
+
+# Minimum seconds between results table refreshes while terms stream in
+STREAM_UPDATE_SECONDS = float(os.environ.get("PDF_STREAM_UPDATE_SECONDS", "1"))
+
+# Limits for a whole uploaded document, parsed in a sandboxed worker outside the server process
+DOCUMENT_WORKERS = int(os.environ.get("PDF_DOCUMENT_WORKERS", "2"))
+DOCUMENT_MEMORY_LIMIT_MB = int(os.environ.get("PDF_DOCUMENT_MEMORY_MB", "4096"))
+DOCUMENT_CPU_SECONDS = float(os.environ.get("PDF_DOCUMENT_CPU_SECONDS", "600"))
+DOCUMENT_TIMEOUT = float(os.environ.get("PDF_DOCUMENT_TIMEOUT", "900"))
+
+# Chinese and English documents are extracted side by side, each in its own worker process;
+# a crashing or runaway upload only fails its own request
+document_service = None
+document_service_lock = threading.Lock()
+
+def get_document_service():
+    """Return the worker service used to extract uploaded documents."""
+    global document_service
+    with document_service_lock:
+        if document_service is None:
+            document_service = PDFWorkerService(
+                num_workers=DOCUMENT_WORKERS,
+                memory_limit_mb=DOCUMENT_MEMORY_LIMIT_MB,
+                cpu_limit=DOCUMENT_CPU_SECONDS,
+                timeout=DOCUMENT_TIMEOUT
+            )
+        return document_service
+
 # Available models list
 MODELS = [
     "us.anthropic.claude-3-5-sonnet-20241022-v2:0",  # Default
@@ -105,6 +171,55 @@ def check_environment():
         return False, f"Missing AWS credentials: {', '.join(missing_vars)}. Please set these in your .env file."
     return True, "AWS credentials are properly configured."
 
+def preflight_estimate(chinese_pdf, english_pdf, model_id):
+    """
+    Scan the uploaded PDFs' metadata and estimate the job's cost and duration.
+
+    The scan runs in the sandboxed document workers and is stored next to each
+    upload, so extraction and routing can reuse it.
+
+    Args:
+        chinese_pdf: Uploaded Chinese PDF file (path or tempfile), or None
+        english_pdf: Uploaded English PDF file (path or tempfile), or None
+        model_id (str): AWS Bedrock model ID
+
+    Returns:
+        str: Markdown summary of the uploads and the estimate
+    """
+    uploads = [(label, getattr(f, "name", f)) for label, f in (("中文文档", chinese_pdf), ("英文文档", english_pdf)) if f]
+    if not uploads:
+        return ""
+
+    service = get_document_service()
+    futures = [(label, service.submit(get_metadata, path)) for label, path in uploads]
+    lines = []
+    documents = {}
+    for label, future in futures:
+        try:
+            metadata = future.result()
+        except Exception as e:
+            logger.error(f"Could not scan {label}: {str(e)}")
+            lines.append(f"- **{label}**: 无法读取该 PDF")
+            continue
+        documents[label] = metadata
+        lines.append(
+            f"- **{label}**: {metadata.page_count} 页，文本层覆盖 {metadata.text_coverage:.0%}，"
+            f"约 {metadata.estimated_chars:,} 字符，中文占比 {metadata.han_share:.0%}"
+            + ("，含书签目录" if metadata.has_outline else "")
+            + (f"，{metadata.scanned_pages} 页扫描件需 OCR" if metadata.scanned_pages else "")
+        )
+    if "中文文档" in documents and documents["中文文档"].dominant_script == "latin":
+        lines.append("- ⚠️ 中文文档中英文字母占多数，请确认两个文件没有放反")
+
+    if len(documents) == 2:
+        estimate = estimate_job(list(documents.values()), model_id, max_chars=MAX_DOCUMENT_CHARS)
+        cost = f"约 ${estimate['cost_usd']:.3f}" if estimate["cost_usd"] is not None else "未知（无该模型价格）"
+        lines.append(
+            f"- **预计**: 输入约 {estimate['input_tokens']:,} tokens（{estimate['chunks']} 次调用），费用 {cost}，"
+            f"耗时约 {estimate['extract_seconds'] + estimate['model_seconds']:.0f} 秒"
+        )
+    return "\n".join(lines)
+
 def extract_terms(chinese_pdf, english_pdf, model_id, custom_prompt, progress=gr.Progress()):
     """
     Process PDF files and extract terminology pairs.
@@ -116,23 +231,38 @@ def extract_terms(chinese_pdf, english_pdf, model_id, custom_prompt, progress=gr
         custom_prompt (str): Custom prompt for terminology extraction
         progress (gr.Progress): Gradio progress bar
         
-    Returns:
-        tuple: (DataFrame of results, CSV file path, log messages)
+    Yields:
+        tuple: (DataFrame of results, CSV file path, log messages); the table fills in
+            while the model is still writing, and the CSV path comes with the last update
     """
     log_handler.clear_logs()
     
     if chinese_pdf is None or english_pdf is None:
         logger.error("Both Chinese and English PDF files must be uploaded.")
-        return None, None, log_handler.get_logs()
+        yield None, None, log_handler.get_logs()
+        return
     
     try:
         # Initialize components
         logger.info("Initializing PDF processor")
-        pdf_processor = PDFProcessor()
+        # Both documents are processed at once, so each gets half of the cores for its pages
+        pdf_processor = PDFProcessor(
+            max_workers=max(1, (os.cpu_count() or 1) // 2),
+            cache=text_cache,
+            page_timeout=PAGE_TIMEOUT,
+            memory_limit_mb=WORKER_MEMORY_LIMIT_MB,
+            normalizer=TextNormalizer(),
+            page_index=page_index,
+            ocr_languages=OCR_LANGUAGES or None,
+            ocr_workers=OCR_WORKERS,
+            ocr_cache=ocr_cache,
+            cache_fonts=CACHE_FONTS
+        )
         
-        logger.info(f"Initializing Bedrock client with model: {model_id}")
+        logger.info(f"Using Bedrock client for model: {model_id}")
         progress(0.1, "Initializing components...")
-        bedrock_client = BedrockClient(model_id=model_id)
+        # Shared across requests, so the boto3 client and its connections are reused
+        bedrock_client = get_bedrock_client(model_id)
         
         # Set custom prompt if provided
         if custom_prompt and custom_prompt.strip() != "":
@@ -142,22 +272,54 @@ def extract_terms(chinese_pdf, english_pdf, model_id, custom_prompt, progress=gr
         else:
             term_extractor = TermExtractor(bedrock_client)
             
-        # Process Chinese PDF
+        # Pre-flight metadata stored at upload time, if the scan has finished
+        for language, upload in (("Chinese", chinese_pdf), ("English", english_pdf)):
+            metadata = load_metadata(upload.name)
+            if metadata is not None:
+                logger.info(f"{language} PDF: {metadata.page_count} pages, {metadata.text_coverage:.0%} with text, "
+                            f"~{metadata.estimated_chars} characters, mostly {metadata.dominant_script}")
+
+        # Process both PDFs concurrently
         logger.info(f"Processing Chinese PDF: {os.path.basename(chinese_pdf.name)}")
-        progress(0.2, "Processing Chinese PDF...")
-        chinese_text = pdf_processor.extract_text(chinese_pdf.name)
-        logger.info(f"Extracted {len(chinese_text)} characters from Chinese PDF")
-        
-        # Process English PDF
         logger.info(f"Processing English PDF: {os.path.basename(english_pdf.name)}")
-        progress(0.4, "Processing English PDF...")
-        english_text = pdf_processor.extract_text(english_pdf.name)
-        logger.info(f"Extracted {len(english_text)} characters from English PDF")
+        progress(0.2, "Processing PDF files...")
+        service = get_document_service()
+        futures = {
+            service.submit(pdf_processor.extract_page_text, chinese_pdf.name, max_chars=MAX_DOCUMENT_CHARS): "Chinese",
+            service.submit(pdf_processor.extract_page_text, english_pdf.name, max_chars=MAX_DOCUMENT_CHARS): "English",
+        }
+        # Outline-matched sections are the first split of long documents; the outlines are
+        # read in the sandbox as well
+        sections_future = service.submit(align_sections, chinese_pdf.name, english_pdf.name)
+        texts = {}
+        for future in as_completed(futures):
+            language = futures[future]
+            texts[language], _ = future.result()
+            logger.info(f"Extracted {len(texts[language])} characters from {language} PDF")
+            progress(0.2 + 0.2 * len(texts), f"Processed {language} PDF...")
+        chinese_text = texts["Chinese"]
+        english_text = texts["English"]
+        try:
+            sections = sections_future.result()
+        except Exception as e:
+            logger.warning(f"Section alignment failed; chunking without sections: {str(e)}")
+            sections = []
+        if sections:
+            logger.info(f"Matched {len(sections)} sections between the Chinese and English outlines")
         
         # Extract terminology pairs
         logger.info("Extracting terminology pairs (this may take a while)...")
         progress(0.6, "Extracting terminology pairs...")
-        terminology_pairs = term_extractor.extract_terms(chinese_text, english_text)
+        # Terms are shown as the model writes them instead of after the whole response
+        terminology_pairs = []
+        started = last_update = time.monotonic()
+        for pair in term_extractor.stream_terms(chinese_text, english_text, sections):
+            terminology_pairs.append(pair)
+            if len(terminology_pairs) == 1:
+                logger.info(f"First terminology pair after {time.monotonic() - started:.1f}s")
+            if time.monotonic() - last_update >= STREAM_UPDATE_SECONDS:
+                last_update = time.monotonic()
+                yield pd.DataFrame(terminology_pairs), None, log_handler.get_logs()
         
         # Create results dataframe for display
         logger.info(f"Found {len(terminology_pairs)} terminology pairs")
@@ -179,14 +341,14 @@ def extract_terms(chinese_pdf, english_pdf, model_id, custom_prompt, progress=gr
             logger.info(f"Results saved to file: {csv_filename}")
             
             progress(1.0, "Complete!")
-            return df, csv_filename, log_handler.get_logs()
+            yield df, csv_filename, log_handler.get_logs()
         else:
             logger.warning("No terminology pairs found")
-            return None, None, log_handler.get_logs()
+            yield None, None, log_handler.get_logs()
             
     except Exception as e:
         logger.error(f"Error extracting terminology: {str(e)}")
-        return None, None, log_handler.get_logs()
+        yield None, None, log_handler.get_logs()
 
 def create_app():
     """Create and configure the Gradio app."""
@@ -336,6 +498,9 @@ def create_app():
                     placeholder="自定义用于术语提取的提示词"
                 )
                 
+                # Filled in from the upload-time metadata scan
+                estimate_output = gr.Markdown()
+                
                 extract_button = gr.Button("提取专业术语", variant="primary")
                 
             with gr.Column(scale=1, elem_classes=["result-section"]):
@@ -402,6 +567,14 @@ def create_app():
         chinese_pdf.change(lambda: "", None, log_output)
         english_pdf.change(lambda: "", None, log_output)
         
+        # Show page counts and the estimated cost and time as soon as files are uploaded
+        for component in (chinese_pdf, english_pdf, model_dropdown):
+            component.change(
+                fn=preflight_estimate,
+                inputs=[chinese_pdf, english_pdf, model_dropdown],
+                outputs=[estimate_output]
+            )
+        
     return app
 
 if __name__ == "__main__":
@@ -0,0 +1,335 @@
+"""
+Async Bedrock Client Module
+
+This module handles asyncio-native calls to the AWS Bedrock Converse API, so
+one event loop can keep many model requests in flight without a thread each.
+"""
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from functools import partial
+
+from botocore.exceptions import ClientError
+
+from .bedrock_client import (BOTO_CONFIG, MAX_TEXT_CHARS, TermStreamParser, _truncate, build_prompt,
+                             get_bedrock_client, parse_terminology, resolve_model_id)
+from .retry import default_policy
+
+try:
+    from aiobotocore.config import AioConfig
+    from aiobotocore.session import get_session
+except ImportError:  # aiobotocore is optional; calls then run on a bounded thread pool
+    get_session = None
+
+logger = logging.getLogger(__name__)
+
+# Requests in flight at once per client
+DEFAULT_MAX_CONCURRENCY = int(os.environ.get("BEDROCK_MAX_CONCURRENCY", "32"))
+
+
+class AsyncBedrockClient:
+    """
+    Asyncio client for the AWS Bedrock Converse API.
+
+    Uses aiobotocore when it is installed, so waiting on the model holds no
+    thread; otherwise each call runs the shared synchronous client on a thread
+    pool sized to max_concurrency. Either way at most max_concurrency requests
+    are in flight. Use it as an async context manager, or call close().
+    """
+
+    def __init__(self, model_id="us.anthropic.claude-3-5-sonnet-20241022-v2:0", region_name=None,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """
+        Initialize the async Bedrock client; connections are opened on first use.
+
+        Args:
+            model_id (str): The ID of the Bedrock model to use
+            region_name (str): AWS region name (defaults to AWS_REGION env var or 'us-east-1')
+            max_concurrency (int): Maximum number of requests in flight at once
+        """
+        self.original_model_id = model_id
+        self.region_name = region_name or os.environ.get("AWS_REGION", "us-east-1")
+        self.model_id = resolve_model_id(model_id, self.region_name)
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+        self._client = None
+        self._client_lock = None
+        self._exit_stack = None
+        self._executor = None
+        logger.info(f"Initializing async Bedrock client with model: {model_id} in region: {self.region_name} "
+                    f"({'aiobotocore' if get_session is not None else 'thread pool'})")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _limiter(self):
+        # Created inside the running loop; asyncio primitives bind to a loop on older Pythons
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._client_lock = asyncio.Lock()
+        return self._semaphore
+
+    async def _get_client(self):
+        """Return the aiobotocore client, creating it on first use."""
+        async with self._client_lock:
+            if self._client is None:
+                config = AioConfig(
+                    max_pool_connections=max(self.max_concurrency, BOTO_CONFIG.max_pool_connections),
+                    tcp_keepalive=BOTO_CONFIG.tcp_keepalive,
+                    connect_timeout=BOTO_CONFIG.connect_timeout,
+                    read_timeout=BOTO_CONFIG.read_timeout,
+                    retries=BOTO_CONFIG.retries,
+                )
+                self._exit_stack = AsyncExitStack()
+                try:
+                    self._client = await self._exit_stack.enter_async_context(get_session().create_client(
+                        "bedrock-runtime",
+                        region_name=self.region_name,
+                        config=config
+                    ))
+                except Exception as e:
+                    logger.error(f"Failed to initialize async Bedrock client: {str(e)}")
+                    raise
+            return self._client
+
+    async def converse(self, messages, max_tokens=4096, temperature=0.0, retry_budget=None):
+        """
+        Call the AWS Bedrock Converse API with the provided messages.
+
+        Throttling and other transient errors are retried with backoff; see retry.py.
+        A request waiting to retry does not count against max_concurrency.
+
+        Args:
+            messages (list): List of message objects with 'role' and 'content'
+            max_tokens (int): Maximum number of tokens to generate
+            temperature (float): Sampling temperature (0.0 = deterministic)
+            retry_budget (RetryBudget, optional): Retry budget of the job the call belongs to
+
+        Returns:
+            dict: The model's response, in the same format as BedrockClient.converse()
+        """
+        request = {
+            "modelId": self.model_id,
+            "messages": messages,
+            "inferenceConfig": {
+                "maxTokens": max_tokens,
+                "temperature": temperature
+            }
+        }
+
+        async def attempt():
+            # Only the attempt holds a slot; backoff between attempts happens outside it
+            async with self._limiter():
+                if get_session is None:
+                    # One call of the shared boto3 client on the thread pool; retries are driven here
+                    bedrock = get_bedrock_client(self.original_model_id, self.region_name).bedrock
+                    return await asyncio.get_running_loop().run_in_executor(
+                        self._get_executor(), partial(bedrock.converse, **request)
+                    )
+                client = await self._get_client()
+                return await client.converse(**request)
+
+        logger.info(f"Calling Bedrock Converse API with {len(messages)} messages")
+        try:
+            response = await default_policy.call_async(
+                attempt, retry_budget, f"Converse call to {self.original_model_id}"
+            )
+        except ClientError as e:
+            error_code = e.response.get("Error", {}).get("Code", "Unknown")
+            error_message = e.response.get("Error", {}).get("Message", str(e))
+            logger.error(f"AWS Bedrock API error ({error_code}): {error_message}")
+            raise
+        except Exception as e:
+            logger.error(f"Error calling Bedrock Converse API: {str(e)}")
+            raise
+
+        logger.info("Successfully received response from Bedrock Converse API")
+        return {
+            "content": [
+                {"text": response["output"]["message"]["content"][0]["text"]}
+            ]
+        }
+
+    async def converse_stream(self, messages, max_tokens=4096, temperature=0.0, retry_budget=None):
+        """
+        Call the AWS Bedrock ConverseStream API and yield the response text as it is generated.
+
+        Transient errors are retried with backoff until the first text arrives, as in
+        BedrockClient.converse_stream().
+
+        Args:
+            messages (list): List of message objects with 'role' and 'content'
+            max_tokens (int): Maximum number of tokens to generate
+            temperature (float): Sampling temperature (0.0 = deterministic)
+            retry_budget (RetryBudget, optional): Retry budget of the job the call belongs to
+
+        Yields:
+            str: Text deltas of the response
+        """
+        if get_session is None:
+            async with self._limiter():
+                async for text in self._converse_stream_in_thread(messages, max_tokens, temperature, retry_budget):
+                    yield text
+            return
+
+        logger.info(f"Calling Bedrock ConverseStream API with {len(messages)} messages")
+        try:
+            attempt = 0
+            while True:
+                attempt += 1
+                default_policy.metrics.record("call")
+                started = False
+                try:
+                    async with self._limiter():
+                        client = await self._get_client()
+                        response = await client.converse_stream(
+                            modelId=self.model_id,
+                            messages=messages,
+                            inferenceConfig={
+                                "maxTokens": max_tokens,
+                                "temperature": temperature
+                            }
+                        )
+                        stream = response["stream"]
+                        try:
+                            async for event in stream:
+                                text = event.get("contentBlockDelta", {}).get("delta", {}).get("text")
+                                if text:
+                                    started = True
+                                    yield text
+                                elif "messageStop" in event:
+                                    logger.info(f"Bedrock stream finished: "
+                                                f"{event['messageStop'].get('stopReason', 'unknown')}")
+                        finally:
+                            # Releases the pooled connection when the consumer stops early or the stream fails
+                            stream.close()
+                except Exception as e:
+                    delay = None if started else default_policy.retry_delay(
+                        e, attempt, retry_budget, f"ConverseStream call to {self.original_model_id}"
+                    )
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    continue
+                if attempt > 1:
+                    default_policy.metrics.record("recovered")
+                return
+        except ClientError as e:
+            error_code = e.response.get("Error", {}).get("Code", "Unknown")
+            error_message = e.response.get("Error", {}).get("Message", str(e))
+            logger.error(f"AWS Bedrock API error ({error_code}): {error_message}")
+            raise
+        except Exception as e:
+            logger.error(f"Error calling Bedrock ConverseStream API: {str(e)}")
+            raise
+
+    def _get_executor(self):
+        """Return the thread pool used without aiobotocore, creating it on first use."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="bedrock")
+        return self._executor
+
+    async def _converse_stream_in_thread(self, messages, max_tokens, temperature, retry_budget):
+        """Drive the synchronous client's stream on the thread pool and hand its deltas to the loop."""
+        loop = asyncio.get_running_loop()
+        deltas = asyncio.Queue()
+        done = object()
+        stopped = False
+
+        def pump():
+            client = get_bedrock_client(self.original_model_id, self.region_name)
+            try:
+                for text in client.converse_stream(messages, max_tokens, temperature, retry_budget):
+                    if stopped:
+                        break
+                    loop.call_soon_threadsafe(deltas.put_nowait, text)
+            finally:
+                loop.call_soon_threadsafe(deltas.put_nowait, done)
+
+        future = loop.run_in_executor(self._get_executor(), pump)
+        try:
+            while True:
+                text = await deltas.get()
+                if text is done:
+                    break
+                yield text
+        finally:
+            stopped = True
+        # Re-raises the stream's error, if any
+        await future
+
+    async def stream_professional_terms(self, chinese_text, english_text, custom_prompt=None,
+                                        max_chars=MAX_TEXT_CHARS, retry_budget=None):
+        """
+        Extract professional terminology pairs, yielding each term as soon as the model has written it.
+
+        Args:
+            chinese_text (str or PageText): Text extracted from Chinese PDF
+            english_text (str or PageText): Text extracted from English PDF
+            custom_prompt (str, optional): Custom prompt template to use for extraction
+            max_chars (int, optional): Characters of each text sent to the model
+                (None = send the texts whole)
+            retry_budget (RetryBudget, optional): Retry budget of the job the call belongs to
+
+        Yields:
+            dict: Term pairs, in the order the model writes them
+        """
+        if max_chars is not None and (len(chinese_text) > max_chars or len(english_text) > max_chars):
+            logger.warning(f"Texts too long, truncating to {max_chars} characters")
+            chinese_text = _truncate(chinese_text, max_chars)
+            english_text = _truncate(english_text, max_chars)
+
+        messages = [{"role": "user", "content": [{"text": build_prompt(chinese_text, english_text, custom_prompt)}]}]
+        parser = TermStreamParser()
+        async for text in self.converse_stream(messages, max_tokens=5000, temperature=0.0,
+                                               retry_budget=retry_budget):
+            for term in parser.feed(text):
+                yield term
+        parser.close()
+
+    async def extract_professional_terms(self, chinese_text, english_text, custom_prompt=None,
+                                         max_chars=MAX_TEXT_CHARS, retry_budget=None):
+        """
+        Extract professional terminology pairs in a single call; see BedrockClient.extract_professional_terms().
+
+        Args:
+            chinese_text (str or PageText): Text extracted from Chinese PDF
+            english_text (str or PageText): Text extracted from English PDF
+            custom_prompt (str, optional): Custom prompt template to use for extraction
+            max_chars (int, optional): Characters of each text sent to the model
+                (None = send the texts whole)
+            retry_budget (RetryBudget, optional): Retry budget of the job the call belongs to
+
+        Returns:
+            list: List of dictionaries containing term pairs
+        """
+        if max_chars is not None and (len(chinese_text) > max_chars or len(english_text) > max_chars):
+            logger.warning(f"Texts too long, truncating to {max_chars} characters")
+            chinese_text = _truncate(chinese_text, max_chars)
+            english_text = _truncate(english_text, max_chars)
+
+        messages = [{"role": "user", "content": [{"text": build_prompt(chinese_text, english_text, custom_prompt)}]}]
+        try:
+            response = await self.converse(messages, max_tokens=5000, temperature=0.0, retry_budget=retry_budget)
+            if "content" in response and len(response["content"]) > 0:
+                return parse_terminology(response["content"][0].get("text", ""))
+            logger.error("No content in the response")
+            raise ValueError("No content in Claude's response")
+        except Exception as e:
+            logger.error(f"Error extracting terminology: {str(e)}")
+            raise
+
+    async def close(self):
+        """Close the aiobotocore client and the fallback thread pool."""
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+            self._exit_stack = None
+            self._client = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -6,11 +6,135 @@ This module handles interactions with AWS Bedrock Converse API for Claude models
 import json
 import logging
 import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+from .page_text import PageText
+from .retry import default_policy
+
 logger = logging.getLogger(__name__)
 
+# Maximum characters of each document sent to the model
+# Conservative estimate to leave room for system message and response
+MAX_TEXT_CHARS = 50000
+
+# On-demand prices in USD per million (input, output) tokens, for cost estimates
+MODEL_PRICES = {
+    "us.anthropic.claude-3-5-sonnet-20241022-v2:0": (3.00, 15.00),
+    "us.amazon.nova-lite-v1:0": (0.06, 0.24),
+    "us.amazon.nova-pro-v1:0": (0.80, 3.20),
+}
+
+# Connection settings shared by every bedrock-runtime client in the process. Generations can
+# take minutes, so the read timeout is long; the pool is sized for concurrent chunk calls.
+# botocore's own retries are off: retry.py retries with jitter and a per-job budget, and
+# stacking both would multiply the attempts per call.
+BOTO_CONFIG = Config(
+    max_pool_connections=int(os.environ.get("BEDROCK_MAX_POOL_CONNECTIONS", "50")),
+    tcp_keepalive=True,
+    connect_timeout=10,
+    read_timeout=int(os.environ.get("BEDROCK_READ_TIMEOUT", "300")),
+    retries={"mode": "standard", "max_attempts": 0},
+)
+
+# One boto3 client per region and one BedrockClient per (region, resolved model id)
+_runtime_clients = {}
+_clients = {}
+_clients_lock = threading.Lock()
+
+def resolve_model_id(model_id, region_name):
+    """
+    Map a model ID to the ID or inference profile ARN to call.
+
+    Nova models are called through the account's inference profiles when
+    AWS_ACCOUNT_ID is set; every other model ID is used as is.
+
+    Args:
+        model_id (str): The ID of the Bedrock model to use
+        region_name (str): AWS region name
+
+    Returns:
+        str: Model ID or inference profile ARN
+    """
+    if "nova" not in model_id.lower():
+        return model_id
+
+    # AWS_ACCOUNT_ID should be set as an environment variable
+    account_id = os.environ.get("AWS_ACCOUNT_ID", "")
+    if not account_id:
+        logger.warning("AWS_ACCOUNT_ID not set. Falling back to direct model ID, which may fail for Nova models.")
+        return model_id
+
+    # Format: arn:aws:bedrock:[region]:[account-id]:inference-profile/[profile-name]
+    if "nova-lite" in model_id.lower():
+        resolved = f"arn:aws:bedrock:{region_name}:{account_id}:inference-profile/nova-lite-profile"
+        logger.info(f"Using inference profile ARN for Nova Lite: {resolved}")
+    elif "nova-pro" in model_id.lower():
+        resolved = f"arn:aws:bedrock:{region_name}:{account_id}:inference-profile/nova-pro-profile"
+        logger.info(f"Using inference profile ARN for Nova Pro: {resolved}")
+    else:
+        # Default Nova profile
+        resolved = f"arn:aws:bedrock:{region_name}:{account_id}:inference-profile/nova-profile"
+        logger.info(f"Using default inference profile ARN for Nova: {resolved}")
+    return resolved
+
+def _get_runtime_client(region_name):
+    """Return the process-wide bedrock-runtime client for a region, creating it on first use."""
+    with _clients_lock:
+        client = _runtime_clients.get(region_name)
+        if client is None:
+            try:
+                # boto3 clients are thread-safe once created; the default session is not, hence the lock
+                client = boto3.session.Session().client(
+                    service_name="bedrock-runtime",
+                    region_name=region_name,
+                    config=BOTO_CONFIG
+                )
+            except Exception as e:
+                logger.error(f"Failed to initialize Bedrock client: {str(e)}")
+                raise
+            _runtime_clients[region_name] = client
+            logger.info(f"Created Bedrock runtime client for region: {region_name}")
+        return client
+
+def get_bedrock_client(model_id="us.anthropic.claude-3-5-sonnet-20241022-v2:0", region_name=None):
+    """
+    Return the shared BedrockClient for a model, creating it on first use.
+
+    Clients are keyed by region and resolved model ID and are safe to use from
+    several threads; all models in a region share one connection pool.
+
+    Args:
+        model_id (str): The ID of the Bedrock model to use
+        region_name (str): AWS region name (defaults to AWS_REGION env var or 'us-east-1')
+
+    Returns:
+        BedrockClient: The shared client
+    """
+    region_name = region_name or os.environ.get("AWS_REGION", "us-east-1")
+    key = (region_name, resolve_model_id(model_id, region_name))
+    with _clients_lock:
+        client = _clients.get(key)
+    if client is None:
+        client = BedrockClient(model_id=model_id, region_name=region_name)
+        with _clients_lock:
+            client = _clients.setdefault(key, client)
+    return client
+
+# Fields of a term entry, as spelled in the prompt
+TERM_KEYS = ("name", "ZH_CN", "EN_US")
+
+def _truncate(text, max_chars):
+    """Cut text to max_chars; a PageText is cut as a view, without copying its buffer."""
+    if isinstance(text, PageText):
+        return text.truncate(max_chars)
+    return text[:max_chars]
+
 class BedrockClient:
     """Client for interacting with AWS Bedrock Converse API."""
     
@@ -18,60 +142,30 @@ class BedrockClient:
         """
         Initialize the Bedrock client.
         
+        Prefer get_bedrock_client(), which reuses one instance per model and region.
+        
         Args:
             model_id (str): The ID of the Bedrock model to use
             region_name (str): AWS region name (defaults to AWS_REGION env var or 'us-east-1')
         """
         self.original_model_id = model_id
         self.region_name = region_name or os.environ.get("AWS_REGION", "us-east-1")
-        
-        # Map Nova model IDs to their inference profile ARNs if needed
-        if "nova" in model_id.lower():
-            # Extract your account ID from the environment or configuration
-            # This is a placeholder - you should replace with actual logic to get your AWS account ID
-            # AWS_ACCOUNT_ID should be set as an environment variable
-            account_id = os.environ.get("AWS_ACCOUNT_ID", "")
-            
-            if account_id:
-                if "nova-lite" in model_id.lower():
-                    # Format: arn:aws:bedrock:[region]:[account-id]:inference-profile/[profile-name]
-                    self.model_id = f"arn:aws:bedrock:{self.region_name}:{account_id}:inference-profile/nova-lite-profile"
-                    logger.info(f"Using inference profile ARN for Nova Lite: {self.model_id}")
-                elif "nova-pro" in model_id.lower():
-                    self.model_id = f"arn:aws:bedrock:{self.region_name}:{account_id}:inference-profile/nova-pro-profile"
-                    logger.info(f"Using inference profile ARN for Nova Pro: {self.model_id}")
-                else:
-                    # Default Nova profile
-                    self.model_id = f"arn:aws:bedrock:{self.region_name}:{account_id}:inference-profile/nova-profile"
-                    logger.info(f"Using default inference profile ARN for Nova: {self.model_id}")
-            else:
-                logger.warning("AWS_ACCOUNT_ID not set. Falling back to direct model ID, which may fail for Nova models.")
-                self.model_id = model_id
-        else:
-            # For non-Nova models, use the model ID directly
-            self.model_id = model_id
+        self.model_id = resolve_model_id(model_id, self.region_name)
         
         logger.info(f"Initializing Bedrock client with model: {model_id} in region: {self.region_name}")
-        
-        try:
-            # Initialize Bedrock client
-            self.bedrock = boto3.client(
-                service_name="bedrock-runtime",
-                region_name=self.region_name
-            )
-            logger.info("Bedrock client initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize Bedrock client: {str(e)}")
-            raise
+        self.bedrock = _get_runtime_client(self.region_name)
     
-    def converse(self, messages, max_tokens=4096, temperature=0.0):
+    def converse(self, messages, max_tokens=4096, temperature=0.0, retry_budget=None):
         """
         Call the AWS Bedrock Converse API with the provided messages.
         
+        Throttling and other transient errors are retried with backoff; see retry.py.
+        
         Args:
             messages (list): List of message objects with 'role' and 'content'
             max_tokens (int): Maximum number of tokens to generate
             temperature (float): Sampling temperature (0.0 = deterministic)
+            retry_budget (RetryBudget, optional): Retry budget of the job the call belongs to
             
         Returns:
             dict: The model's response
@@ -87,10 +181,14 @@ class BedrockClient:
             
             # Call the Bedrock converse API for all models
             logger.info(f"Using bedrock.converse API for model: {self.model_id}")
-            response = self.bedrock.converse(
-                modelId=self.model_id,
-                messages=messages,
-                inferenceConfig=inference_config
+            response = default_policy.call(
+                lambda: self.bedrock.converse(
+                    modelId=self.model_id,
+                    messages=messages,
+                    inferenceConfig=inference_config
+                ),
+                retry_budget,
+                f"Converse call to {self.original_model_id}"
             )
             
             # Format response to be consistent
@@ -113,28 +211,183 @@ class BedrockClient:
             logger.error(f"Error calling Bedrock Converse API: {str(e)}")
             raise
 
-    def extract_professional_terms(self, chinese_text, english_text, custom_prompt=None):
+    def converse_stream(self, messages, max_tokens=4096, temperature=0.0, retry_budget=None):
+        """
+        Call the AWS Bedrock ConverseStream API and yield the response text as it is generated.
+        
+        Transient errors are retried with backoff until the first text arrives; after
+        that a retry would repeat text already yielded, so errors are raised.
+        
+        Args:
+            messages (list): List of message objects with 'role' and 'content'
+            max_tokens (int): Maximum number of tokens to generate
+            temperature (float): Sampling temperature (0.0 = deterministic)
+            retry_budget (RetryBudget, optional): Retry budget of the job the call belongs to
+            
+        Yields:
+            str: Text deltas of the response
+        """
+        logger.info(f"Calling Bedrock ConverseStream API with {len(messages)} messages")
+        
+        try:
+            attempt = 0
+            while True:
+                attempt += 1
+                default_policy.metrics.record("call")
+                started = False
+                try:
+                    response = self.bedrock.converse_stream(
+                        modelId=self.model_id,
+                        messages=messages,
+                        inferenceConfig={
+                            "maxTokens": max_tokens,
+                            "temperature": temperature
+                        }
+                    )
+                    stream = response["stream"]
+                    try:
+                        for event in stream:
+                            text = event.get("contentBlockDelta", {}).get("delta", {}).get("text")
+                            if text:
+                                started = True
+                                yield text
+                            elif "messageStop" in event:
+                                logger.info(f"Bedrock stream finished: "
+                                            f"{event['messageStop'].get('stopReason', 'unknown')}")
+                    finally:
+                        # Releases the connection when the caller stops reading early
+                        stream.close()
+                except Exception as e:
+                    delay = None if started else default_policy.retry_delay(
+                        e, attempt, retry_budget, f"ConverseStream call to {self.original_model_id}"
+                    )
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    continue
+                if attempt > 1:
+                    default_policy.metrics.record("recovered")
+                return
+        
+        except ClientError as e:
+            error_code = e.response.get("Error", {}).get("Code", "Unknown")
+            error_message = e.response.get("Error", {}).get("Message", str(e))
+            logger.error(f"AWS Bedrock API error ({error_code}): {error_message}")
+            raise
+        
+        except Exception as e:
+            logger.error(f"Error calling Bedrock ConverseStream API: {str(e)}")
+            raise
+
+    def stream_professional_terms(self, chinese_text, english_text, custom_prompt=None, max_chars=MAX_TEXT_CHARS,
+                                  retry_budget=None):
+        """
+        Extract professional terminology pairs, yielding each term as soon as the model has written it.
+        
+        Args:
+            chinese_text (str or PageText): Text extracted from Chinese PDF
+            english_text (str or PageText): Text extracted from English PDF
+            custom_prompt (str, optional): Custom prompt template to use for extraction
+            max_chars (int, optional): Characters of each text sent to the model
+                (None = send the texts whole)
+            retry_budget (RetryBudget, optional): Retry budget of the job the call belongs to
+            
+        Yields:
+            dict: Term pairs, in the order the model writes them
+        """
+        if max_chars is not None and (len(chinese_text) > max_chars or len(english_text) > max_chars):
+            logger.warning(f"Texts too long, truncating to {max_chars} characters")
+            chinese_text = _truncate(chinese_text, max_chars)
+            english_text = _truncate(english_text, max_chars)
+        
+        messages = [{"role": "user", "content": [{"text": build_prompt(chinese_text, english_text, custom_prompt)}]}]
+        parser = TermStreamParser()
+        # The stream is read to the end even after </terminology>, so its connection can be reused
+        for text in self.converse_stream(messages, max_tokens=5000, temperature=0.0, retry_budget=retry_budget):
+            yield from parser.feed(text)
+        parser.close()
+
+    def extract_professional_terms(self, chinese_text, english_text, custom_prompt=None, max_chars=MAX_TEXT_CHARS,
+                                   retry_budget=None):
         """
-        Extract professional terminology pairs using Claude via Bedrock.
+        Extract professional terminology pairs using Claude via Bedrock, in a single call.
+        
+        Long documents should go through ChunkedExtractor instead, which covers the
+        whole text with several calls rather than truncating it.
         
         Args:
-            chinese_text (str): Text extracted from Chinese PDF
-            english_text (str): Text extracted from English PDF
+            chinese_text (str or PageText): Text extracted from Chinese PDF
+            english_text (str or PageText): Text extracted from English PDF
             custom_prompt (str, optional): Custom prompt template to use for extraction
+            max_chars (int, optional): Characters of each text sent to the model
+                (None = send the texts whole)
+            retry_budget (RetryBudget, optional): Retry budget of the job the call belongs to
             
         Returns:
             list: List of dictionaries containing term pairs
         """
         # Truncate texts if they're too long (Claude has context limitations)
-        max_chars = 50000  # Conservative estimate to leave room for system message and response
-        
-        if len(chinese_text) > max_chars or len(english_text) > max_chars:
+        if max_chars is not None and (len(chinese_text) > max_chars or len(english_text) > max_chars):
             logger.warning(f"Texts too long, truncating to {max_chars} characters")
-            chinese_text = chinese_text[:max_chars]
-            english_text = english_text[:max_chars]
+            chinese_text = _truncate(chinese_text, max_chars)
+            english_text = _truncate(english_text, max_chars)
+        
+        # Prepare conversation messages
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "text": build_prompt(chinese_text, english_text, custom_prompt)
+                    }
+                ]
+            }
+        ]
+        
+        # Call the API
+        try:
+            response = self.converse(messages, max_tokens=5000, temperature=0.0, retry_budget=retry_budget)
+            
+            # Extract the XML content from the response
+            if "content" in response and len(response["content"]) > 0:
+                return parse_terminology(response["content"][0].get("text", ""))
+            else:
+                logger.error("No content in the response")
+                raise ValueError("No content in Claude's response")
+                
+        except Exception as e:
+            logger.error(f"Error extracting terminology: {str(e)}")
+            raise
+
+def build_prompt(chinese_text, english_text, custom_prompt=None):
+    """
+    Build the terminology extraction prompt for a pair of texts.
+    
+    Args:
+        chinese_text (str or PageText): Chinese text
+        english_text (str or PageText): English text
+        custom_prompt (str, optional): Custom prompt template with {chinese_text} and
+            {english_text} placeholders; the texts are appended if it has none
         
-        # Default prompt if no custom prompt is provided
-        default_prompt = f"""As a professional translator and terminologist, please help extract professional terminology pairs from these parallel Chinese and English texts:
+    Returns:
+        str: The prompt
+    """
+    # Use custom prompt if provided, otherwise use default
+    if custom_prompt:
+        logger.info("Using custom prompt for terminology extraction")
+        try:
+            # Try to format the custom prompt with the text placeholders
+            return custom_prompt.format(
+                chinese_text=chinese_text,
+                english_text=english_text
+            )
+        except (KeyError, ValueError):
+            # If formatting fails, append the texts to the custom prompt
+            logger.warning("Custom prompt formatting failed. Appending text data.")
+            return f"{custom_prompt}\n\nCHINESE TEXT:\n{chinese_text}\n\nENGLISH TEXT:\n{english_text}"
+    
+    # Default prompt if no custom prompt is provided
+    return f"""As a professional translator and terminologist, please help extract professional terminology pairs from these parallel Chinese and English texts:
 
 CHINESE TEXT:
 {chinese_text}
@@ -169,88 +422,126 @@ Return format example:
   </term>
 </terminology>"""
 
-        # Use custom prompt if provided, otherwise use default
-        if custom_prompt:
-            logger.info("Using custom prompt for terminology extraction")
-            try:
-                # Try to format the custom prompt with the text placeholders
-                formatted_prompt = custom_prompt.format(
-                    chinese_text=chinese_text,
-                    english_text=english_text
-                )
-            except (KeyError, ValueError):
-                # If formatting fails, append the texts to the custom prompt
-                logger.warning("Custom prompt formatting failed. Appending text data.")
-                formatted_prompt = f"{custom_prompt}\n\nCHINESE TEXT:\n{chinese_text}\n\nENGLISH TEXT:\n{english_text}"
-        else:
-            formatted_prompt = default_prompt
+def _term_from_element(term_elem):
+    """Convert a <term> element to a dictionary with normalized keys."""
+    term_dict = {}
+    for child in term_elem:
+        # Normalize key case if needed
+        key = child.tag
+        for expected_key in TERM_KEYS:
+            if key.lower() == expected_key.lower():
+                key = expected_key
+                break
         
-        # Prepare conversation messages
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "text": formatted_prompt
-                    }
-                ]
-            }
-        ]
+        term_dict[key] = child.text
+    return term_dict
+
+def parse_terminology(content_text):
+    """
+    Parse the <terminology> XML in a model response into term dictionaries.
+    
+    Args:
+        content_text (str): Text of the model response
         
-        # Call the API
+    Returns:
+        list: List of dictionaries containing term pairs
+        
+    Raises:
+        ValueError: If the response holds no parsable terminology XML
+    """
+    # Try to extract XML from within the text (between <terminology> tags)
+    xml_match = re.search(r'<terminology>.*</terminology>', content_text, re.DOTALL)
+    
+    if xml_match:
         try:
-            response = self.converse(messages, max_tokens=5000, temperature=0.0)
+            # Parse XML and convert to list of dictionaries for compatibility
+            terminology_xml = xml_match.group(0)
+            root = ET.fromstring(terminology_xml)
             
-            # Extract the XML content from the response
-            if "content" in response and len(response["content"]) > 0:
-                content_text = response["content"][0].get("text", "")
-                
-                # Try to extract XML from the response
-                import re
-                import xml.etree.ElementTree as ET
-                from io import StringIO
-                
-                # Try to extract XML from within the text (between <terminology> tags)
-                xml_match = re.search(r'<terminology>.*</terminology>', content_text, re.DOTALL)
-                
-                if xml_match:
-                    try:
-                        # Parse XML and convert to list of dictionaries for compatibility
-                        terminology_xml = xml_match.group(0)
-                        root = ET.fromstring(terminology_xml)
-                        
-                        # Convert XML to list of dictionaries with normalized keys
-                        terminology_list = []
-                        expected_keys = {"name", "ZH_CN", "EN_US"}
-                        
-                        for term_elem in root.findall('term'):
-                            term_dict = {}
-                            for child in term_elem:
-                                # Normalize key case if needed
-                                key = child.tag
-                                for expected_key in expected_keys:
-                                    if key.lower() == expected_key.lower():
-                                        key = expected_key
-                                        break
-                                
-                                term_dict[key] = child.text
-                            terminology_list.append(term_dict)
-                        
-                        return terminology_list
-                    except ET.ParseError as e:
-                        logger.error(f"Error parsing XML: {str(e)}")
-                        logger.debug(f"XML content: {terminology_xml}")
-                        raise ValueError(f"Failed to parse XML: {str(e)}")
-                
-                logger.error("Couldn't extract valid XML from the response")
-                logger.debug(f"Raw response content: {content_text}")
-                raise ValueError("Failed to extract valid XML from Claude's response")
-            else:
-                logger.error("No content in the response")
-                raise ValueError("No content in Claude's response")
-                
-        except Exception as e:
-            logger.error(f"Error extracting terminology: {str(e)}")
-            raise
-
+            # Convert XML to list of dictionaries with normalized keys
+            return [_term_from_element(term_elem) for term_elem in root.findall('term')]
+        except ET.ParseError as e:
+            logger.error(f"Error parsing XML: {str(e)}")
+            logger.debug(f"XML content: {terminology_xml}")
+            raise ValueError(f"Failed to parse XML: {str(e)}")
+    
+    logger.error("Couldn't extract valid XML from the response")
+    logger.debug(f"Raw response content: {content_text}")
+    raise ValueError("Failed to extract valid XML from Claude's response")
 
+class TermStreamParser:
+    """
+    Incremental parser for streamed model output.
+    
+    Text is fed as it arrives; each <term> is returned as soon as its closing
+    tag has been seen. Anything before <terminology> and after </terminology>
+    is ignored.
+    """
+    
+    START_TAG = "<terminology"
+    END_TAG = "</terminology>"
+    
+    def __init__(self):
+        self._parser = None
+        self._pending = ""
+        self._tail = ""
+        self.done = False
+        self.count = 0
+    
+    def feed(self, text):
+        """
+        Feed the next piece of model output.
+        
+        Args:
+            text (str): Text delta
+            
+        Returns:
+            list: Term dictionaries completed by this piece
+            
+        Raises:
+            ValueError: If the terminology XML is malformed
+        """
+        if self.done or not text:
+            return []
+        if self._parser is None:
+            # Wait for the root tag; it may be split across deltas
+            self._pending += text
+            start = self._pending.find(self.START_TAG)
+            if start < 0:
+                self._pending = self._pending[-len(self.START_TAG):]
+                return []
+            self._parser = ET.XMLPullParser(events=("end",))
+            text, self._pending = self._pending[start:], ""
+        
+        # Stop at the closing root tag, so trailing text is never parsed
+        window = self._tail + text
+        end = window.find(self.END_TAG)
+        if end >= 0:
+            text = text[:end + len(self.END_TAG) - len(self._tail)]
+            self.done = True
+        self._tail = window[-(len(self.END_TAG) - 1):]
+        
+        try:
+            self._parser.feed(text)
+            terms = [_term_from_element(elem) for _, elem in self._parser.read_events() if elem.tag == "term"]
+        except ET.ParseError as e:
+            logger.error(f"Error parsing streamed XML: {str(e)}")
+            raise ValueError(f"Failed to parse XML: {str(e)}")
+        self.count += len(terms)
+        return terms
+    
+    def close(self):
+        """
+        Check the end of the output.
+        
+        A response cut off inside <terminology> (e.g. at max_tokens) keeps the
+        terms already returned and only logs a warning.
+        
+        Raises:
+            ValueError: If the output held no terminology XML at all
+        """
+        if self._parser is None:
+            logger.error("Couldn't extract valid XML from the response")
+            raise ValueError("Failed to extract valid XML from Claude's response")
+        if not self.done:
+            logger.warning(f"Response ended before </terminology>; keeping the {self.count} complete terms")
@@ -0,0 +1,369 @@
+"""
+Chunked Extractor Module
+
+This module handles map-reduce terminology extraction over whole documents:
+the Chinese and English text is split into matched outline sections and then
+into token-budgeted parallel chunks of aligned sentences, the chunks are sent
+to the model concurrently, and the per-chunk term lists are merged and
+deduplicated.
+"""
+import asyncio
+import logging
+import os
+import queue
+import random
+import string
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from .page_text import PageText
+from .retry import RetryBudget
+from .sentence_aligner import SentenceAligner, build_parallel_chunks
+from .text_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Estimated tokens of zh + en text per call; small enough that the terms of a
+# chunk fit in one response
+DEFAULT_CHUNK_TOKENS = int(os.environ.get("BEDROCK_CHUNK_TOKENS", "16000"))
+
+# Chunk calls in flight at once
+DEFAULT_PARALLELISM = int(os.environ.get("BEDROCK_CHUNK_PARALLELISM", "4"))
+
+NAME_ALPHABET = string.ascii_uppercase + string.digits
+
+
+def _term_key(term):
+    """Dedup key of a term pair: case- and whitespace-insensitive Chinese and English terms."""
+    zh = "".join((term.get("ZH_CN") or "").split())
+    en = " ".join((term.get("EN_US") or "").split()).casefold()
+    return zh, en
+
+
+class TermMerger:
+    """Incremental deduplication of term pairs coming from several chunks."""
+
+    def __init__(self):
+        self._seen = set()
+        self._names = set()
+
+    def add(self, term):
+        """
+        Register a term.
+
+        Args:
+            term (dict): Term dictionary from one chunk
+
+        Returns:
+            dict or None: The term (renamed if its name clashes), or None if it is a
+                duplicate or lacks a Chinese or English side
+        """
+        key = _term_key(term)
+        if not all(key) or key in self._seen:
+            return None
+        self._seen.add(key)
+        # Each chunk picks its own random names, so they can clash across chunks
+        name = term.get("name")
+        while not name or name in self._names:
+            name = "".join(random.choices(NAME_ALPHABET, k=6))
+        self._names.add(name)
+        return dict(term, name=name)
+
+
+def merge_terms(term_lists):
+    """
+    Merge per-chunk term lists, dropping duplicate pairs and renaming clashing names.
+
+    Args:
+        term_lists (iterable): Lists of term dictionaries, in document order
+
+    Returns:
+        list: Unique term dictionaries in order of first appearance
+    """
+    merger = TermMerger()
+    merged = (merger.add(term) for terms in term_lists for term in terms)
+    return [term for term in merged if term is not None]
+
+
+def split_proportionally(chinese_text, english_text, num_chunks):
+    """
+    Cut both texts into num_chunks pieces at the same relative positions.
+
+    Used when sentence alignment finds no pairs, e.g. for documents that are
+    not close translations of each other. Cuts are moved to the next line break
+    where there is one nearby.
+
+    Args:
+        chinese_text (str): Chinese text
+        english_text (str): English text
+        num_chunks (int): Number of chunks
+
+    Returns:
+        list: (chinese_text, english_text) chunks
+    """
+    def cut(text):
+        bounds = [0]
+        for k in range(1, num_chunks):
+            position = len(text) * k // num_chunks
+            newline = text.find("\n", position, position + 200)
+            bounds.append(max(bounds[-1], newline + 1 if newline >= 0 else position))
+        bounds.append(len(text))
+        return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+
+    return list(zip(cut(chinese_text), cut(english_text)))
+
+
+class ChunkedExtractor:
+    """Class for extracting terminology from whole documents with concurrent chunk calls."""
+
+    def __init__(self, bedrock_client, chunk_tokens=DEFAULT_CHUNK_TOKENS, parallelism=DEFAULT_PARALLELISM,
+                 aligner=None):
+        """
+        Initialize the chunked extractor.
+
+        Args:
+            bedrock_client (BedrockClient): Client used for the chunk calls; shared by all threads
+            chunk_tokens (int): Estimated token budget of each chunk for both languages combined
+            parallelism (int): Number of chunk calls in flight at once
+            aligner (SentenceAligner, optional): Aligner used to build parallel chunks
+        """
+        self.bedrock_client = bedrock_client
+        self.chunk_tokens = chunk_tokens
+        self.parallelism = max(1, parallelism)
+        self.aligner = aligner or SentenceAligner()
+
+    def build_chunks(self, chinese_text, english_text, sections=None):
+        """
+        Split a document pair into parallel chunks under the token budget.
+
+        When matched sections are given, each section pair is cut out of the
+        page-indexed texts first and chunked on its own, so sentence alignment only
+        has to match within a section and no section is split across chunks unless
+        it exceeds the budget; small consecutive sections share a chunk.
+
+        Args:
+            chinese_text (str or PageText): Chinese text
+            english_text (str or PageText): English text
+            sections (list, optional): Section pairs from section_aligner.align_sections();
+                used when both texts are PageText
+
+        Returns:
+            list: (chinese_text, english_text) chunks, in document order
+        """
+        if sections and isinstance(chinese_text, PageText) and isinstance(english_text, PageText):
+            spans = self._section_spans(chinese_text, english_text, sections)
+            chunks = self._pack([chunk for zh, en in spans for chunk in self._chunk_span(zh, en)])
+            logger.info(f"Split {len(sections)} aligned sections into {len(chunks)} chunks")
+            return chunks
+        return self._chunk_span(str(chinese_text), str(english_text))
+
+    @staticmethod
+    def _section_spans(chinese_text, english_text, sections):
+        """Cut the text of each section pair; a pair empty on one side is folded into its predecessor."""
+        spans = []
+        # Sections that start on the same page share it; it is only sent with the first of them
+        zh_done = en_done = 0
+        for section in sections:
+            zh_first, zh_last = max(section["zh_pages"][0], zh_done + 1), section["zh_pages"][1]
+            en_first, en_last = max(section["en_pages"][0], en_done + 1), section["en_pages"][1]
+            zh = str(chinese_text.pages_view(zh_first, zh_last), "utf-8") if zh_first <= zh_last else ""
+            en = str(english_text.pages_view(en_first, en_last), "utf-8") if en_first <= en_last else ""
+            zh_done, en_done = max(zh_done, zh_last), max(en_done, en_last)
+            if spans and not (zh.strip() and en.strip()):
+                # Nothing to match it against on its own, but its text must still be covered
+                spans[-1] = (spans[-1][0] + zh, spans[-1][1] + en)
+            else:
+                spans.append((zh, en))
+        return spans
+
+    def _pack(self, chunks):
+        """Join runs of consecutive small chunks that fit the token budget together, to save per-call prompts."""
+        packed = []
+        tokens = 0
+        for zh, en in chunks:
+            chunk_tokens = estimate_tokens(zh) + estimate_tokens(en)
+            if packed and tokens + chunk_tokens <= self.chunk_tokens:
+                packed[-1] = (packed[-1][0] + "\n" + zh, packed[-1][1] + "\n" + en)
+                tokens += chunk_tokens
+            else:
+                packed.append((zh, en))
+                tokens = chunk_tokens
+        return packed
+
+    def _chunk_span(self, chinese_text, english_text):
+        """Split one parallel span into chunks under the token budget."""
+        total_tokens = estimate_tokens(chinese_text) + estimate_tokens(english_text)
+        if total_tokens <= self.chunk_tokens:
+            return [(chinese_text, english_text)]
+
+        chunks = build_parallel_chunks(self.aligner.align(chinese_text, english_text), self.chunk_tokens)
+        if not chunks:
+            logger.warning("Sentence alignment found no pairs; splitting the texts proportionally")
+            chunks = split_proportionally(chinese_text, english_text, -(-total_tokens // self.chunk_tokens))
+        return chunks
+
+    def extract(self, chinese_text, english_text, custom_prompt=None, sections=None):
+        """
+        Extract terminology pairs from the whole of both texts.
+
+        Chunks whose call fails are logged and left out; the call fails only when
+        every chunk does. Transient errors are retried from a retry budget shared
+        by all chunks of the document.
+
+        Args:
+            chinese_text (str or PageText): Text extracted from Chinese PDF
+            english_text (str or PageText): Text extracted from English PDF
+            custom_prompt (str, optional): Custom prompt template to use for each chunk
+            sections (list, optional): Matched section pairs; see build_chunks()
+
+        Returns:
+            list: Merged, deduplicated term dictionaries
+
+        Raises:
+            Exception: The error of the first chunk, if every chunk failed
+        """
+        chunks = self.build_chunks(chinese_text, english_text, sections)
+        logger.info(f"Extracting terminology from {len(chunks)} chunks, {self.parallelism} at a time")
+        budget = RetryBudget.for_calls(len(chunks))
+
+        def run(chunk):
+            return self.bedrock_client.extract_professional_terms(chunk[0], chunk[1], custom_prompt, max_chars=None,
+                                                                  retry_budget=budget)
+
+        with ThreadPoolExecutor(max_workers=min(self.parallelism, len(chunks))) as executor:
+            futures = [executor.submit(run, chunk) for chunk in chunks]
+            outcomes = []
+            for future in futures:
+                try:
+                    outcomes.append(future.result())
+                except Exception as e:
+                    outcomes.append(e)
+        return self._reduce(outcomes, budget)
+
+    def stream(self, chinese_text, english_text, custom_prompt=None, sections=None):
+        """
+        Extract terminology pairs from the whole of both texts, yielding each new pair as soon as it is parsed.
+
+        Chunks stream concurrently, so pairs from different chunks interleave; a
+        pair already yielded by another chunk is not repeated. Failed chunks are
+        handled as in extract().
+
+        Args:
+            chinese_text (str or PageText): Text extracted from Chinese PDF
+            english_text (str or PageText): Text extracted from English PDF
+            custom_prompt (str, optional): Custom prompt template to use for each chunk
+            sections (list, optional): Matched section pairs; see build_chunks()
+
+        Yields:
+            dict: Unique term dictionaries
+
+        Raises:
+            Exception: The error of the first chunk, if every chunk failed
+        """
+        chunks = self.build_chunks(chinese_text, english_text, sections)
+        logger.info(f"Streaming terminology from {len(chunks)} chunks, {self.parallelism} at a time")
+        budget = RetryBudget.for_calls(len(chunks))
+        results = queue.Queue()
+        finished = object()
+        stopped = threading.Event()
+
+        def run(index, chunk):
+            try:
+                with closing(self.bedrock_client.stream_professional_terms(
+                        chunk[0], chunk[1], custom_prompt, max_chars=None, retry_budget=budget)) as terms:
+                    for term in terms:
+                        if stopped.is_set():
+                            # The caller stopped reading; closing the stream frees the connection
+                            return
+                        results.put(term)
+                results.put((finished, None))
+            except Exception as e:
+                logger.warning(f"Chunk {index + 1}/{len(chunks)} failed: {str(e)}")
+                results.put((finished, e))
+
+        merger = TermMerger()
+        errors = []
+        count = 0
+        with ThreadPoolExecutor(max_workers=min(self.parallelism, len(chunks))) as executor:
+            futures = [executor.submit(run, index, chunk) for index, chunk in enumerate(chunks)]
+            try:
+                remaining = len(chunks)
+                while remaining:
+                    item = results.get()
+                    if isinstance(item, tuple) and item[0] is finished:
+                        remaining -= 1
+                        if item[1] is not None:
+                            errors.append(item[1])
+                        continue
+                    term = merger.add(item)
+                    if term is not None:
+                        count += 1
+                        yield term
+            finally:
+                # Runs when the caller stops early too: skip chunks not started, stop the others
+                stopped.set()
+                for future in futures:
+                    future.cancel()
+
+        if len(errors) == len(chunks):
+            raise errors[0]
+        if errors:
+            logger.warning(f"{len(errors)} of {len(chunks)} chunks failed; their terms are missing")
+        logger.info(f"Streamed {count} unique pairs" + (f" after {budget.spent} retries" if budget.spent else ""))
+
+    async def extract_async(self, chinese_text, english_text, custom_prompt=None, sections=None):
+        """
+        Asyncio version of extract() for an AsyncBedrockClient.
+
+        All chunks are scheduled on the running event loop, at most `parallelism`
+        of them in flight (the client may bound concurrency further).
+
+        Args:
+            chinese_text (str or PageText): Text extracted from Chinese PDF
+            english_text (str or PageText): Text extracted from English PDF
+            custom_prompt (str, optional): Custom prompt template to use for each chunk
+            sections (list, optional): Matched section pairs; see build_chunks()
+
+        Returns:
+            list: Merged, deduplicated term dictionaries
+
+        Raises:
+            Exception: The error of the first chunk, if every chunk failed
+        """
+        # Alignment is CPU-bound; keep it off the event loop
+        loop = asyncio.get_running_loop()
+        chunks = await loop.run_in_executor(None, self.build_chunks, chinese_text, english_text, sections)
+        logger.info(f"Extracting terminology from {len(chunks)} chunks, {self.parallelism} at a time")
+        semaphore = asyncio.Semaphore(self.parallelism)
+        budget = RetryBudget.for_calls(len(chunks))
+
+        async def run(chunk):
+            async with semaphore:
+                return await self.bedrock_client.extract_professional_terms(
+                    chunk[0], chunk[1], custom_prompt, max_chars=None, retry_budget=budget
+                )
+
+        outcomes = await asyncio.gather(*(run(chunk) for chunk in chunks), return_exceptions=True)
+        return self._reduce(outcomes, budget)
+
+    @staticmethod
+    def _reduce(outcomes, budget):
+        """Merge per-chunk term lists; outcomes holds each chunk's list or its exception, budget the job's RetryBudget."""
+        results, errors = [], []
+        for index, outcome in enumerate(outcomes):
+            if isinstance(outcome, BaseException):
+                logger.warning(f"Chunk {index + 1}/{len(outcomes)} failed: {str(outcome)}")
+                errors.append(outcome)
+            else:
+                results.append(outcome)
+
+        if not results:
+            raise errors[0]
+        if errors:
+            logger.warning(f"{len(errors)} of {len(outcomes)} chunks failed; their terms are missing")
+
+        terms = merge_terms(results)
+        logger.info(f"Merged {sum(len(r) for r in results)} chunk terms into {len(terms)} unique pairs"
+                    + (f" after {budget.spent} retries" if budget.spent else ""))
+        return terms
@@ -0,0 +1,107 @@
+"""
+Extraction Stats Module
+
+This module holds the per-page profiling data collected while extracting PDF text.
+"""
+from dataclasses import dataclass, field
+
+
+@dataclass
+class PageStats:
+    """Profile of one extracted page."""
+
+    page_number: int
+    seconds: float
+    chars: int
+    fonts: int
+    has_text_layer: bool
+    # 'decoded', 'image-only' (no text layer, not interpreted), 'ocr' or 'ocr-cached'
+    # (scanned page recognized now or earlier), 'ocr-failed', 'indexed' (served from
+    # the page index) or 'skipped' (guarded mode)
+    status: str = "decoded"
+    note: str = ""
+
+
+@dataclass
+class ExtractionStats:
+    """Profile of one extract_text() call."""
+
+    source: str
+    backend: str = ""
+    total_seconds: float = 0.0
+    from_cache: bool = False
+    budget_reached: bool = False
+    pages: list = field(default_factory=list)
+    normalizer: dict = field(default_factory=dict)
+
+    def add_page(self, page_stats):
+        """Record the profile of one page."""
+        self.pages.append(page_stats)
+
+    def update_page(self, page_number, **changes):
+        """Change fields of the most recent profile of a page, e.g. after OCR."""
+        for page in reversed(self.pages):
+            if page.page_number == page_number:
+                for name, value in changes.items():
+                    setattr(page, name, value)
+                return
+
+    @property
+    def decode_seconds(self):
+        """Total time spent decoding pages, summed over workers."""
+        return sum(page.seconds for page in self.pages)
+
+    def count(self, status):
+        """Number of pages with the given status."""
+        return sum(page.status == status for page in self.pages)
+
+    def slowest(self, count=10):
+        """
+        Return the pages that took longest to decode.
+
+        Args:
+            count (int): Number of pages to return
+
+        Returns:
+            list: PageStats sorted by decreasing decode time
+        """
+        return sorted(self.pages, key=lambda page: page.seconds, reverse=True)[:count]
+
+    def format_report(self, top=10):
+        """
+        Format a plain-text report of the extraction and its slowest pages.
+
+        Args:
+            top (int): Number of slowest pages to list
+
+        Returns:
+            str: Multi-line report
+        """
+        lines = [f"{self.source}: {len(self.pages)} pages in {self.total_seconds:.2f}s "
+                 f"(decode {self.decode_seconds:.2f}s summed over workers)"]
+        if self.backend:
+            lines.append(f"  backend {self.backend}")
+        if self.from_cache:
+            lines.append("  served from the text cache; no pages were decoded")
+            return "\n".join(lines)
+
+        without_text = sum(not page.chars for page in self.pages)
+        lines.append(f"  decoded {self.count('decoded')}, image-only {self.count('image-only')}, "
+                     f"OCR {self.count('ocr')} (+{self.count('ocr-cached')} cached), "
+                     f"from page index {self.count('indexed')}, skipped {self.count('skipped')}, "
+                     f"without text {without_text}")
+        if self.budget_reached:
+            lines.append("  stopped early: extraction budget reached")
+        if self.normalizer.get("chars_saved"):
+            lines.append(f"  normalization saved {self.normalizer['chars_saved']} characters "
+                         f"(~{self.normalizer['tokens_saved']} tokens)")
+
+        slowest = self.slowest(top)
+        if slowest:
+            lines.append(f"  slowest {len(slowest)} pages:")
+            lines.append(f"    {'page':>6} {'seconds':>9} {'chars':>8} {'fonts':>6} {'text':>5}  status")
+            for page in slowest:
+                status = f"{page.status} ({page.note})" if page.note else page.status
+                lines.append(f"    {page.page_number:>6} {page.seconds:>9.3f} {page.chars:>8} {page.fonts:>6} "
+                             f"{'yes' if page.has_text_layer else 'no':>5}  {status}")
+        return "\n".join(lines)
@@ -0,0 +1,244 @@
+"""
+Font Cache Module
+
+This module handles a process-wide cache of decoded PDF fonts (encodings,
+ToUnicode CMaps and glyph widths), shared across pages and documents.
+"""
+import hashlib
+import inspect
+import logging
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from copy import copy
+
+import pypdf
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+try:
+    from pypdf.generic._font import Font
+except ImportError:  # pypdf < 6 decodes fonts with _cmap.build_char_map instead
+    Font = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 512
+
+# Embedded font programs are not read by text extraction; hashing them would only cost time
+FONT_PROGRAM_KEYS = ("/FontFile", "/FontFile2", "/FontFile3")
+
+MAX_KEY_DEPTH = 8
+
+# pypdf releases whose font decoding internals the cache has been checked against: (min, max)
+# with max exclusive. The cache patches private pypdf functions, so newer releases are left alone
+SUPPORTED_PYPDF_VERSIONS = ((3, 17), (7, 0))
+
+
+def _digest_object(digest, obj, depth=0, seen=None):
+    """Feed a canonical form of a PDF object tree into digest; streams contribute their stored bytes."""
+    if seen is None:
+        seen = set()
+    if isinstance(obj, IndirectObject):
+        ref = (obj.idnum, obj.generation)
+        if ref in seen or depth > MAX_KEY_DEPTH:
+            digest.update(b"R")
+            return
+        seen.add(ref)
+        obj = obj.get_object()
+
+    if isinstance(obj, StreamObject):
+        data = getattr(obj, "_data", None)
+        digest.update(b"S")
+        digest.update(hashlib.sha256(data if isinstance(data, bytes) else obj.get_data()).digest())
+    if isinstance(obj, DictionaryObject):
+        digest.update(b"{")
+        for key in sorted(obj):
+            digest.update(key.encode("utf-8"))
+            value = obj.raw_get(key) if hasattr(obj, "raw_get") else obj[key]
+            if key in FONT_PROGRAM_KEYS:
+                digest.update(b"F")
+                continue
+            _digest_object(digest, value, depth + 1, seen)
+        digest.update(b"}")
+    elif isinstance(obj, ArrayObject):
+        digest.update(b"[")
+        for item in obj:
+            _digest_object(digest, item, depth + 1, seen)
+        digest.update(b"]")
+    elif not isinstance(obj, StreamObject):
+        digest.update(repr(obj).encode("utf-8"))
+        digest.update(b";")
+
+
+class FontCache:
+    """LRU cache of decoded fonts keyed by a hash of the font dictionary and its streams."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Initialize the font cache.
+
+        Args:
+            max_entries (int): Number of decoded fonts kept; least recently used ones are dropped
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Keys of indirect font objects per open document, so each font is hashed once per document
+        self._ref_keys = weakref.WeakKeyDictionary()
+
+    def font_key(self, font_dict):
+        """
+        Return the cache key of a font dictionary.
+
+        Args:
+            font_dict (DictionaryObject): Font resource dictionary
+
+        Returns:
+            str: Hex digest of the dictionary and its encoding and CMap streams
+        """
+        ref = getattr(font_dict, "indirect_reference", None)
+        document = getattr(ref, "pdf", None)
+        if ref is not None and document is not None:
+            try:
+                known = self._ref_keys.setdefault(document, {})
+            except TypeError:  # Document cannot be weakly referenced
+                known = None
+            if known is not None:
+                key = known.get((ref.idnum, ref.generation))
+                if key is None:
+                    key = known[(ref.idnum, ref.generation)] = self._hash(font_dict)
+                return key
+        return self._hash(font_dict)
+
+    @staticmethod
+    def _hash(font_dict):
+        digest = hashlib.sha256(f"pypdf{pypdf.__version__}".encode("utf-8"))
+        _digest_object(digest, font_dict)
+        return digest.hexdigest()
+
+    def get_or_build(self, key, build):
+        """
+        Return the decoded font for key, building and storing it on a miss.
+
+        Args:
+            key: Cache key
+            build (callable): Builds the decoded font
+
+        Returns:
+            object: The decoded font
+        """
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        value = build()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = value
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        """Drop all cached fonts."""
+        with self._lock:
+            self._entries.clear()
+            self._ref_keys = weakref.WeakKeyDictionary()
+
+
+font_cache = FontCache()
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def _pypdf_version():
+    """The installed pypdf version as a (major, minor) tuple, or None if it cannot be parsed."""
+    match = re.match(r"(\d+)\.(\d+)", getattr(pypdf, "__version__", ""))
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def install_font_cache():
+    """
+    Route pypdf's per-page font decoding through the shared font cache.
+
+    pypdf decodes every font of a page's resources each time a page is
+    extracted; with this installed, a font with the same dictionary and CMap
+    streams is decoded once per process and reused for every later page and
+    document. Safe to call repeatedly.
+
+    This replaces private pypdf internals for the whole process, so it is
+    opt-in (PDFProcessor(cache_fonts=True)) and refuses pypdf releases outside
+    SUPPORTED_PYPDF_VERSIONS or whose internals do not look as expected;
+    extraction then simply runs uncached.
+
+    Returns:
+        bool: Whether the cache is installed
+    """
+    global _installed
+
+    with _install_lock:
+        if _installed:
+            return True
+        version = _pypdf_version()
+        low, high = SUPPORTED_PYPDF_VERSIONS
+        if version is None or not low <= version < high:
+            logger.warning(f"Font cache not supported with pypdf {pypdf.__version__}; fonts are decoded per page")
+            return False
+        page_module = getattr(pypdf, "_page", None)
+        font_class = getattr(page_module, "Font", None)
+        if Font is not None and font_class is Font and callable(getattr(Font, "from_font_resource", None)):
+            page_module.Font = _CachingFont
+        elif _is_build_char_map(getattr(page_module, "build_char_map", None)):
+            page_module.build_char_map = _make_cached_build_char_map(page_module.build_char_map)
+        else:
+            logger.warning(f"pypdf {pypdf.__version__} font decoding has an unexpected layout; "
+                           f"fonts are decoded per page")
+            return False
+        _installed = True
+        logger.debug("Installed shared font cache")
+        return True
+
+
+def _is_build_char_map(function):
+    """Whether function looks like pypdf < 6's build_char_map(font_name, space_width, obj)."""
+    if not callable(function):
+        return False
+    try:
+        parameters = list(inspect.signature(function).parameters)
+    except (TypeError, ValueError):
+        return False
+    return parameters[:3] == ["font_name", "space_width", "obj"]
+
+
+if Font is not None:
+    class _CachingFont(Font):
+        """Font whose from_font_resource() goes through the shared cache."""
+
+        @classmethod
+        def from_font_resource(cls, pdf_font_dict):
+            cached = font_cache.get_or_build(font_cache.font_key(pdf_font_dict),
+                                             lambda: Font.from_font_resource(pdf_font_dict))
+            # Text extraction may adjust the space width of the object it gets, so hand out a copy
+            return copy(cached)
+
+
+def _make_cached_build_char_map(build_char_map):
+    """Wrap pypdf < 6's build_char_map(font_name, space_width, obj) with the shared cache."""
+
+    def cached_build_char_map(font_name, space_width, obj):
+        try:
+            font_dict = obj["/Resources"]["/Font"][font_name].get_object()
+        except Exception:
+            return build_char_map(font_name, space_width, obj)
+        key = (font_cache.font_key(font_dict), space_width)
+        result = font_cache.get_or_build(key, lambda: build_char_map(font_name, space_width, obj))
+        # The last item is the font dictionary itself; keep the one of the document being read
+        return result[:4] + (font_dict,) if len(result) == 5 else result
+
+    return cached_build_char_map
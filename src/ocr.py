@@ -0,0 +1,144 @@
+"""
+OCR Module
+
+This module handles OCR of image-only (scanned) PDF pages with a local
+Tesseract install, in a process pool of its own.
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import util as mp_util
+
+from pypdf import PdfReader
+
+try:
+    import pytesseract
+except ImportError:  # OCR is optional
+    pytesseract = None
+
+try:
+    import PIL
+except ImportError:  # pypdf needs Pillow to decode page images for OCR
+    PIL = None
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANGUAGES = "chi_sim+eng"
+
+_ocr_pool = None
+_ocr_pool_config = None
+_ocr_pool_lock = threading.Lock()
+
+_available = None
+
+# Per-worker reader cache, as in the extraction pool
+_worker_reader = None
+_worker_reader_key = None
+
+
+def is_available():
+    """Whether pytesseract, Pillow and the tesseract binary are installed (checked once per process)."""
+    global _available
+
+    if _available is None:
+        if pytesseract is None or PIL is None:
+            _available = False
+        else:
+            try:
+                pytesseract.get_tesseract_version()
+                _available = True
+            except Exception as e:
+                logger.debug(f"Tesseract not usable: {str(e)}")
+                _available = False
+    return _available
+
+
+def _init_ocr_worker(memory_limit=None):
+    """Apply the address-space ceiling to an OCR worker."""
+    if memory_limit and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+
+def get_ocr_pool(max_workers, memory_limit=None):
+    """
+    Return the shared OCR process pool, (re)creating it if its configuration changed.
+
+    Args:
+        max_workers (int): Number of OCR worker processes
+        memory_limit (int, optional): Address-space ceiling in bytes for each worker
+
+    Returns:
+        ProcessPoolExecutor: The pool
+    """
+    global _ocr_pool, _ocr_pool_config
+
+    config = (max_workers, memory_limit)
+    with _ocr_pool_lock:
+        if _ocr_pool is None or _ocr_pool_config != config:
+            if _ocr_pool is not None:
+                _ocr_pool.shutdown(wait=False)
+            logger.info(f"Starting OCR pool with {max_workers} workers")
+            _ocr_pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_ocr_worker,
+                initargs=(memory_limit,)
+            )
+            _ocr_pool_config = config
+            # See pdf_processor._get_pool: runs before the pool queues close, also in child processes
+            mp_util.Finalize(_ocr_pool, _ocr_pool.shutdown, exitpriority=100)
+        return _ocr_pool
+
+
+def reset_ocr_pool():
+    """Kill the OCR pool's workers, e.g. after a worker crashed."""
+    global _ocr_pool, _ocr_pool_config
+
+    with _ocr_pool_lock:
+        if _ocr_pool is None:
+            return
+        for process in list(getattr(_ocr_pool, "_processes", {}).values()):
+            process.terminate()
+        _ocr_pool.shutdown(wait=False, cancel_futures=True)
+        _ocr_pool = None
+        _ocr_pool_config = None
+
+
+def _open_reader(pdf_path):
+    global _worker_reader, _worker_reader_key
+
+    stat = os.stat(pdf_path)
+    key = (pdf_path, stat.st_mtime_ns, stat.st_size)
+    if _worker_reader_key != key:
+        _worker_reader = PdfReader(pdf_path)
+        _worker_reader_key = key
+    return _worker_reader
+
+
+def ocr_page(pdf_path, page_index, languages=DEFAULT_LANGUAGES, timeout=None):
+    """
+    OCR the images of one page inside an OCR pool worker.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        page_index (int): 0-based page index
+        languages (str): Tesseract language codes joined with '+'
+        timeout (float, optional): Tesseract deadline per image in seconds
+
+    Returns:
+        tuple: (text, seconds) with the recognized text of the page's images in order
+    """
+    started = time.perf_counter()
+    page = _open_reader(pdf_path).pages[page_index]
+    texts = []
+    for image in page.images:
+        text = pytesseract.image_to_string(image.image, lang=languages, timeout=timeout or 0)
+        if text.strip():
+            texts.append(text.strip())
+    return "\n".join(texts), time.perf_counter() - started
@@ -0,0 +1,253 @@
+"""
+Page Text Module
+
+This module holds extracted document text in one UTF-8 buffer with per-page
+offsets, so callers can slice it by page or character range without copying.
+"""
+import struct
+from array import array
+from bisect import bisect_right
+
+# Text that follows every page in the joined document text
+PAGE_SEPARATOR = "\n\n"
+
+SERIAL_MAGIC = b"PTXT1"
+SERIAL_HEADER = struct.Struct("<5sIB")
+
+
+class PageText:
+    """
+    Extracted text of a document, stored once with an offsets array per page.
+
+    Page k (in extraction order) occupies bytes byte_offsets[k] to
+    byte_offsets[k + 1] of the buffer, ending in PAGE_SEPARATOR (except for the
+    last page of a truncated text); char_offsets holds the same boundaries in
+    characters. The joined text is identical to what PDFProcessor.extract_text()
+    returns.
+    """
+
+    def __init__(self, data, page_numbers, byte_offsets, char_offsets, ends_with_separator=True):
+        """
+        Initialize from an existing buffer; see from_pages() to build one from page text.
+
+        Args:
+            data: UTF-8 bytes (or a memoryview over them) of the joined text
+            page_numbers (array): 1-based page number of each stored page
+            byte_offsets (array): Byte offset of each page start, plus the end of the buffer
+            char_offsets (array): Character offset of each page start, plus the total length
+            ends_with_separator (bool): Whether the last page is followed by PAGE_SEPARATOR
+        """
+        self._data = memoryview(data)
+        self.page_numbers = page_numbers
+        self.byte_offsets = byte_offsets
+        self.char_offsets = char_offsets
+        self.ends_with_separator = ends_with_separator
+        self._text = None
+
+    @classmethod
+    def from_pages(cls, pages, ends_with_separator=True):
+        """
+        Build a PageText from (page_number, text) pairs; pages with no text are left out.
+
+        Args:
+            pages (iterable): (page_number, text) pairs as yielded by PDFProcessor.iter_pages()
+            ends_with_separator (bool): Whether the last page is followed by PAGE_SEPARATOR;
+                False for text cut at a character or token budget
+
+        Returns:
+            PageText: The joined text
+        """
+        page_numbers = array("i")
+        byte_offsets = array("q", [0])
+        char_offsets = array("q", [0])
+        parts = []
+        for page_number, text in pages:
+            if not text:
+                continue
+            chunk = (text + PAGE_SEPARATOR).encode("utf-8")
+            parts.append(chunk)
+            page_numbers.append(page_number)
+            byte_offsets.append(byte_offsets[-1] + len(chunk))
+            char_offsets.append(char_offsets[-1] + len(text) + len(PAGE_SEPARATOR))
+        if parts and not ends_with_separator:
+            parts[-1] = parts[-1][:-len(PAGE_SEPARATOR.encode("utf-8"))]
+            byte_offsets[-1] -= len(PAGE_SEPARATOR.encode("utf-8"))
+            char_offsets[-1] -= len(PAGE_SEPARATOR)
+        return cls(b"".join(parts), page_numbers, byte_offsets, char_offsets, ends_with_separator)
+
+    def __len__(self):
+        return self.char_offsets[-1]
+
+    def __str__(self):
+        return self.text
+
+    def __reduce__(self):
+        # Pickle as the compact serialized form, e.g. when returned from a worker process
+        return (PageText.from_bytes, (self.to_bytes(),))
+
+    @property
+    def num_pages(self):
+        """Number of pages with text."""
+        return len(self.page_numbers)
+
+    @property
+    def text(self):
+        """The joined text of all pages, decoded once and then reused."""
+        if self._text is None:
+            self._text = str(self._data, "utf-8")
+        return self._text
+
+    @property
+    def nbytes(self):
+        """Size of the UTF-8 buffer in bytes."""
+        return self._data.nbytes
+
+    def _position(self, page_number):
+        index = bisect_right(self.page_numbers, page_number) - 1
+        if index < 0 or self.page_numbers[index] != page_number:
+            raise KeyError(f"Page {page_number} has no text")
+        return index
+
+    def page_view(self, page_number):
+        """
+        Return one page's text as a zero-copy view of the buffer.
+
+        Args:
+            page_number (int): 1-based page number
+
+        Returns:
+            memoryview: UTF-8 bytes of the page, without the trailing separator
+
+        Raises:
+            KeyError: If the page has no text
+        """
+        index = self._position(page_number)
+        end = self.byte_offsets[index + 1]
+        if index + 1 < self.num_pages or self.ends_with_separator:
+            end -= len(PAGE_SEPARATOR)
+        return self._data[self.byte_offsets[index]:end]
+
+    def page(self, page_number):
+        """Return one page's text as a str; see page_view()."""
+        return str(self.page_view(page_number), "utf-8")
+
+    def pages_view(self, first, last):
+        """
+        Return the pages in a page-number range as a zero-copy view of the buffer.
+
+        Args:
+            first (int): First 1-based page number
+            last (int): Last 1-based page number (inclusive)
+
+        Returns:
+            memoryview: UTF-8 bytes of the pages with text in the range, separators included
+        """
+        start = bisect_right(self.page_numbers, first - 1)
+        end = bisect_right(self.page_numbers, last)
+        return self._data[self.byte_offsets[start]:self.byte_offsets[end]]
+
+    def _byte_offset(self, char_offset):
+        """Translate a character offset into a byte offset in the buffer."""
+        char_offset = max(0, min(char_offset, len(self)))
+        index = bisect_right(self.char_offsets, char_offset) - 1
+        if index >= self.num_pages:
+            return self.byte_offsets[-1]
+        start_char = self.char_offsets[index]
+        start_byte = self.byte_offsets[index]
+        if self.byte_offsets[index + 1] - start_byte == self.char_offsets[index + 1] - start_char:
+            # ASCII-only page: characters and bytes line up
+            return start_byte + char_offset - start_char
+        # Only this page is decoded to find the boundary
+        page = str(self._data[start_byte:self.byte_offsets[index + 1]], "utf-8")
+        return start_byte + len(page[:char_offset - start_char].encode("utf-8"))
+
+    def view(self, start, end=None):
+        """
+        Return a character range as a zero-copy view of the buffer.
+
+        Args:
+            start (int): First character offset
+            end (int, optional): End character offset (exclusive); defaults to the end
+
+        Returns:
+            memoryview: UTF-8 bytes of the range
+        """
+        end = len(self) if end is None else end
+        return self._data[self._byte_offset(start):self._byte_offset(end)]
+
+    def truncate(self, max_chars):
+        """
+        Return the first max_chars characters as a PageText sharing this buffer.
+
+        Args:
+            max_chars (int): Character budget
+
+        Returns:
+            PageText: Self when already within the budget, otherwise a shortened view
+        """
+        if len(self) <= max_chars:
+            return self
+        if max_chars <= 0:
+            return PageText(b"", array("i"), array("q", [0]), array("q", [0]))
+        # Pages that start before the cut; the last of them is kept in part
+        count = bisect_right(self.char_offsets, max_chars - 1)
+        # A cut inside the separator keeps the whole page but drops the partial separator
+        content_end = self.char_offsets[count]
+        if count < self.num_pages or self.ends_with_separator:
+            content_end -= len(PAGE_SEPARATOR)
+        end_char = min(max_chars, content_end)
+        end_byte = self._byte_offset(end_char)
+        page_numbers = self.page_numbers[:count]
+        byte_offsets = self.byte_offsets[:count]
+        char_offsets = self.char_offsets[:count]
+        byte_offsets.append(end_byte)
+        char_offsets.append(end_char)
+        return PageText(self._data[:end_byte], page_numbers, byte_offsets, char_offsets, False)
+
+    def to_bytes(self):
+        """
+        Serialize to a compact binary form: a small header, the offset arrays and the buffer.
+
+        Returns:
+            bytes: Serialized text, readable with from_bytes()
+        """
+        return b"".join((
+            SERIAL_HEADER.pack(SERIAL_MAGIC, self.num_pages, self.ends_with_separator),
+            self.page_numbers.tobytes(),
+            self.byte_offsets.tobytes(),
+            self.char_offsets.tobytes(),
+            self._data,
+        ))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Deserialize the output of to_bytes(); the text buffer is referenced, not copied.
+
+        Args:
+            data: Bytes-like object produced by to_bytes()
+
+        Returns:
+            PageText: The deserialized text
+
+        Raises:
+            ValueError: If data is not a serialized PageText
+        """
+        view = memoryview(data)
+        if not is_serialized(view):
+            raise ValueError("Not a serialized PageText")
+        _, num_pages, ends_with_separator = SERIAL_HEADER.unpack_from(view)
+        position = SERIAL_HEADER.size
+        arrays = []
+        for typecode, count in (("i", num_pages), ("q", num_pages + 1), ("q", num_pages + 1)):
+            values = array(typecode)
+            size = values.itemsize * count
+            values.frombytes(view[position:position + size])
+            arrays.append(values)
+            position += size
+        return cls(view[position:], *arrays, bool(ends_with_separator))
+
+
+def is_serialized(data):
+    """Whether data starts like the output of PageText.to_bytes()."""
+    return bytes(data[:len(SERIAL_MAGIC)]) == SERIAL_MAGIC
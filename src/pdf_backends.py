@@ -0,0 +1,353 @@
+"""
+PDF Backends Module
+
+This module handles the text extraction engines PDFProcessor can decode pages
+with, and the micro-benchmark that picks one per kind of document.
+"""
+import io
+import logging
+import re
+import threading
+import time
+
+from pypdf import PdfReader
+
+try:
+    import pypdfium2
+except ImportError:  # Optional backend
+    pypdfium2 = None
+
+try:
+    import pdfminer
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+except ImportError:  # Optional backend
+    pdfminer = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = "pypdf"
+
+# A backend is acceptable when it recovers at least this share of the best backend's characters
+MIN_COVERAGE = 0.9
+# ...and no more than this share of its characters are replacement, control or private-use code points
+MAX_GARBAGE_RATIO = 0.01
+
+GARBAGE_PATTERN = re.compile(r"[\ufffd\ue000-\uf8ff\x00-\x08\x0b\x0e-\x1f]")
+VERSION_PATTERN = re.compile(r"[\d.]+")
+
+
+class ExtractionBackend:
+    """Base class for the engines that turn one PDF page into text."""
+
+    name = None
+    # Whether open() extracts through the pypdf reader it is given
+    uses_reader = False
+
+    def is_available(self):
+        """Whether the libraries this backend needs are installed."""
+        return True
+
+    def cache_tag(self):
+        """Return a string identifying this backend and its version in cache keys."""
+        return self.name
+
+    def open(self, source, reader):
+        """
+        Open a document for page extraction.
+
+        Args:
+            source: Path to the PDF file or a seekable binary stream over its bytes;
+                streams are left open for the caller to close
+            reader (PdfReader): pypdf reader over the same document
+
+        Returns:
+            object: Backend-specific document handle
+        """
+        raise NotImplementedError
+
+    def extract_page(self, document, index):
+        """
+        Extract the text of one page.
+
+        Args:
+            document: Handle returned by open()
+            index (int): 0-based page index
+
+        Returns:
+            str: Page text
+        """
+        raise NotImplementedError
+
+    def close(self, document):
+        """Release a document handle returned by open()."""
+
+
+class PypdfBackend(ExtractionBackend):
+    """pypdf's own extractor, in plain or layout mode."""
+
+    uses_reader = True
+
+    def __init__(self, layout=False):
+        self.layout = layout
+        self.name = "pypdf-layout" if layout else "pypdf"
+
+    def cache_tag(self):
+        # The pypdf version is already part of every cache key, and plain mode keeps the original keys
+        return self.name if self.layout else ""
+
+    def open(self, source, reader):
+        return reader
+
+    def extract_page(self, document, index):
+        if self.layout:
+            return document.pages[index].extract_text(extraction_mode="layout") or ""
+        return document.pages[index].extract_text() or ""
+
+
+class PdfiumBackend(ExtractionBackend):
+    """PDFium through pypdfium2; fast C++ text extraction."""
+
+    name = "pypdfium2"
+
+    def is_available(self):
+        return pypdfium2 is not None
+
+    def cache_tag(self):
+        return f"pypdfium2-{getattr(pypdfium2, 'PYPDFIUM_INFO', getattr(pypdfium2, 'V_PYPDFIUM2', ''))}"
+
+    def open(self, source, reader):
+        return pypdfium2.PdfDocument(source)
+
+    def extract_page(self, document, index):
+        page = document[index]
+        try:
+            textpage = page.get_textpage()
+            try:
+                return textpage.get_text_range().replace("\r\n", "\n")
+            finally:
+                textpage.close()
+        finally:
+            page.close()
+
+    def close(self, document):
+        document.close()
+
+
+class _PdfminerDocument:
+    """Parsed pdfminer document with its page list and shared resource manager."""
+
+    def __init__(self, stream, owns_stream):
+        self.stream = stream
+        self.owns_stream = owns_stream
+        self.pages = list(PDFPage.create_pages(PDFDocument(PDFParser(stream))))
+        self.resources = PDFResourceManager(caching=True)
+
+
+class PdfminerBackend(ExtractionBackend):
+    """pdfminer.six layout analysis; slower, but robust on unusual encodings."""
+
+    name = "pdfminer"
+
+    def is_available(self):
+        return pdfminer is not None
+
+    def cache_tag(self):
+        return f"pdfminer-{getattr(pdfminer, '__version__', '')}"
+
+    def open(self, source, reader):
+        if isinstance(source, str):
+            return _PdfminerDocument(open(source, "rb"), True)
+        return _PdfminerDocument(source, False)
+
+    def extract_page(self, document, index):
+        output = io.StringIO()
+        device = TextConverter(document.resources, output, laparams=LAParams())
+        try:
+            PDFPageInterpreter(document.resources, device).process_page(document.pages[index])
+        finally:
+            device.close()
+        return output.getvalue().replace("\x0c", "")
+
+    def close(self, document):
+        if document.owns_stream:
+            document.stream.close()
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (PypdfBackend(), PypdfBackend(layout=True), PdfiumBackend(), PdfminerBackend())
+}
+
+
+def get_backend(name):
+    """
+    Look up an installed backend by name.
+
+    Args:
+        name (str): Backend name, one of BACKENDS
+
+    Returns:
+        ExtractionBackend: The backend
+
+    Raises:
+        ValueError: If the backend is unknown or its library is not installed
+    """
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown PDF backend '{name}'; choose from {', '.join(BACKENDS)}")
+    if not backend.is_available():
+        raise ValueError(f"PDF backend '{name}' is not installed")
+    return backend
+
+
+def available_backends():
+    """Return the names of the backends whose libraries are installed."""
+    return [name for name, backend in BACKENDS.items() if backend.is_available()]
+
+
+def document_profile(reader, page_indices):
+    """
+    Describe the kind of document, so benchmark results can be reused for similar files.
+
+    Documents from the same producing tool with the same kind of fonts behave
+    alike under each backend.
+
+    Args:
+        reader (PdfReader): Reader over the document
+        page_indices (list): 0-based indices of pages to inspect for fonts
+
+    Returns:
+        tuple: (producer, creator, uses_composite_fonts)
+    """
+    try:
+        info = reader.metadata or {}
+    except Exception:
+        info = {}
+    producer = VERSION_PATTERN.sub("", str(info.get("/Producer", ""))).strip()
+    creator = VERSION_PATTERN.sub("", str(info.get("/Creator", ""))).strip()
+
+    composite = False
+    for index in page_indices:
+        try:
+            fonts = reader.pages[index]["/Resources"].get_object()["/Font"].get_object()
+        except (KeyError, AttributeError, TypeError):
+            continue
+        # CJK documents use Type0 (composite) fonts, where backends differ the most
+        if any(fonts[name].get_object().get("/Subtype") == "/Type0" for name in fonts):
+            composite = True
+            break
+    return producer, creator, composite
+
+
+def _time_backend(backend, source, reader, page_indices):
+    """
+    Extract the sample pages with one backend.
+
+    Returns:
+        tuple: (seconds, chars, garbage, error) where chars counts non-whitespace
+            characters, garbage the suspicious ones, and error is None on success
+    """
+    chars = garbage = 0
+    error = None
+    started = time.perf_counter()
+    try:
+        if hasattr(source, "seek"):
+            source.seek(0)
+        # A reader shared between the pypdf modes would let whichever runs second reuse
+        # the objects and fonts the first one parsed, so each run opens its own
+        document = backend.open(source, PdfReader(source) if backend.uses_reader else reader)
+        try:
+            for index in page_indices:
+                text = backend.extract_page(document, index)
+                chars += len("".join(text.split()))
+                garbage += len(GARBAGE_PATTERN.findall(text))
+        finally:
+            backend.close(document)
+    except Exception as e:
+        error = str(e)
+    return time.perf_counter() - started, chars, garbage, error
+
+
+def benchmark_backends(source, reader, page_indices, names=None, rounds=2):
+    """
+    Time each backend on a sample of pages and judge the text it produces.
+
+    Every backend starts from a freshly opened document. The backends run in
+    turn for several rounds, alternating the order, and their times are
+    averaged, so no backend gains from running after another has warmed up
+    shared state such as the font cache.
+
+    Args:
+        source: Path to the PDF file or a seekable binary stream over its bytes
+        reader (PdfReader): pypdf reader over the same document, for backends that
+            do not open their own
+        page_indices (list): 0-based indices of the sample pages
+        names (list, optional): Backends to try (defaults to all installed ones)
+        rounds (int): Timed runs of each backend
+
+    Returns:
+        list: One dictionary per backend with 'name', 'seconds', 'chars',
+            'garbage_ratio', 'acceptable' and 'error' (None on success)
+    """
+    results = [{"name": name, "seconds": 0.0, "chars": 0, "garbage_ratio": 0.0, "acceptable": False, "error": None}
+               for name in names or available_backends()]
+    rounds = max(1, rounds)
+    for round_number in range(rounds):
+        order = results if round_number % 2 == 0 else results[::-1]
+        for result in order:
+            if result["error"] is not None:
+                continue
+            seconds, chars, garbage, error = _time_backend(get_backend(result["name"]), source, reader, page_indices)
+            result["seconds"] += seconds / rounds
+            if round_number == 0:
+                result["chars"] = chars
+                result["garbage_ratio"] = garbage / chars if chars else 0.0
+            result["error"] = error
+
+    best_chars = max((result["chars"] for result in results if result["error"] is None), default=0)
+    for result in results:
+        result["acceptable"] = (result["error"] is None
+                                and result["chars"] >= MIN_COVERAGE * best_chars
+                                and result["garbage_ratio"] <= MAX_GARBAGE_RATIO)
+    return results
+
+
+def pick_backend(results):
+    """
+    Choose the fastest acceptable backend from benchmark_backends() results.
+
+    Args:
+        results (list): Benchmark results
+
+    Returns:
+        str: Backend name; the default backend when none was acceptable
+    """
+    acceptable = [result for result in results if result["acceptable"]]
+    if not acceptable:
+        return DEFAULT_BACKEND
+    return min(acceptable, key=lambda result: result["seconds"])["name"]
+
+
+class BackendSelector:
+    """Remembers the backend chosen for each document profile, so each kind is benchmarked once."""
+
+    def __init__(self):
+        self._choices = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, profile):
+        with self._lock:
+            return self._choices.get(profile)
+
+    def remember(self, profile, name):
+        with self._lock:
+            self._choices[profile] = name
+
+
+# Shared by every PDFProcessor in the process
+backend_selector = BackendSelector()
@@ -0,0 +1,304 @@
+"""
+PDF Metadata Module
+
+This module handles the quick pre-flight pass over an uploaded PDF: page count,
+text-layer coverage, estimated text size, dominant script and outline presence.
+The result is stored in a sidecar file next to the upload so the scheduler,
+model router and UI can use it without parsing the PDF again.
+"""
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, fields
+
+import numpy as np
+from pypdf import PdfReader
+
+from .bedrock_client import MODEL_PRICES
+from .chunked_extractor import DEFAULT_CHUNK_TOKENS, DEFAULT_PARALLELISM
+from .pdf_processor import is_scanned_page, page_has_text_layer
+from .text_cache import hash_file
+from .text_utils import CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+METADATA_VERSION = 1
+SIDECAR_SUFFIX = ".meta.json"
+
+# Text-layer pages decoded to estimate characters per page and the script mix
+SAMPLE_PAGES = 8
+
+# Codepoint ranges counted as Han or Latin letters; everything else is ignored
+HAN_RANGES = ((0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xF900, 0xFAFF), (0x20000, 0x2FA1F))
+LATIN_RANGES = ((0x41, 0x5A), (0x61, 0x7A), (0xC0, 0x24F))
+
+SCRIPT_OTHER, SCRIPT_HAN, SCRIPT_LATIN = 0, 1, 2
+
+# Rough throughput figures for job estimates; tune them from extraction profiles and model logs
+TEXT_PAGE_SECONDS = 0.05
+OCR_PAGE_SECONDS = 3.0
+INPUT_TOKENS_PER_SECOND = 5000
+OUTPUT_TOKENS_PER_SECOND = 50
+# Prompt template tokens per call, and expected output size relative to a call's input
+PROMPT_TOKENS = 500
+OUTPUT_TOKEN_RATIO = 0.15
+MAX_OUTPUT_TOKENS = 4096
+
+
+def _build_script_bins():
+    """Sorted range edges and the script of each interval between them, for np.searchsorted."""
+    ranges = sorted([(low, high, SCRIPT_HAN) for low, high in HAN_RANGES]
+                    + [(low, high, SCRIPT_LATIN) for low, high in LATIN_RANGES])
+    edges, scripts = [], [SCRIPT_OTHER]
+    for low, high, script in ranges:
+        edges += [low, high + 1]
+        scripts += [script, SCRIPT_OTHER]
+    return np.array(edges, dtype=np.uint32), np.array(scripts, dtype=np.intp)
+
+
+SCRIPT_EDGES, SCRIPT_OF_BIN = _build_script_bins()
+
+
+def script_histogram(text):
+    """
+    Count Han and Latin letters in a text with one vectorized pass over its codepoints.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        tuple: (han_count, latin_count)
+    """
+    if not text:
+        return 0, 0
+    codepoints = np.frombuffer(text.encode("utf-32-le"), dtype="<u4")
+    bins = np.searchsorted(SCRIPT_EDGES, codepoints, side="right")
+    counts = np.bincount(SCRIPT_OF_BIN[bins], minlength=3)
+    return int(counts[SCRIPT_HAN]), int(counts[SCRIPT_LATIN])
+
+
+@dataclass
+class DocumentMetadata:
+    """Pre-flight summary of one PDF."""
+
+    sha256: str
+    file_size: int
+    page_count: int
+    text_pages: int
+    scanned_pages: int
+    estimated_chars: int
+    han_share: float
+    latin_share: float
+    has_outline: bool
+    scan_seconds: float
+    version: int = METADATA_VERSION
+
+    @property
+    def text_coverage(self):
+        """Share of pages with a text layer."""
+        return self.text_pages / self.page_count if self.page_count else 0.0
+
+    @property
+    def dominant_script(self):
+        """'han', 'latin' or 'none' when the sampled pages had no letters."""
+        if not self.han_share and not self.latin_share:
+            return "none"
+        return "han" if self.han_share >= self.latin_share else "latin"
+
+    def to_dict(self):
+        """Plain dict for JSON, with the derived fields included for readers of the sidecar."""
+        data = asdict(self)
+        data["text_coverage"] = round(self.text_coverage, 4)
+        data["dominant_script"] = self.dominant_script
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict(); derived and unknown fields are ignored."""
+        names = {f.name for f in fields(cls)}
+        return cls(**{name: value for name, value in data.items() if name in names})
+
+
+def scan_metadata(pdf_path, sample_pages=SAMPLE_PAGES):
+    """
+    Collect pre-flight metadata for a PDF without extracting all of its text.
+
+    Every page is sniffed for a text layer; only a few evenly spaced text-layer
+    pages are decoded, and their characters per page and script mix are
+    extrapolated to the document.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        sample_pages (int): Number of text-layer pages to decode
+
+    Returns:
+        DocumentMetadata: The document's metadata
+
+    Raises:
+        Exception: If the PDF cannot be read
+    """
+    started = time.perf_counter()
+    try:
+        reader = PdfReader(pdf_path)
+        page_count = len(reader.pages)
+        text_indices = []
+        scanned_pages = 0
+        for index, page in enumerate(reader.pages):
+            if page_has_text_layer(page):
+                text_indices.append(index)
+            elif is_scanned_page(page):
+                scanned_pages += 1
+
+        chars = han = latin = 0
+        sample = []
+        if text_indices:
+            positions = np.linspace(0, len(text_indices) - 1, min(sample_pages, len(text_indices)))
+            sample = [text_indices[position] for position in sorted(set(positions.astype(int).tolist()))]
+        for index in sample:
+            text = reader.pages[index].extract_text() or ""
+            chars += len(text)
+            page_han, page_latin = script_histogram(text)
+            han += page_han
+            latin += page_latin
+        letters = han + latin
+
+        metadata = DocumentMetadata(
+            sha256=hash_file(pdf_path),
+            file_size=os.path.getsize(pdf_path),
+            page_count=page_count,
+            text_pages=len(text_indices),
+            scanned_pages=scanned_pages,
+            estimated_chars=int(chars / len(sample) * len(text_indices)) if sample else 0,
+            han_share=round(han / letters, 4) if letters else 0.0,
+            latin_share=round(latin / letters, 4) if letters else 0.0,
+            has_outline=bool(reader.outline),
+            scan_seconds=round(time.perf_counter() - started, 3),
+        )
+    except Exception as e:
+        logger.error(f"Error scanning metadata of {pdf_path}: {str(e)}")
+        raise
+
+    logger.info(f"Scanned {pdf_path}: {page_count} pages, {metadata.text_coverage:.0%} with text, "
+                f"~{metadata.estimated_chars} characters, mostly {metadata.dominant_script} "
+                f"in {metadata.scan_seconds:.2f}s")
+    return metadata
+
+
+def sidecar_path(pdf_path):
+    """Path of the metadata file stored next to a PDF."""
+    return pdf_path + SIDECAR_SUFFIX
+
+
+def load_metadata(pdf_path):
+    """
+    Read a PDF's stored metadata if it is still current.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+
+    Returns:
+        DocumentMetadata or None: The metadata, or None if missing or stale
+    """
+    try:
+        with open(sidecar_path(pdf_path), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        stat = os.stat(pdf_path)
+    except (OSError, ValueError):
+        return None
+    if (data.get("version") != METADATA_VERSION or data.get("file_size") != stat.st_size
+            or data.get("mtime_ns") != stat.st_mtime_ns):
+        return None
+    return DocumentMetadata.from_dict(data)
+
+
+def get_metadata(pdf_path, sample_pages=SAMPLE_PAGES):
+    """
+    Return a PDF's metadata, scanning it and storing the sidecar on first use.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        sample_pages (int): Number of text-layer pages to decode when scanning
+
+    Returns:
+        DocumentMetadata: The document's metadata
+    """
+    metadata = load_metadata(pdf_path)
+    if metadata is not None:
+        return metadata
+
+    metadata = scan_metadata(pdf_path, sample_pages)
+    data = metadata.to_dict()
+    data["mtime_ns"] = os.stat(pdf_path).st_mtime_ns
+    tmp_path = sidecar_path(pdf_path) + f".{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, sidecar_path(pdf_path))
+    except OSError as e:
+        # Read-only upload directories still get the metadata, just not stored
+        logger.warning(f"Could not store metadata for {pdf_path}: {str(e)}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return metadata
+
+
+def estimate_tokens_from_metadata(metadata, max_chars=None):
+    """
+    Estimate the model tokens of a document's text from its metadata.
+
+    Uses the same heuristic as text_utils.estimate_tokens(): one token per Han
+    character and CHARS_PER_TOKEN characters per token otherwise.
+
+    Args:
+        metadata (DocumentMetadata): The document's metadata
+        max_chars (int, optional): Characters actually sent to the model
+
+    Returns:
+        int: Estimated token count
+    """
+    chars = metadata.estimated_chars if max_chars is None else min(metadata.estimated_chars, max_chars)
+    han_chars = chars * metadata.han_share
+    return int(han_chars + (chars - han_chars) / CHARS_PER_TOKEN)
+
+
+def estimate_job(documents, model_id, max_chars=None, chunk_tokens=DEFAULT_CHUNK_TOKENS,
+                 parallelism=DEFAULT_PARALLELISM):
+    """
+    Estimate the cost and duration of extracting terms from documents before running it.
+
+    Follows ChunkedExtractor: the text is sent in chunks of about chunk_tokens, each
+    with its own prompt and response, parallelism chunks at a time.
+
+    Args:
+        documents (list): DocumentMetadata of each document in the job
+        model_id (str): Bedrock model id the job would use
+        max_chars (int, optional): Characters of each document sent to the model
+        chunk_tokens (int): Estimated text tokens per chunk
+        parallelism (int): Chunk calls in flight at once
+
+    Returns:
+        dict: input_tokens, output_tokens, chunks, cost_usd (None for models without a
+            known price), extract_seconds (documents are extracted side by side) and
+            model_seconds
+    """
+    text_tokens = sum(estimate_tokens_from_metadata(m, max_chars) for m in documents)
+    chunks = max(1, -(-text_tokens // chunk_tokens))
+    chunk_output = min(MAX_OUTPUT_TOKENS, int((PROMPT_TOKENS + text_tokens / chunks) * OUTPUT_TOKEN_RATIO))
+    input_tokens = text_tokens + chunks * PROMPT_TOKENS
+    output_tokens = chunks * chunk_output
+    price = MODEL_PRICES.get(model_id)
+    cost = None
+    if price is not None:
+        cost = (input_tokens * price[0] + output_tokens * price[1]) / 1_000_000
+    chunk_seconds = (input_tokens / chunks / INPUT_TOKENS_PER_SECOND) + chunk_output / OUTPUT_TOKENS_PER_SECOND
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "chunks": chunks,
+        "cost_usd": cost,
+        "extract_seconds": max((m.text_pages * TEXT_PAGE_SECONDS + m.scanned_pages * OCR_PAGE_SECONDS
+                                for m in documents), default=0.0),
+        # Chunks run in waves of `parallelism` calls
+        "model_seconds": chunk_seconds * -(-chunks // max(1, parallelism)),
+    }
@@ -3,49 +3,1217 @@ PDF Processor Module
 
 This module handles the extraction of text from PDF files.
 """
+import hashlib
+import io
 import logging
+import mmap
+import os
+import re
+import signal
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import closing, contextmanager
+from multiprocessing import util as mp_util
+
+import pypdf
 from pypdf import PdfReader
 
+from . import ocr
+from .font_cache import _digest_object, install_font_cache
+from .extraction_stats import ExtractionStats, PageStats
+from .page_text import PAGE_SEPARATOR, PageText
+from .pdf_backends import (DEFAULT_BACKEND, available_backends, backend_selector, benchmark_backends,
+                           document_profile, get_backend, pick_backend)
+from .text_utils import estimate_tokens
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
 logger = logging.getLogger(__name__)
 
+# Documents shorter than this are extracted in-process; the pool round trip is not worth it
+PARALLEL_MIN_PAGES = 16
+
+# Page batches handed out per worker, so one slow batch does not leave the other cores idle
+BATCHES_PER_WORKER = 4
+
+# BT operator (begin text object) as a whole token between PDF delimiters
+TEXT_OBJECT_PATTERN = re.compile(rb"(?<![^\s()<>\[\]{}/%])BT(?![^\s()<>\[\]{}/%])")
+
+# Pages sampled when benchmarking backends for backend="auto"
+BENCHMARK_SAMPLE_PAGES = 4
+
+# Batches kept in flight per worker; bounds work wasted when a caller stops early
+INFLIGHT_PER_WORKER = 2
+
+# Extra time the parent allows a batch beyond its per-page deadlines before killing the pool
+HARD_DEADLINE_GRACE = 30
+
+_pool = None
+_pool_config = None
+_pool_lock = threading.Lock()
+
+# Per-worker reader cache so consecutive ranges of the same file skip re-parsing the xref table
+_worker_reader = None
+_worker_reader_key = None
+# Per-worker (backend, document) opened on the cached reader's file
+_worker_document = None
+_worker_document_key = None
+
+
+class PageTimeoutError(Exception):
+    """Raised inside a pool worker when a page exceeds its extraction deadline."""
+
+
+def _on_page_timeout(signum, frame):
+    raise PageTimeoutError()
+
+
+def _init_worker(memory_limit=None, cache_fonts=False):
+    """
+    Warm up a pool worker so its first task does not pay for importing pypdf.
+
+    Args:
+        memory_limit (int, optional): Address-space ceiling in bytes applied to the worker
+        cache_fonts (bool): Share decoded fonts across the pages and documents this worker handles
+    """
+    import pypdf  # noqa: F401
+
+    if cache_fonts:
+        install_font_cache()
+
+    if memory_limit:
+        if resource is None:
+            logger.warning("Memory limits are not supported on this platform; ignoring")
+        else:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    if hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, _on_page_timeout)
+
+
+def _open_worker_reader(pdf_path):
+    """Return a PdfReader for pdf_path, reusing the one from the previous task when possible."""
+    global _worker_reader, _worker_reader_key
+
+    stat = os.stat(pdf_path)
+    key = (pdf_path, stat.st_mtime_ns, stat.st_size)
+    if _worker_reader_key != key:
+        _worker_reader = PdfReader(pdf_path)
+        _worker_reader_key = key
+    return _worker_reader
+
+
+def _open_worker_document(pdf_path, backend_name):
+    """Return (reader, backend, document) for pdf_path, reusing the previous task's document when possible."""
+    global _worker_document, _worker_document_key
+
+    reader = _open_worker_reader(pdf_path)
+    key = (_worker_reader_key, backend_name)
+    if _worker_document_key != key:
+        if _worker_document is not None:
+            previous_backend, previous_document = _worker_document
+            try:
+                previous_backend.close(previous_document)
+            except Exception:
+                pass
+        backend = get_backend(backend_name)
+        _worker_document = (backend, backend.open(pdf_path, reader))
+        _worker_document_key = key
+    backend, document = _worker_document
+    return reader, backend, document
+
+
+def _discard_worker_document():
+    """Drop the cached reader and document, e.g. after a page was interrupted mid-parse."""
+    global _worker_reader, _worker_reader_key, _worker_document, _worker_document_key
+
+    if _worker_document is not None:
+        backend, document = _worker_document
+        try:
+            backend.close(document)
+        except Exception:
+            pass
+    _worker_reader = _worker_reader_key = _worker_document = _worker_document_key = None
+
+
+def _benchmark_in_worker(pdf_path, page_indices):
+    """Run benchmark_backends() on a document inside a pool worker."""
+    return benchmark_backends(pdf_path, _open_worker_reader(pdf_path), page_indices)
+
+
+def _extract_pages(pdf_path, page_indices, page_timeout=None, skip_errors=False, sniff_text_layer=True,
+                   backend_name=DEFAULT_BACKEND):
+    """
+    Extract the text of the given pages inside a pool worker.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        page_indices (list): 0-based indices of the pages to extract
+        page_timeout (float, optional): Per-page deadline in seconds
+        skip_errors (bool): Skip pages that time out, exhaust memory or fail to decode
+            instead of failing the whole batch
+        sniff_text_layer (bool): Return "" for pages without a text layer instead of
+            interpreting their content stream
+        backend_name (str): Extraction backend, one of pdf_backends.BACKENDS
+
+    Returns:
+        tuple: (texts, skipped, profiles) where texts holds the text of each requested
+            page in order ("" for skipped pages), skipped lists (index, reason) pairs
+            and profiles holds a (decode_seconds, font_count, has_text_layer) tuple per page
+    """
+    reader, backend, document = _open_worker_document(pdf_path, backend_name)
+    use_alarm = bool(page_timeout) and hasattr(signal, "setitimer")
+    texts = []
+    skipped = []
+    profiles = []
+    for i in page_indices:
+        started = time.perf_counter()
+        has_text_layer = True
+        try:
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL, page_timeout)
+            try:
+                page_text, has_text_layer = _decode_page(reader, i, backend, document, sniff_text_layer)
+                texts.append(page_text)
+            finally:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+                profiles.append((time.perf_counter() - started, _font_count(reader.pages[i]), has_text_layer))
+        except PageTimeoutError:
+            texts.append("")
+            skipped.append((i, f"exceeded {page_timeout}s deadline"))
+        except MemoryError:
+            texts.append("")
+            skipped.append((i, "exceeded memory limit"))
+        except Exception as e:
+            if not skip_errors:
+                _discard_worker_document()
+                raise
+            texts.append("")
+            skipped.append((i, f"failed to decode: {str(e)}"))
+        else:
+            continue
+        # The interrupted page may have left pypdf's lazily resolved objects half built, which
+        # would fail or silently empty the pages after it; start over from a fresh reader
+        _discard_worker_document()
+        reader, backend, document = _open_worker_document(pdf_path, backend_name)
+    return texts, skipped, profiles
+
+
+def _decode_page(reader, index, backend, document, sniff_text_layer=True):
+    """
+    Extract the text of one page, skipping interpretation when it has no text layer.
+
+    Returns:
+        tuple: (text, has_text_layer)
+    """
+    if sniff_text_layer and not page_has_text_layer(reader.pages[index]):
+        return "", False
+    return backend.extract_page(document, index) or "", True
+
+
+def _font_count(page):
+    """Number of fonts in a page's resource dictionary."""
+    try:
+        fonts = page["/Resources"].get_object()["/Font"].get_object()
+    except (KeyError, AttributeError, TypeError):
+        return 0
+    return len(fonts)
+
+
+def _get_pool(max_workers, memory_limit=None, cache_fonts=False):
+    """Return the shared process pool, (re)creating it if its configuration changed."""
+    global _pool, _pool_config
+
+    config = (max_workers, memory_limit, cache_fonts)
+    with _pool_lock:
+        if _pool is None or _pool_config != config:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            logger.info(f"Starting PDF extraction pool with {max_workers} workers")
+            _pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(memory_limit, cache_fonts)
+            )
+            _pool_config = config
+            # Unlike atexit, this also runs when the pool lives inside a multiprocessing child,
+            # which would otherwise hang on exit; the high priority runs it before the pool queues close
+            mp_util.Finalize(_pool, _pool.shutdown, exitpriority=100)
+        return _pool
+
+
+def _reset_pool():
+    """Kill the shared pool's workers, e.g. after a crash or a page stuck past its hard deadline."""
+    global _pool, _pool_config
+
+    with _pool_lock:
+        if _pool is None:
+            return
+        # ProcessPoolExecutor has no public way to stop a busy worker
+        for process in list(getattr(_pool, "_processes", {}).values()):
+            process.terminate()
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_config = None
+
+
+def _split_batches(items, num_batches):
+    """Split items into at most num_batches contiguous, evenly sized lists; none for no items."""
+    if not items:
+        return []
+    num_batches = max(1, min(num_batches, len(items)))
+    size, extra = divmod(len(items), num_batches)
+    batches = []
+    start = 0
+    for i in range(num_batches):
+        stop = start + size + (1 if i < extra else 0)
+        batches.append(items[start:stop])
+        start = stop
+    return batches
+
+
+def select_pages(num_pages, page_range=None, every_nth=1):
+    """
+    Build a page sampling plan.
+
+    Args:
+        num_pages (int): Number of pages in the document
+        page_range (tuple, optional): (first, last) 1-based inclusive page range
+        every_nth (int): Keep every Nth page of the range, starting with its first page
+
+    Returns:
+        list: 0-based indices of the pages to extract, in page order
+    """
+    if every_nth < 1:
+        raise ValueError(f"every_nth must be at least 1, got {every_nth}")
+
+    first, last = page_range if page_range else (1, num_pages)
+    first = max(1, first)
+    last = min(num_pages, last)
+    return list(range(first - 1, last, every_nth))
+
+
+def _raw_stream_bytes(obj):
+    """Return a stream's stored bytes without running its filters (so bombs are never inflated)."""
+    data = getattr(obj, "_data", None)
+    return data if isinstance(data, bytes) else obj.get_data()
+
+
+def _hash_resources(digest, resources, depth=0):
+    """Feed the text-relevant parts of a resource dictionary into digest."""
+    fonts = resources.get("/Font")
+    if fonts is not None:
+        fonts = fonts.get_object()
+        for name in sorted(fonts):
+            # The whole font dictionary with references resolved: /Encoding, /ToUnicode, /Widths
+            # and /DescendantFonts all change the extracted text or its spacing. Embedded font
+            # programs are left out; they do not affect text extraction
+            digest.update(f"font:{name}:".encode("utf-8"))
+            _digest_object(digest, fonts.raw_get(name) if hasattr(fonts, "raw_get") else fonts[name])
+
+    xobjects = resources.get("/XObject")
+    if xobjects is not None and depth < 3:
+        xobjects = xobjects.get_object()
+        for name in sorted(xobjects):
+            xobject = xobjects[name].get_object()
+            # Images carry no text; only form XObjects can change the extracted text
+            if xobject.get("/Subtype") != "/Form":
+                continue
+            digest.update(f"form:{name}".encode("utf-8"))
+            digest.update(_raw_stream_bytes(xobject))
+            if "/Resources" in xobject:
+                _hash_resources(digest, xobject["/Resources"].get_object(), depth + 1)
+
+
+def page_fingerprint(page, variant=""):
+    """
+    Fingerprint a page by its content stream and text-relevant resources.
+
+    Two pages with the same fingerprint produce the same extracted text, so the
+    fingerprint can key a page-level index shared across document revisions.
+    Stream bytes are hashed as stored, without decompressing them.
+
+    Args:
+        page (PageObject): pypdf page
+        variant (str, optional): Extra tag for the extraction backend, which changes the text
+
+    Returns:
+        str: Hex digest identifying the page's text content
+    """
+    digest = hashlib.sha256(f"pypdf{pypdf.__version__}{variant}".encode("utf-8"))
+    contents = page.get("/Contents")
+    if contents is not None:
+        contents = contents.get_object()
+        streams = contents if isinstance(contents, list) else [contents]
+        for stream in streams:
+            digest.update(_raw_stream_bytes(stream.get_object()))
+    resources = page.get("/Resources")
+    if resources is not None:
+        _hash_resources(digest, resources.get_object())
+    return digest.hexdigest()
+
+
+def _form_xobjects(resources):
+    """Yield the form XObjects of a resource dictionary."""
+    xobjects = resources.get("/XObject")
+    if xobjects is None:
+        return
+    xobjects = xobjects.get_object()
+    for name in xobjects:
+        xobject = xobjects[name].get_object()
+        if xobject.get("/Subtype") == "/Form":
+            yield xobject
+
+
+def _form_resources(form, parent_resources):
+    # Forms without their own resources use the resources of the page that draws them
+    resources = form.get("/Resources")
+    return resources.get_object() if resources is not None else parent_resources
+
+
+def _has_fonts(resources, depth=0):
+    """Whether a resource dictionary, or a form XObject it uses, declares any font."""
+    fonts = resources.get("/Font")
+    if fonts is not None and len(fonts.get_object()) > 0:
+        return True
+    if depth >= 3:
+        return False
+    return any(_has_fonts(_form_resources(form, resources), depth + 1) for form in _form_xobjects(resources))
+
+
+def _forms_have_text(resources, depth=0):
+    """Whether a form XObject used by a resource dictionary contains a text object."""
+    if depth >= 3:
+        return False
+    for form in _form_xobjects(resources):
+        if TEXT_OBJECT_PATTERN.search(form.get_data()):
+            return True
+        if _forms_have_text(_form_resources(form, resources), depth + 1):
+            return True
+    return False
+
+
+def page_has_text_layer(page):
+    """
+    Cheaply check whether a page can contain extractable text.
+
+    Text can only be drawn inside a BT/ET text object with a font selected from
+    the resources, so a page without font resources, or whose content streams
+    (including form XObjects) have no BT operator, is image-only. This looks at
+    resource dictionaries and scans the decoded stream bytes; the content
+    stream is never interpreted. When in doubt the page counts as having text.
+
+    Args:
+        page (PageObject): pypdf page
+
+    Returns:
+        bool: False when the page certainly has no text layer
+    """
+    try:
+        resources = page.get("/Resources")
+        resources = resources.get_object() if resources is not None else {}
+        if not _has_fonts(resources):
+            return False
+
+        contents = page.get("/Contents")
+        if contents is None:
+            return False
+        contents = contents.get_object()
+        streams = contents if isinstance(contents, list) else [contents]
+        if any(TEXT_OBJECT_PATTERN.search(stream.get_object().get_data()) for stream in streams):
+            return True
+        return _forms_have_text(resources)
+    except Exception as e:
+        logger.debug(f"Text layer check failed, decoding page anyway: {str(e)}")
+        return True
+
+
+def _image_xobjects(resources, depth=0):
+    """Yield (name, stream) for the image XObjects of a resource dictionary and its forms."""
+    xobjects = resources.get("/XObject")
+    if xobjects is None or depth > 3:
+        return
+    xobjects = xobjects.get_object()
+    for name in sorted(xobjects):
+        xobject = xobjects[name].get_object()
+        subtype = xobject.get("/Subtype")
+        if subtype == "/Image":
+            yield name, xobject
+        elif subtype == "/Form":
+            yield from _image_xobjects(_form_resources(xobject, resources), depth + 1)
+
+
+def is_scanned_page(page):
+    """
+    Whether a page is a scan: it draws images but has no font to draw text with.
+
+    Only resource dictionaries are inspected; no stream is decoded.
+
+    Args:
+        page (PageObject): pypdf page
+
+    Returns:
+        bool: True when the page needs OCR to yield any text
+    """
+    try:
+        resources = page.get("/Resources")
+        if resources is None:
+            return False
+        resources = resources.get_object()
+        return not _has_fonts(resources) and any(True for _ in _image_xobjects(resources))
+    except Exception as e:
+        logger.debug(f"Scanned page check failed: {str(e)}")
+        return False
+
+
+def page_image_hash(page, languages):
+    """
+    Hash the images of a page, as stored, to key its OCR result.
+
+    Args:
+        page (PageObject): pypdf page
+        languages (str): Tesseract languages, which change the OCR result
+
+    Returns:
+        str: Hex digest of the page's image streams
+    """
+    digest = hashlib.sha256(f"ocr:{languages}".encode("utf-8"))
+    for name, image in _image_xobjects(page["/Resources"].get_object()):
+        digest.update(name.encode("utf-8"))
+        digest.update(_raw_stream_bytes(image))
+    return digest.hexdigest()
+
+
+class BufferReader(io.RawIOBase):
+    """Read-only, seekable stream over a buffer that never copies the buffer as a whole."""
+
+    def __init__(self, buffer):
+        """
+        Initialize the stream.
+
+        Args:
+            buffer: Any object supporting the buffer protocol (bytes, bytearray, mmap, memoryview)
+        """
+        super().__init__()
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def close(self):
+        # Release the view so a memory-mapped source can be unmapped
+        self._view.release()
+        super().close()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"Negative seek position {pos}")
+        self._pos = pos
+        return pos
+
+    def readinto(self, target):
+        chunk = self._view[self._pos:self._pos + len(target)]
+        size = len(chunk)
+        target[:size] = chunk
+        self._pos += size
+        return size
+
+
+def _is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+
+def describe_source(source):
+    """Return a short, loggable description of a PDF source."""
+    if _is_path(source):
+        return os.fspath(source)
+    name = getattr(source, "name", None)
+    if isinstance(name, str):
+        return name
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        return f"<{type(source).__name__} of {len(source)} bytes>"
+    return f"<{type(source).__name__}>"
+
+
+@contextmanager
+def open_pdf_buffer(source):
+    """
+    Expose the bytes of a PDF source as a read-only memoryview.
+
+    Paths and real files are memory-mapped, so large documents are neither
+    copied nor loaded into memory up front; in-memory buffers are used as-is.
+    The same view can be hashed for caching and parsed with BufferReader.
+
+    Args:
+        source: Path, bytes-like object, mmap, or binary file-like object
+
+    Yields:
+        memoryview: View over the PDF bytes, valid until the context exits
+    """
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        with memoryview(source) as view, view.cast("B") as flat:
+            yield flat
+        return
+
+    if _is_path(source):
+        with open(source, "rb") as f:
+            with _map_file(f) as view:
+                yield view
+        return
+
+    if hasattr(source, "read"):
+        try:
+            source.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            # Not backed by a real file (e.g. BytesIO, upload streams), so read it into memory
+            getbuffer = getattr(source, "getbuffer", None)
+            data = getbuffer() if getbuffer else source.read()
+            with memoryview(data) as view, view.cast("B") as flat:
+                yield flat
+            return
+        with _map_file(source) as view:
+            yield view
+        return
+
+    raise TypeError(f"Unsupported PDF source type: {type(source).__name__}")
+
+
+@contextmanager
+def _map_file(f):
+    """Memory-map an open binary file read-only and yield a view over it."""
+    if os.fstat(f.fileno()).st_size == 0:
+        # mmap cannot map empty files; let the parser report the empty document
+        yield memoryview(b"")
+        return
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        with memoryview(mapped) as view:
+            yield view
+
+
 class PDFProcessor:
     """Class for extracting text content from PDF files."""
-    
-    def __init__(self):
-        """Initialize the PDF processor."""
-        pass
-    
-    def extract_text(self, pdf_path):
+
+    def __init__(self, max_workers=1, cache=None, page_timeout=None, memory_limit_mb=None, normalizer=None,
+                 page_index=None, sniff_text_layer=True, backend=DEFAULT_BACKEND, ocr_languages=None,
+                 ocr_workers=2, ocr_cache=None, cache_fonts=False):
+        """
+        Initialize the PDF processor.
+
+        Setting page_timeout or memory_limit_mb enables guarded mode: every page is
+        decoded in a sandboxed worker process, and pages that run past the deadline,
+        hit the memory ceiling, fail to decode or crash their worker are skipped and
+        logged while the rest of the document is still returned. Such partial results
+        are not cached, so a later run can recover the missing pages.
+
+        Args:
+            max_workers (int): Number of worker processes used for page extraction
+                (1 = extract in-process, None = one worker per CPU core)
+            cache (TextCache, optional): Cache consulted before parsing and filled afterwards
+            page_timeout (float, optional): Per-page extraction deadline in seconds
+            memory_limit_mb (int, optional): Address-space ceiling for each worker process
+            normalizer (TextNormalizer, optional): Cleanup stage applied to pages as they
+                are decoded, before any budget is counted
+            page_index (PageIndex, optional): Page fingerprint index; pages whose content
+                was seen before (e.g. in an earlier revision) are not decoded again
+            sniff_text_layer (bool): Check each page for text operators and font resources
+                first and skip interpreting image-only (scanned) pages
+            backend (str): Text extraction backend from pdf_backends.BACKENDS, or 'auto'
+                to benchmark the installed backends on a few pages and use the fastest
+                one that produces acceptable text (remembered per kind of document)
+            ocr_languages (str, optional): Tesseract languages (e.g. 'chi_sim+eng'); enables
+                OCR of scanned pages, which runs alongside text-layer extraction of the
+                other pages. Ignored with a warning when Tesseract is not installed.
+            ocr_workers (int): Number of OCR worker processes
+            ocr_cache (PageIndex, optional): Store for OCR results, keyed by page image hash
+            cache_fonts (bool): Decode each embedded font (encoding, ToUnicode CMap, widths)
+                once per process and reuse it for every page and document sharing it,
+                keyed by a hash of the font dictionary and its streams. Opt-in: it patches
+                pypdf internals process-wide; see font_cache.install_font_cache()
+
+        Raises:
+            ValueError: If the backend is unknown or not installed
+        """
+        if backend != "auto":
+            get_backend(backend)
+        self.max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        self.cache = cache
+        self.page_timeout = page_timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.normalizer = normalizer
+        self.page_index = page_index
+        self.sniff_text_layer = sniff_text_layer
+        self.backend = backend
+        if ocr_languages and not ocr.is_available():
+            logger.warning("OCR requested but pytesseract/Pillow/Tesseract is not installed; scanned pages stay empty")
+            ocr_languages = None
+        self.ocr_languages = ocr_languages
+        self.ocr_workers = ocr_workers
+        self.ocr_cache = ocr_cache
+        # Workers only try to install the cache when it installed here, i.e. pypdf is supported
+        self.cache_fonts = bool(cache_fonts) and install_font_cache()
+
+    @property
+    def guarded(self):
+        """Whether pages are decoded in sandboxed workers with time and memory limits."""
+        return bool(self.page_timeout or self.memory_limit_mb)
+
+    def iter_pages(self, source, page_range=None, every_nth=1):
+        """
+        Lazily extract a PDF page by page.
+
+        Pages are yielded as soon as they are decoded (or, in process-pool mode,
+        as soon as their batch completes), so callers can chunk, cache or stream
+        text without holding the whole document in memory. Pages after the point
+        where the caller stops iterating are not decoded.
+
+        Args:
+            source: Path to the PDF file, bytes-like object, mmap, or binary file-like object
+            page_range (tuple, optional): (first, last) 1-based inclusive page range
+            every_nth (int): Only extract every Nth page of the range
+
+        Yields:
+            tuple: (page_number, text) with 1-based page numbers; text is "" for
+                pages without a text layer
+        """
+        with open_pdf_buffer(source) as buffer:
+            pages = self._iter_buffer_pages(source, buffer, page_range, every_nth)
+            if self.normalizer is not None:
+                pages = self.normalizer.process_pages(pages)
+            with closing(pages):
+                yield from pages
+
+    def _iter_buffer_pages(self, source, buffer, page_range, every_nth, stats=None):
+        """Extract pages from an already opened PDF buffer; see iter_pages()."""
+        with BufferReader(buffer) as stream:
+            reader = PdfReader(stream)
+            page_indices = select_pages(len(reader.pages), page_range, every_nth)
+            backend = self._resolve_backend(source, buffer, reader, page_indices)
+            if stats is not None:
+                stats.backend = backend
+
+            if self.page_index is None:
+                pages = self._decode_pages(source, buffer, reader, page_indices, stats, backend)
+            else:
+                pages = self._iter_indexed_pages(source, buffer, reader, page_indices, stats, backend)
+            if self.ocr_languages:
+                pages = self._iter_ocr_pages(source, buffer, reader, page_indices, pages, stats)
+            with closing(pages):
+                yield from pages
+
+    def _resolve_backend(self, source, buffer, reader, page_indices):
+        """
+        Return the backend to extract a document with, benchmarking when set to 'auto'.
+
+        The choice is remembered per document profile (producing tool and font
+        kind), so only the first document of each kind pays for the benchmark.
+        """
+        if self.backend != "auto":
+            return self.backend
+
+        step = max(1, len(page_indices) // BENCHMARK_SAMPLE_PAGES)
+        sample = page_indices[step // 2::step][:BENCHMARK_SAMPLE_PAGES]
+        if not sample:
+            return DEFAULT_BACKEND
+        profile = document_profile(reader, sample)
+        backend = backend_selector.lookup(profile)
+        if backend is not None:
+            return backend
+
+        name = describe_source(source)
+        if self.guarded:
+            # Backends parse untrusted pages too, so the benchmark runs in a sandboxed worker
+            if not _is_path(source):
+                logger.info(f"Backend benchmark for {name} skipped in guarded mode; using {DEFAULT_BACKEND}")
+                return DEFAULT_BACKEND
+            future = self._pool().submit(_benchmark_in_worker, os.fspath(source), sample)
+            deadline = self._batch_deadline(sample)
+            try:
+                results = future.result(timeout=deadline * len(available_backends()) if deadline else None)
+            except (BrokenProcessPool, FuturesTimeoutError) as e:
+                _reset_pool()
+                logger.warning(f"Backend benchmark for {name} failed ({type(e).__name__}); using {DEFAULT_BACKEND}")
+                return DEFAULT_BACKEND
+        else:
+            with BufferReader(buffer) as stream:
+                results = benchmark_backends(stream, reader, sample)
+
+        for result in results:
+            logger.debug(f"Backend {result['name']}: {result['seconds']:.3f}s, {result['chars']} chars, "
+                         f"acceptable={result['acceptable']}, error={result['error']}")
+        if not any(result["chars"] for result in results):
+            # Sampled pages had no text; nothing to judge the backends by
+            return DEFAULT_BACKEND
+        backend = pick_backend(results)
+        backend_selector.remember(profile, backend)
+        logger.info(f"Selected PDF backend {backend} for {name} after benchmarking {len(results)} backends")
+        return backend
+
+    def _decode_pages(self, source, buffer, reader, page_indices, stats=None, backend=DEFAULT_BACKEND):
+        """Decode the given pages in-process or in the worker pool, as configured."""
+        if not page_indices:
+            # A page range past the end of the document, or a document without pages
+            return
+        if self.guarded:
+            # Guarded pages never run in this process; workers open the document by path
+            if _is_path(source):
+                yield from self._iter_pages_parallel(os.fspath(source), page_indices, stats, backend)
+            else:
+                yield from self._iter_spilled_pages(buffer, page_indices, stats, backend)
+            return
+
+        # Pool workers open the document by path, so in-memory sources are extracted in-process
+        if self.max_workers > 1 and len(page_indices) >= PARALLEL_MIN_PAGES and _is_path(source):
+            yield from self._iter_pages_parallel(os.fspath(source), page_indices, stats, backend)
+            return
+
+        num_pages = len(reader.pages)
+        extractor = get_backend(backend)
+        with BufferReader(buffer) as stream:
+            document = extractor.open(stream, reader)
+            try:
+                for i in page_indices:
+                    logger.debug(f"Processing page {i+1}/{num_pages}")
+                    started = time.perf_counter()
+                    page_text, has_text_layer = _decode_page(reader, i, extractor, document, self.sniff_text_layer)
+                    if stats is not None:
+                        stats.add_page(PageStats(i + 1, time.perf_counter() - started, len(page_text),
+                                                 _font_count(reader.pages[i]), has_text_layer,
+                                                 "decoded" if has_text_layer else "image-only"))
+                    yield i + 1, page_text
+            finally:
+                extractor.close(document)
+
+    def _iter_indexed_pages(self, source, buffer, reader, page_indices, stats=None, backend=DEFAULT_BACKEND):
+        """
+        Yield pages from the page index where possible and decode only the rest.
+
+        Args:
+            source: The PDF source, as passed to iter_pages()
+            buffer (memoryview): Opened PDF bytes
+            reader (PdfReader): Reader over buffer
+            page_indices (list): 0-based indices of the pages to extract, in order
+            stats (ExtractionStats, optional): Receives a profile for each page
+            backend (str): Extraction backend; pages are indexed separately per backend
+
+        Yields:
+            tuple: (page_number, text) in page order
+        """
+        variant = get_backend(backend).cache_tag()
+        fingerprints = {i: page_fingerprint(reader.pages[i], variant) for i in page_indices}
+        known = self.page_index.get_many(fingerprints.values())
+        missing = [i for i in page_indices if fingerprints[i] not in known]
+        logger.info(f"Page index matched {len(page_indices) - len(missing)} of {len(page_indices)} pages; "
+                    f"decoding {len(missing)}")
+
+        decoded = self._decode_pages(source, buffer, reader, missing, stats, backend)
+        new_entries = {}
+        try:
+            for i in page_indices:
+                fingerprint = fingerprints[i]
+                if fingerprint in known:
+                    page_text = known[fingerprint]
+                    if stats is not None:
+                        stats.add_page(PageStats(i + 1, 0.0, len(page_text), _font_count(reader.pages[i]),
+                                                 bool(page_text.strip()), "indexed"))
+                    yield i + 1, page_text
+                    continue
+
+                page_number, page_text = next(decoded)
+                # Empty text may be a page skipped by guarded mode, so it is never indexed
+                if page_text:
+                    new_entries[fingerprint] = page_text
+                    if len(new_entries) >= 64:
+                        self.page_index.put_many(new_entries)
+                        new_entries = {}
+                yield page_number, page_text
+        finally:
+            decoded.close()
+            if new_entries:
+                self.page_index.put_many(new_entries)
+
+    def extract_text(self, source, max_chars=None, max_tokens=None, page_range=None, every_nth=1):
         """
         Extract text from a PDF file.
-        
+
+        When a character or token budget is given, pages are decoded only until
+        the budget is full and the result is cut to fit it.
+
         Args:
-            pdf_path (str): Path to the PDF file
-            
+            source: Path to the PDF file, bytes-like object, mmap, or binary file-like object
+            max_chars (int, optional): Stop once this many characters are extracted
+            max_tokens (int, optional): Stop once this many estimated tokens are extracted
+            page_range (tuple, optional): (first, last) 1-based inclusive page range
+            every_nth (int): Only extract every Nth page of the range
+
         Returns:
             str: Extracted text from the PDF
         """
-        logger.info(f"Extracting text from {pdf_path}")
-        
-        try:
-            reader = PdfReader(pdf_path)
-            text = ""
-            
-            # Process each page
-            for i, page in enumerate(reader.pages):
-                logger.debug(f"Processing page {i+1}/{len(reader.pages)}")
-                page_text = page.extract_text()
-                
-                if page_text:
-                    text += page_text + "\n\n"
-                    
-            logger.info(f"Successfully extracted {len(reader.pages)} pages from {pdf_path}")
-            
-            if not text.strip():
-                logger.warning(f"No text content extracted from {pdf_path}")
-                
-            return text
-            
+        text, _ = self.extract_text_with_stats(source, max_chars, max_tokens, page_range, every_nth)
+        return text
+
+    def extract_text_with_stats(self, source, max_chars=None, max_tokens=None, page_range=None, every_nth=1):
+        """
+        Extract text from a PDF file and profile every page; see extract_page_text().
+
+        Returns:
+            tuple: (text, ExtractionStats)
+        """
+        page_text, stats = self.extract_page_text(source, max_chars, max_tokens, page_range, every_nth)
+        return page_text.text, stats
+
+    def extract_page_text(self, source, max_chars=None, max_tokens=None, page_range=None, every_nth=1):
+        """
+        Extract text from a PDF file into a page-indexed buffer and profile every page.
+
+        The text is stored once, as UTF-8 with per-page offsets, so callers can
+        take zero-copy views by page or character range, and it is cached in
+        that form.
+
+        Args:
+            source: Path to the PDF file, bytes-like object, mmap, or binary file-like object
+            max_chars (int, optional): Stop once this many characters are extracted
+            max_tokens (int, optional): Stop once this many estimated tokens are extracted
+            page_range (tuple, optional): (first, last) 1-based inclusive page range
+            every_nth (int): Only extract every Nth page of the range
+
+        Returns:
+            tuple: (PageText, ExtractionStats) where the stats hold the decode time,
+                character count, font count and text-layer presence of each page
+        """
+        name = describe_source(source)
+        logger.info(f"Extracting text from {name}")
+        stats = ExtractionStats(name)
+        started = time.perf_counter()
+
+        try:
+            with open_pdf_buffer(source) as buffer:
+                cache_key = None
+                if self.cache is not None:
+                    variant = ""
+                    if max_chars or max_tokens or page_range or every_nth != 1:
+                        variant = f"chars={max_chars};tokens={max_tokens};range={page_range};nth={every_nth}"
+                    if self.normalizer is not None:
+                        variant += ";" + self.normalizer.cache_tag()
+                    if self.ocr_languages:
+                        variant += f";ocr={self.ocr_languages}"
+                    if self.backend != DEFAULT_BACKEND:
+                        tag = "auto" if self.backend == "auto" else get_backend(self.backend).cache_tag()
+                        variant += f";backend={tag}"
+                    # Hash the same mapped buffer that is parsed below, so the file is read once
+                    cache_key = self.cache.key_for_buffer(buffer, variant)
+                    cached = self.cache.get_page_text(cache_key)
+                    if cached is not None:
+                        logger.info(f"Loaded {len(cached)} characters for {name} from cache")
+                        stats.from_cache = True
+                        stats.total_seconds = time.perf_counter() - started
+                        return cached, stats
+
+                pages = self._iter_buffer_pages(source, buffer, page_range, every_nth, stats)
+                normalizer_stats = stats.normalizer
+                if self.normalizer is not None:
+                    pages = self.normalizer.process_pages(pages, normalizer_stats)
+
+                parts = []
+                num_pages = 0
+                total_chars = 0
+                total_tokens = 0
+                budget_reached = False
+                with closing(pages):
+                    for page_number, page_text in pages:
+                        num_pages += 1
+                        if not page_text:
+                            continue
+
+                        if max_chars is not None and total_chars + len(page_text) + len(PAGE_SEPARATOR) >= max_chars:
+                            page_text = page_text[:max(0, max_chars - total_chars)]
+                            budget_reached = True
+                        if max_tokens is not None:
+                            page_tokens = estimate_tokens(page_text)
+                            if total_tokens + page_tokens >= max_tokens:
+                                page_text = self._truncate_to_tokens(page_text, max(0, max_tokens - total_tokens))
+                                budget_reached = True
+                            total_tokens += page_tokens
+
+                        parts.append((page_number, page_text))
+                        total_chars += len(page_text) + len(PAGE_SEPARATOR)
+
+                        if budget_reached:
+                            logger.info(f"Extraction budget reached at page {page_number}; skipping remaining pages")
+                            break
+                # The separator after the cut page would push the text past max_chars
+                result = PageText.from_pages(parts, ends_with_separator=not budget_reached)
+            stats.budget_reached = budget_reached
+            stats.total_seconds = time.perf_counter() - started
+
+            logger.info(f"Successfully extracted {num_pages} pages from {name}")
+            image_only = stats.count("image-only")
+            if image_only:
+                logger.info(f"Skipped {image_only} image-only pages without a text layer in {name}")
+            if normalizer_stats.get("chars_saved"):
+                logger.info(f"Normalization removed {normalizer_stats['lines_removed']} boilerplate lines "
+                            f"and saved {normalizer_stats['chars_saved']} characters "
+                            f"(~{normalizer_stats['tokens_saved']} tokens) in total")
+
+            if not result.text.strip():
+                logger.warning(f"No text content extracted from {name}")
+
+            # Pages lost to a deadline, the memory ceiling, a crash or failed OCR may succeed
+            # next time; caching the text would make the gap permanent
+            incomplete = stats.count("skipped") + stats.count("ocr-failed")
+            if incomplete:
+                logger.warning(f"{incomplete} pages of {name} could not be extracted; not caching its text")
+            elif cache_key is not None:
+                self.cache.put_page_text(cache_key, result)
+
+            return result, stats
+
         except Exception as e:
-            logger.error(f"Error extracting text from {pdf_path}: {str(e)}")
+            logger.error(f"Error extracting text from {name}: {str(e)}")
             raise
+
+    @staticmethod
+    def _truncate_to_tokens(text, max_tokens):
+        """Cut text to the longest prefix whose estimated token count fits max_tokens."""
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if estimate_tokens(text[:mid]) <= max_tokens:
+                low = mid
+            else:
+                high = mid - 1
+        return text[:low]
+
+    def _iter_ocr_pages(self, source, buffer, reader, page_indices, pages, stats=None):
+        """
+        Fill in the text of scanned pages by OCR.
+
+        Scanned pages are found up front and submitted to the OCR pool at once,
+        so recognition runs while the other pages are still being decoded; the
+        results are merged into the page stream in order.
+
+        Args:
+            source: The PDF source, as passed to iter_pages()
+            buffer (memoryview): Opened PDF bytes
+            reader (PdfReader): Reader over buffer
+            page_indices (list): 0-based indices of the pages being extracted
+            pages (iterator): (page_number, text) pairs from text-layer extraction
+            stats (ExtractionStats, optional): Page profiles to update with OCR results
+
+        Yields:
+            tuple: (page_number, text) in page order
+        """
+        scanned = [i for i in page_indices if is_scanned_page(reader.pages[i])]
+        if not scanned:
+            yield from pages
+            return
+
+        hashes = {i: page_image_hash(reader.pages[i], self.ocr_languages) for i in scanned}
+        known = self.ocr_cache.get_many(hashes.values()) if self.ocr_cache is not None else {}
+        missing = [i for i in scanned if hashes[i] not in known]
+        logger.info(f"Found {len(scanned)} scanned pages; {len(scanned) - len(missing)} OCR results cached, "
+                    f"recognizing {len(missing)}")
+
+        tmp_path = None
+        futures = {}
+        new_entries = {}
+        try:
+            if missing:
+                if _is_path(source):
+                    pdf_path = os.fspath(source)
+                else:
+                    # OCR workers open the document by path, like the guarded extraction workers
+                    fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(buffer)
+                    pdf_path = tmp_path
+                memory_limit = self.memory_limit_mb * 1024 * 1024 if self.memory_limit_mb else None
+                pool = ocr.get_ocr_pool(self.ocr_workers, memory_limit)
+                for i in missing:
+                    futures[i] = pool.submit(ocr.ocr_page, pdf_path, i, self.ocr_languages, self.page_timeout)
+
+            with closing(pages):
+                for page_number, page_text in pages:
+                    index = page_number - 1
+                    if index in hashes and not page_text:
+                        seconds = 0.0
+                        status = "ocr-cached" if hashes[index] in known else "ocr"
+                        if index in futures:
+                            page_text, seconds = self._ocr_result(futures.pop(index), page_number)
+                            if page_text is None:
+                                page_text, status = "", "ocr-failed"
+                            elif page_text:
+                                new_entries[hashes[index]] = page_text
+                        else:
+                            page_text = known[hashes[index]]
+                        if stats is not None:
+                            stats.update_page(page_number, seconds=seconds, chars=len(page_text), status=status)
+                    yield page_number, page_text
+        finally:
+            for future in futures.values():
+                future.cancel()
+            if new_entries and self.ocr_cache is not None:
+                try:
+                    self.ocr_cache.put_many(new_entries)
+                except Exception as e:
+                    logger.warning(f"Could not store OCR results: {str(e)}")
+            if tmp_path is not None:
+                # Queued jobs were cancelled above; a running one keeps its open file on POSIX
+                os.remove(tmp_path)
+
+    def _ocr_result(self, future, page_number):
+        """Wait for one OCR job; a failure returns (None, 0.0) so only the page, not the document, is lost."""
+        try:
+            return future.result(timeout=self._batch_deadline([page_number]))
+        except BrokenProcessPool:
+            ocr.reset_ocr_pool()
+            logger.warning(f"OCR worker crashed on page {page_number}; leaving it empty")
+        except FuturesTimeoutError:
+            ocr.reset_ocr_pool()
+            logger.warning(f"OCR of page {page_number} exceeded its deadline; leaving it empty")
+        except Exception as e:
+            logger.warning(f"OCR of page {page_number} failed: {str(e)}")
+        return None, 0.0
+
+    def _iter_spilled_pages(self, buffer, page_indices, stats=None, backend=DEFAULT_BACKEND):
+        """Write an in-memory PDF to a temp file so guarded workers can open it by path."""
+        fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(buffer)
+            yield from self._iter_pages_parallel(tmp_path, page_indices, stats, backend)
+        finally:
+            os.remove(tmp_path)
+
+    def _pool(self):
+        memory_limit = self.memory_limit_mb * 1024 * 1024 if self.memory_limit_mb else None
+        return _get_pool(self.max_workers, memory_limit, self.cache_fonts)
+
+    def _batch_deadline(self, batch):
+        """Parent-side deadline for a batch; backstops page deadlines the worker could not enforce."""
+        if not self.page_timeout:
+            return None
+        return self.page_timeout * len(batch) + HARD_DEADLINE_GRACE
+
+    def _iter_pages_parallel(self, pdf_path, page_indices, stats=None, backend=DEFAULT_BACKEND):
+        """
+        Extract pages using the shared process pool.
+
+        Only a bounded window of batches is in flight at a time, so a caller
+        that stops early (e.g. on a budget) leaves the remaining pages unparsed.
+
+        Args:
+            pdf_path (str): Path to the PDF file; each worker opens it independently
+            page_indices (list): 0-based indices of the pages to extract, in order
+            stats (ExtractionStats, optional): Receives a profile for each page
+            backend (str): Extraction backend the workers decode with
+
+        Yields:
+            tuple: (page_number, text) in page order
+        """
+        if not page_indices:
+            return
+        pool = self._pool()
+        batches = deque(_split_batches(page_indices, self.max_workers * BATCHES_PER_WORKER))
+        window = self.max_workers * INFLIGHT_PER_WORKER
+        logger.info(f"Extracting {len(page_indices)} pages in {len(batches)} batches across {self.max_workers} workers")
+
+        pending = deque()
+        try:
+            while batches or pending:
+                # Keep the window full, then collect the oldest batch to keep pages ordered
+                while batches and len(pending) < window:
+                    batch = batches.popleft()
+                    future = pool.submit(_extract_pages, pdf_path, batch, self.page_timeout, self.guarded,
+                                         self.sniff_text_layer, backend)
+                    pending.append((batch, future))
+
+                batch, future = pending.popleft()
+                try:
+                    texts, skipped, profiles = future.result(timeout=self._batch_deadline(batch))
+                except (BrokenProcessPool, FuturesTimeoutError) as e:
+                    if not self.guarded:
+                        raise
+                    logger.warning(f"Worker failed on pages {batch[0]+1}-{batch[-1]+1} "
+                                   f"({type(e).__name__}); retrying them one by one")
+                    # Batches in flight die with the pool, so queue them again after this one
+                    for other_batch, other_future in reversed(pending):
+                        other_future.cancel()
+                        batches.appendleft(other_batch)
+                    pending.clear()
+                    _reset_pool()
+                    texts, skipped, profiles = self._isolate_pages(pdf_path, batch, backend)
+                    pool = self._pool()
+
+                skip_reasons = dict(skipped)
+                for index, reason in skipped:
+                    logger.warning(f"Skipped page {index+1} of {pdf_path}: {reason}")
+                for index, page_text, (seconds, fonts, has_text_layer) in zip(batch, texts, profiles):
+                    if stats is not None:
+                        if index in skip_reasons:
+                            status = "skipped"
+                        else:
+                            status = "decoded" if has_text_layer else "image-only"
+                        stats.add_page(PageStats(index + 1, seconds, len(page_text), fonts,
+                                                 has_text_layer, status, skip_reasons.get(index, "")))
+                    yield index + 1, page_text
+                logger.debug(f"Processed pages {batch[0]+1}-{batch[-1]+1}")
+        finally:
+            # A consumer that stops early should not leave queued batches running
+            for _, future in pending:
+                future.cancel()
+
+    def _isolate_pages(self, pdf_path, page_indices, backend=DEFAULT_BACKEND):
+        """
+        Extract pages one at a time so a page that kills its worker only loses itself.
+
+        Args:
+            pdf_path (str): Path to the PDF file
+            page_indices (list): 0-based indices of the pages to extract
+            backend (str): Extraction backend the workers decode with
+
+        Returns:
+            tuple: (texts, skipped, profiles) as returned by _extract_pages()
+        """
+        texts = []
+        skipped = []
+        profiles = []
+        for index in page_indices:
+            started = time.perf_counter()
+            future = self._pool().submit(_extract_pages, pdf_path, [index], self.page_timeout, True,
+                                         self.sniff_text_layer, backend)
+            try:
+                page_texts, page_skipped, page_profiles = future.result(timeout=self._batch_deadline([index]))
+            except BrokenProcessPool:
+                _reset_pool()
+                page_texts, page_skipped = [""], [(index, "worker process crashed")]
+                page_profiles = [(time.perf_counter() - started, 0, True)]
+            except FuturesTimeoutError:
+                _reset_pool()
+                page_texts, page_skipped = [""], [(index, "exceeded hard deadline")]
+                page_profiles = [(time.perf_counter() - started, 0, True)]
+            texts.extend(page_texts)
+            skipped.extend(page_skipped)
+            profiles.extend(page_profiles)
+        return texts, skipped, profiles
@@ -0,0 +1,439 @@
+"""
+PDF Worker Module
+
+This module handles a service of long-lived, resource-limited worker processes
+that parse untrusted PDF uploads outside the application process. Each worker
+talks to the application over its own pipe; a worker that crashes, runs out of
+memory or CPU time, or misses its deadline fails only the request it was
+running and is replaced before the next one. Log records of a worker travel
+back over the same pipe and are handled by the application's own loggers.
+"""
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import pickle
+import queue
+import signal
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import util as mp_util
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Frame header: kind, request id; the rest of the frame is a pickle
+FRAME_HEADER = struct.Struct("<BI")
+FRAME_CALL = 0
+FRAME_RESULT = 1
+FRAME_ERROR = 2
+FRAME_STOP = 3
+FRAME_LOG = 4
+
+# How often idle dispatcher threads and workers check for shutdown or a dead parent
+IDLE_POLL_SECONDS = 0.5
+
+
+class WorkerCrashedError(RuntimeError):
+    """Raised for a request whose worker process died before answering it."""
+
+
+class WorkerTimeoutError(TimeoutError):
+    """Raised for a request that ran past the service's deadline; its worker is killed."""
+
+
+def _encode_frame(kind, request_id, payload):
+    return FRAME_HEADER.pack(kind, request_id) + pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode_frame(data):
+    kind, request_id = FRAME_HEADER.unpack_from(data)
+    return kind, request_id, pickle.loads(memoryview(data)[FRAME_HEADER.size:])
+
+
+def _limit_cpu(seconds):
+    """Allow the calling process `seconds` more CPU time from now; past it, SIGXCPU kills it."""
+    used = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(used.ru_utime + used.ru_stime + seconds) + 1
+    # Only the soft limit moves: an unprivileged process cannot raise its hard limit again
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+class _PipeLogHandler(logging.handlers.QueueHandler):
+    """
+    Sends the log records of a worker to the parent as FRAME_LOG frames.
+
+    Records are prepared like for a QueueHandler (message formatted, arguments
+    and traceback objects dropped) so they can be pickled. Processes the worker
+    forks, such as its page pools, inherit the handler but not the right to
+    write to the pipe; their records go to stderr as before.
+    """
+
+    def __init__(self, conn, send_lock):
+        """
+        Initialize the handler.
+
+        Args:
+            conn (Connection): The worker's end of the pipe
+            send_lock (threading.Lock): Lock serializing writes to the pipe
+        """
+        super().__init__(None)
+        self.conn = conn
+        self.send_lock = send_lock
+        self.request_id = 0
+        self.pid = os.getpid()
+        self.stderr = logging.StreamHandler()
+
+    def enqueue(self, record):
+        if os.getpid() != self.pid:
+            self.stderr.handle(record)
+            return
+        frame = _encode_frame(FRAME_LOG, self.request_id, record)
+        with self.send_lock:
+            self.conn.send_bytes(frame)
+
+
+def _forward_logs(conn, send_lock, log_level):
+    """
+    Route every log record of this worker to the parent.
+
+    Handlers inherited from a forked parent are removed: they would write to the
+    parent's console and log buffers a second time once the record is forwarded.
+    Every logger propagates to the forwarding handler; the parent applies its own
+    propagation settings when it handles the record.
+
+    Returns:
+        _PipeLogHandler: The installed handler
+    """
+    for existing in list(logging.root.manager.loggerDict.values()):
+        if isinstance(existing, logging.Logger):
+            existing.handlers = []
+            existing.propagate = True
+    handler = _PipeLogHandler(conn, send_lock)
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(log_level)
+    return handler
+
+
+def _worker_main(conn, parent_pid, memory_limit=None, cpu_limit=None, log_level=logging.INFO):
+    """
+    Serve calls from the parent until told to stop or the parent goes away.
+
+    Args:
+        conn (Connection): This worker's end of the pipe
+        parent_pid (int): Process id of the application
+        memory_limit (int, optional): Address-space ceiling in bytes
+        cpu_limit (float, optional): CPU seconds allowed per request
+        log_level (int): Level of the records forwarded to the parent
+    """
+    if hasattr(os, "setpgid"):
+        # Own process group, so a kill also reaches the page and OCR pools this worker starts
+        os.setpgid(0, 0)
+    if resource is not None and memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    # The parent handles Ctrl+C; workers are stopped through the pipe
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    send_lock = threading.Lock()
+    log_handler = _forward_logs(conn, send_lock, log_level)
+
+    while True:
+        try:
+            # Forked siblings may hold the parent's end of the pipe open, so EOF alone is not enough
+            while not conn.poll(IDLE_POLL_SECONDS):
+                if os.getppid() != parent_pid:
+                    return
+            kind, request_id, payload = _decode_frame(conn.recv_bytes())
+        except EOFError:
+            return
+        if kind == FRAME_STOP:
+            return
+
+        log_handler.request_id = request_id
+        if resource is not None and cpu_limit:
+            _limit_cpu(cpu_limit)
+        exhausted = False
+        try:
+            fn, args, kwargs = payload
+            frame = _encode_frame(FRAME_RESULT, request_id, fn(*args, **kwargs))
+        except MemoryError:
+            frame = _encode_frame(FRAME_ERROR, request_id, MemoryError("PDF worker reached its memory limit"))
+            exhausted = True
+        except BaseException as e:
+            try:
+                frame = _encode_frame(FRAME_ERROR, request_id, e)
+            except Exception:
+                # The exception itself cannot be pickled; send its text instead
+                frame = _encode_frame(FRAME_ERROR, request_id, RuntimeError(f"{type(e).__name__}: {str(e)}"))
+        with send_lock:
+            conn.send_bytes(frame)
+        if exhausted:
+            # The heap may be fragmented or half-torn down; start over in a fresh process
+            return
+
+
+class _Worker:
+    """A worker process and the parent's end of its pipe."""
+
+    def __init__(self, context, memory_limit, cpu_limit):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, os.getpid(), memory_limit, cpu_limit, logging.getLogger().getEffectiveLevel()),
+            name="pdf-worker",
+        )
+        self.process.start()
+        child_conn.close()
+        self.requests = 0
+
+    def describe_exit(self):
+        """Explain why the process ended, for error messages."""
+        self.process.join(1)
+        code = self.process.exitcode
+        if code is None:
+            return "unresponsive"
+        if code < 0:
+            try:
+                return f"killed by {signal.Signals(-code).name}"
+            except ValueError:
+                return f"killed by signal {-code}"
+        return f"exited with code {code}"
+
+    def stop(self):
+        """Ask the worker to exit after its current request."""
+        try:
+            self.conn.send_bytes(FRAME_HEADER.pack(FRAME_STOP, 0))
+        except (OSError, ValueError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        """Kill the worker and everything it started."""
+        if self.process.pid is not None and hasattr(os, "killpg"):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+
+class PDFWorkerService:
+    """
+    Pool of long-lived worker processes for parsing untrusted PDFs.
+
+    Calls are submitted like with an executor and run in a worker with an
+    address-space ceiling (RLIMIT_AS) and a per-request CPU budget
+    (RLIMIT_CPU). Workers keep their caches (open readers, decoded fonts,
+    page pools) between requests and are replaced after max_requests calls,
+    after a crash and after a missed deadline. What a call logs in the worker
+    is handled by the application's logger of the same name while the call
+    runs, so handlers attached in the application see it.
+    """
+
+    def __init__(self, num_workers=2, memory_limit_mb=None, cpu_limit=None, timeout=None, max_requests=200):
+        """
+        Initialize the service; worker processes are started on first use.
+
+        Args:
+            num_workers (int): Number of worker processes (and concurrent requests)
+            memory_limit_mb (int, optional): Address-space ceiling of each worker in MB
+            cpu_limit (float, optional): CPU seconds a single request may use
+            timeout (float, optional): Wall-clock seconds a single request may take
+            max_requests (int, optional): Requests a worker serves before it is replaced
+                (None = never)
+        """
+        self.num_workers = num_workers
+        self.memory_limit = memory_limit_mb * 1024 * 1024 if memory_limit_mb else None
+        self.cpu_limit = cpu_limit
+        self.timeout = timeout
+        self.max_requests = max_requests
+        if (memory_limit_mb or cpu_limit) and resource is None:
+            logger.warning("Worker resource limits are not supported on this platform; ignoring")
+        self._context = multiprocessing.get_context()
+        self._jobs = queue.Queue()
+        self._threads = []
+        self._workers = set()
+        self._lock = threading.Lock()
+        self._request_ids = iter(range(1, 2 ** 32))
+        self._shutdown = False
+        # Workers are not daemons (they start page pools of their own), so stop them before
+        # multiprocessing joins its children at exit
+        mp_util.Finalize(self, self.shutdown, kwargs={"wait": False}, exitpriority=100)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) in a worker process.
+
+        fn, its arguments and its result must be picklable.
+
+        Args:
+            fn (callable): Function or bound method to call
+            *args: Positional arguments for fn
+            **kwargs: Keyword arguments for fn
+
+        Returns:
+            Future: Resolves to the result, or to the exception raised in the worker,
+                WorkerCrashedError or WorkerTimeoutError
+
+        Raises:
+            RuntimeError: If the service has been shut down
+        """
+        future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("PDF worker service has been shut down")
+            if len(self._threads) < self.num_workers:
+                thread = threading.Thread(target=self._dispatch, name="pdf-worker-dispatch", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            request_id = next(self._request_ids)
+        self._jobs.put((future, request_id, fn, args, kwargs))
+        return future
+
+    def _start_worker(self):
+        worker = _Worker(self._context, self.memory_limit, self.cpu_limit)
+        with self._lock:
+            self._workers.add(worker)
+        logger.debug(f"Started PDF worker {worker.process.pid}")
+        return worker
+
+    def _discard_worker(self, worker, kill=True):
+        with self._lock:
+            self._workers.discard(worker)
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+
+    def _dispatch(self):
+        """Feed queued requests to one worker process, replacing it as needed."""
+        worker = None
+        try:
+            while True:
+                try:
+                    job = self._jobs.get(timeout=IDLE_POLL_SECONDS)
+                except queue.Empty:
+                    if self._shutdown:
+                        return
+                    continue
+                if job is None:
+                    return
+                future, request_id, fn, args, kwargs = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+
+                if worker is not None and not worker.process.is_alive():
+                    self._discard_worker(worker)
+                    worker = None
+                if worker is None:
+                    try:
+                        worker = self._start_worker()
+                    except Exception as e:
+                        future.set_exception(e)
+                        continue
+
+                worker = self._run(worker, future, request_id, fn, args, kwargs)
+                if worker is not None and self.max_requests and worker.requests >= self.max_requests:
+                    logger.debug(f"Recycling PDF worker {worker.process.pid} after {worker.requests} requests")
+                    self._discard_worker(worker, kill=False)
+                    worker = None
+        finally:
+            if worker is not None:
+                self._discard_worker(worker, kill=False)
+
+    def _run(self, worker, future, request_id, fn, args, kwargs):
+        """
+        Send one request to worker and resolve its future.
+
+        Returns:
+            _Worker: The worker if it can take more requests, otherwise None
+        """
+        try:
+            worker.conn.send_bytes(_encode_frame(FRAME_CALL, request_id, (fn, args, kwargs)))
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            future.set_exception(e)
+            return worker
+        except (OSError, ValueError):
+            future.set_exception(WorkerCrashedError(f"PDF worker {worker.describe_exit()} before the request"))
+            self._discard_worker(worker)
+            return None
+        worker.requests += 1
+
+        deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+        try:
+            while True:
+                remaining = None if deadline is None else max(0, deadline - time.monotonic())
+                if not worker.conn.poll(remaining):
+                    logger.warning(f"PDF worker {worker.process.pid} exceeded {self.timeout}s; killing it")
+                    self._discard_worker(worker)
+                    future.set_exception(WorkerTimeoutError(f"PDF processing exceeded {self.timeout}s"))
+                    return None
+                kind, response_id, payload = _decode_frame(worker.conn.recv_bytes())
+                if kind != FRAME_LOG:
+                    break
+                if response_id == request_id:
+                    logging.getLogger(payload.name).handle(payload)
+        except (EOFError, OSError):
+            reason = worker.describe_exit()
+            logger.warning(f"PDF worker {worker.process.pid} {reason} while processing a request")
+            self._discard_worker(worker)
+            future.set_exception(WorkerCrashedError(f"PDF worker {reason} while processing the document"))
+            return None
+
+        if response_id != request_id:
+            # Should not happen with one request in flight per worker; do not trust this worker again
+            self._discard_worker(worker)
+            future.set_exception(WorkerCrashedError("PDF worker answered out of turn"))
+            return None
+        if kind == FRAME_ERROR:
+            future.set_exception(payload)
+        else:
+            future.set_result(payload)
+        if not worker.process.is_alive() or (kind == FRAME_ERROR and isinstance(payload, MemoryError)):
+            # The worker exits after running out of memory
+            self._discard_worker(worker)
+            return None
+        return worker
+
+    def shutdown(self, wait=True):
+        """
+        Stop accepting requests and stop the workers.
+
+        Args:
+            wait (bool): Wait for queued and running requests to finish first
+        """
+        with self._lock:
+            self._shutdown = True
+            threads = list(self._threads)
+        if not wait:
+            while True:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is not None:
+                    job[0].cancel()
+        for _ in threads:
+            self._jobs.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+        else:
+            with self._lock:
+                workers = list(self._workers)
+            for worker in workers:
+                self._discard_worker(worker)
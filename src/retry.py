@@ -0,0 +1,312 @@
+"""
+Retry Module
+
+This module handles retries of model calls that fail for transient reasons:
+throttling, service unavailability, timeouts and dropped connections. Failed
+calls are classified as retryable or fatal, retried with exponential backoff
+and full jitter, and charged to a per-job retry budget so that an overloaded
+service is not hit by a growing storm of retries. Every retry is counted in
+process-wide metrics.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+
+logger = logging.getLogger(__name__)
+
+# Error codes worth another attempt, compared case-insensitively: ConverseStream reports
+# mid-stream errors with lower-camel-case codes such as 'throttlingException'
+RETRYABLE_ERROR_CODES = frozenset(code.lower() for code in (
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "InternalServerException",
+    "ModelNotReadyException",
+    "ModelTimeoutException",
+    "ModelStreamErrorException",
+    "RequestTimeout",
+    "RequestTimeoutException",
+))
+RETRYABLE_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+
+# Attempts per call, including the first, and backoff bounds in seconds
+MAX_ATTEMPTS = int(os.environ.get("BEDROCK_RETRY_ATTEMPTS", "6"))
+BASE_DELAY = float(os.environ.get("BEDROCK_RETRY_BASE_DELAY", "1"))
+MAX_DELAY = float(os.environ.get("BEDROCK_RETRY_MAX_DELAY", "30"))
+
+# Retries a job may spend: a floor plus a share of its calls
+RETRY_BUDGET_MIN = int(os.environ.get("BEDROCK_RETRY_BUDGET_MIN", "10"))
+RETRY_BUDGET_RATIO = float(os.environ.get("BEDROCK_RETRY_BUDGET_RATIO", "0.5"))
+
+
+def error_code(error):
+    """
+    Return the error code of a failed call, for logs and metrics.
+
+    Args:
+        error (Exception): The error raised by the call
+
+    Returns:
+        str: The AWS error code, or the exception class name
+    """
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") or "Unknown"
+    return type(error).__name__
+
+
+def is_retryable(error):
+    """
+    Classify an error of a model call as transient (retryable) or fatal.
+
+    Throttling, unavailability, server errors, timeouts and dropped connections
+    are retryable; validation, access and quota errors are not, since sending
+    the same request again gives the same answer.
+
+    Args:
+        error (Exception): The error raised by the call
+
+    Returns:
+        bool: True if the call may succeed when repeated
+    """
+    if isinstance(error, ClientError):
+        if error_code(error).lower() in RETRYABLE_ERROR_CODES:
+            return True
+        return error.response.get("ResponseMetadata", {}).get("HTTPStatusCode") in RETRYABLE_STATUS_CODES
+    # Read timeouts and closed connections are HTTPClientErrors; connect timeouts and
+    # unreachable endpoints are ConnectionErrors
+    return isinstance(error, (HTTPClientError, BotoConnectionError, asyncio.TimeoutError))
+
+
+class RetryMetrics:
+    """Thread-safe counters of model call attempts and retries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        self._retries_by_code = Counter()
+
+    def record(self, event, code=None):
+        """
+        Count an event.
+
+        Args:
+            event (str): 'call', 'retry', 'recovered' (succeeded after retrying),
+                'fatal', 'exhausted' (out of attempts) or 'budget_exhausted'
+            code (str, optional): Error code of a retry
+        """
+        with self._lock:
+            self._counts[event] += 1
+            if event == "retry" and code:
+                self._retries_by_code[code] += 1
+
+    def snapshot(self):
+        """
+        Return the current counts.
+
+        Returns:
+            dict: Count of each event, plus 'retries_by_code'
+        """
+        with self._lock:
+            data = dict(self._counts)
+            data["retries_by_code"] = dict(self._retries_by_code)
+        return data
+
+    def reset(self):
+        """Clear all counts."""
+        with self._lock:
+            self._counts.clear()
+            self._retries_by_code.clear()
+
+
+# Process-wide metrics of every Bedrock call
+retry_metrics = RetryMetrics()
+
+
+class RetryBudget:
+    """
+    Retries one job may spend across all of its calls.
+
+    When a service is overloaded every call starts failing at once; a budget
+    keeps the job from multiplying its load by the attempts per call, and
+    makes it fail in bounded time instead of retrying every call to the limit.
+    """
+
+    def __init__(self, retries=RETRY_BUDGET_MIN):
+        """
+        Initialize the budget.
+
+        Args:
+            retries (int): Number of retries the job may spend
+        """
+        self.retries = retries
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_calls(cls, calls):
+        """
+        Size a budget for a job that makes a known number of calls.
+
+        Args:
+            calls (int): Number of calls the job makes
+
+        Returns:
+            RetryBudget: A budget of RETRY_BUDGET_MIN plus RETRY_BUDGET_RATIO retries per call
+        """
+        return cls(RETRY_BUDGET_MIN + int(calls * RETRY_BUDGET_RATIO))
+
+    def try_spend(self):
+        """
+        Take one retry from the budget.
+
+        Returns:
+            bool: False if the budget is used up
+        """
+        with self._lock:
+            if self.spent >= self.retries:
+                return False
+            self.spent += 1
+            return True
+
+    @property
+    def remaining(self):
+        """Retries left in the budget."""
+        return max(0, self.retries - self.spent)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, and the decision whether to retry a failure."""
+
+    def __init__(self, max_attempts=MAX_ATTEMPTS, base_delay=BASE_DELAY, max_delay=MAX_DELAY, metrics=retry_metrics):
+        """
+        Initialize the policy.
+
+        Args:
+            max_attempts (int): Attempts per call, including the first
+            base_delay (float): Backoff ceiling of the first retry, in seconds
+            max_delay (float): Largest backoff ceiling, in seconds
+            metrics (RetryMetrics): Counters to record attempts and retries in
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.metrics = metrics
+
+    def delay(self, attempt):
+        """
+        Seconds to wait before retrying after a failed attempt.
+
+        Full jitter: a uniform draw below the exponential ceiling, so clients
+        throttled at the same moment do not retry at the same moment.
+
+        Args:
+            attempt (int): Number of the failed attempt, starting at 1
+
+        Returns:
+            float: Backoff in seconds
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def retry_delay(self, error, attempt, budget, description):
+        """
+        Decide whether to retry a failed attempt, and record the outcome.
+
+        Args:
+            error (Exception): The error of the attempt
+            attempt (int): Number of the failed attempt, starting at 1
+            budget (RetryBudget or None): The job's retry budget
+            description (str): Name of the call, for logs
+
+        Returns:
+            float or None: Seconds to wait before the next attempt, or None if the
+                error should be raised
+        """
+        code = error_code(error)
+        if not is_retryable(error):
+            self.metrics.record("fatal")
+            return None
+        if attempt >= self.max_attempts:
+            self.metrics.record("exhausted")
+            logger.error(f"{description} failed with {code} after {attempt} attempts")
+            return None
+        if budget is not None and not budget.try_spend():
+            self.metrics.record("budget_exhausted")
+            logger.error(f"{description} failed with {code}; the job's retry budget of {budget.retries} is used up")
+            return None
+        self.metrics.record("retry", code)
+        delay = self.delay(attempt)
+        logger.warning(f"{description} failed with {code} (attempt {attempt}/{self.max_attempts}); "
+                       f"retrying in {delay:.1f}s")
+        return delay
+
+    def call(self, fn, budget=None, description="Bedrock call"):
+        """
+        Call fn, retrying transient failures.
+
+        Args:
+            fn (callable): Function of no arguments making one attempt
+            budget (RetryBudget, optional): The job's retry budget
+            description (str): Name of the call, for logs
+
+        Returns:
+            The result of fn
+
+        Raises:
+            Exception: The last error, if it is fatal or retries are used up
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            self.metrics.record("call")
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self.retry_delay(e, attempt, budget, description)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            if attempt > 1:
+                self.metrics.record("recovered")
+            return result
+
+    async def call_async(self, fn, budget=None, description="Bedrock call"):
+        """
+        Asyncio version of call(); backoff waits without blocking the event loop.
+
+        Args:
+            fn (callable): Coroutine function of no arguments making one attempt
+            budget (RetryBudget, optional): The job's retry budget
+            description (str): Name of the call, for logs
+
+        Returns:
+            The result of fn
+
+        Raises:
+            Exception: The last error, if it is fatal or retries are used up
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            self.metrics.record("call")
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self.retry_delay(e, attempt, budget, description)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            if attempt > 1:
+                self.metrics.record("recovered")
+            return result
+
+
+# Policy used by the Bedrock clients
+default_policy = RetryPolicy()
@@ -0,0 +1,253 @@
+"""
+Section Aligner Module
+
+This module handles alignment of sections between the Chinese and English PDFs
+using their outlines (bookmarks) and page labels.
+"""
+import logging
+import re
+
+from pypdf import PdfReader
+
+from .pdf_processor import BufferReader, describe_source, open_pdf_buffer
+
+logger = logging.getLogger(__name__)
+
+# Leading section numbers such as "3", "3.2.1", "第3章" or "Chapter 3"
+SECTION_NUMBER_PATTERN = re.compile(r"^\s*(?:第|chapter\s+|section\s+)?(\d+(?:\.\d+)*)", re.IGNORECASE)
+
+# Alignment costs; positions are relative (0..1) so these are fractions of the document
+SKIP_COST = 0.08
+NUMBER_MISMATCH_COST = 0.5
+NUMBER_UNKNOWN_COST = 0.05
+LABEL_MATCH_BONUS = 0.03
+
+
+def read_outline(source):
+    """
+    Read the sections of a PDF from its outline.
+
+    The outline level used is the shallowest one with at least two entries,
+    so a single root bookmark wrapping the whole document is looked through.
+
+    Args:
+        source: Path to the PDF file, bytes-like object, mmap, or binary file-like object
+
+    Returns:
+        tuple: (sections, num_pages) where sections is a list of dictionaries with
+            'title', 'level', 'start' (0-based page), 'label' (page label) and
+            'number' (leading section number or None), sorted by start page
+    """
+    with open_pdf_buffer(source) as buffer, BufferReader(buffer) as stream:
+        reader = PdfReader(stream)
+        num_pages = len(reader.pages)
+        try:
+            outline = reader.outline
+        except Exception as e:
+            logger.warning(f"Could not read outline of {describe_source(source)}: {str(e)}")
+            return [], num_pages
+
+        entries = []
+        _flatten_outline(reader, outline, 0, entries)
+        if not entries:
+            return [], num_pages
+
+        try:
+            labels = reader.page_labels
+        except Exception:
+            labels = [str(i + 1) for i in range(num_pages)]
+
+    levels = sorted({entry["level"] for entry in entries})
+    level = next((lvl for lvl in levels if sum(e["level"] == lvl for e in entries) >= 2), levels[0])
+
+    sections = []
+    for entry in entries:
+        if entry["level"] != level:
+            continue
+        match = SECTION_NUMBER_PATTERN.match(entry["title"])
+        sections.append({
+            "title": entry["title"],
+            "level": level,
+            "start": entry["start"],
+            "label": labels[entry["start"]] if entry["start"] < len(labels) else None,
+            "number": match.group(1) if match else None,
+        })
+    sections.sort(key=lambda section: section["start"])
+    return sections, num_pages
+
+
+def _flatten_outline(reader, outline, level, entries):
+    """Collect (title, level, start page) for every outline entry that resolves to a page."""
+    for item in outline:
+        if isinstance(item, list):
+            _flatten_outline(reader, item, level + 1, entries)
+            continue
+        try:
+            start = reader.get_destination_page_number(item)
+        except Exception:
+            continue
+        if start is None or start < 0:
+            continue
+        entries.append({"title": str(item.title or "").strip(), "level": level, "start": start})
+
+
+def align_outlines(zh_sections, zh_pages, en_sections, en_pages):
+    """
+    Match Chinese and English sections.
+
+    A monotonic alignment (edit-distance style dynamic programming) pairs
+    sections whose relative start positions are close, preferring pairs whose
+    leading section numbers or page labels agree. Unmatched sections are not
+    dropped; they stay attached to the preceding matched section.
+
+    Args:
+        zh_sections (list): Sections of the Chinese PDF from read_outline()
+        zh_pages (int): Page count of the Chinese PDF
+        en_sections (list): Sections of the English PDF from read_outline()
+        en_pages (int): Page count of the English PDF
+
+    Returns:
+        list: (zh_index, en_index) pairs of matched sections, in document order
+    """
+    n, m = len(zh_sections), len(en_sections)
+    if not n or not m:
+        return []
+
+    def match_cost(zh, en):
+        cost = abs(zh["start"] / zh_pages - en["start"] / en_pages)
+        if zh["number"] and en["number"]:
+            cost += 0 if zh["number"] == en["number"] else NUMBER_MISMATCH_COST
+        else:
+            cost += NUMBER_UNKNOWN_COST
+        if zh["label"] and zh["label"] == en["label"]:
+            cost -= LABEL_MATCH_BONUS
+        return cost
+
+    # cost[i][j]: best cost aligning the first i zh and first j en sections
+    cost = [[0.0] * (m + 1) for _ in range(n + 1)]
+    move = [[None] * (m + 1) for _ in range(n + 1)]
+    for i in range(1, n + 1):
+        cost[i][0] = i * SKIP_COST
+        move[i][0] = "zh"
+    for j in range(1, m + 1):
+        cost[0][j] = j * SKIP_COST
+        move[0][j] = "en"
+    for i in range(1, n + 1):
+        for j in range(1, m + 1):
+            options = (
+                (cost[i - 1][j - 1] + match_cost(zh_sections[i - 1], en_sections[j - 1]), "match"),
+                (cost[i - 1][j] + SKIP_COST, "zh"),
+                (cost[i][j - 1] + SKIP_COST, "en"),
+            )
+            cost[i][j], move[i][j] = min(options)
+
+    pairs = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        step = move[i][j]
+        if step == "match":
+            pairs.append((i - 1, j - 1))
+            i, j = i - 1, j - 1
+        elif step == "zh":
+            i -= 1
+        else:
+            j -= 1
+    pairs.reverse()
+    return pairs
+
+
+def align_sections(chinese_source, english_source):
+    """
+    Match the sections of a Chinese/English PDF pair into parallel page ranges.
+
+    Each pair covers the pages from one matched section start to the next,
+    so every page after the first matched section lands in exactly one pair;
+    any front matter before it becomes a leading pair of its own. Only the
+    outlines are read, not the page text.
+
+    Args:
+        chinese_source: Chinese PDF (path, bytes-like object or file-like object)
+        english_source: English PDF (path, bytes-like object or file-like object)
+
+    Returns:
+        list: Dictionaries with 'zh_title', 'en_title', 'zh_pages' and 'en_pages'
+            (1-based inclusive page ranges). Empty when either document has no
+            usable outline.
+    """
+    zh_sections, zh_pages = read_outline(chinese_source)
+    en_sections, en_pages = read_outline(english_source)
+    if not zh_sections or not en_sections:
+        logger.info("Section alignment skipped: both PDFs need an outline")
+        return []
+
+    matches = align_outlines(zh_sections, zh_pages, en_sections, en_pages)
+    logger.info(f"Aligned {len(matches)} sections "
+                f"({len(zh_sections)} Chinese, {len(en_sections)} English in outline)")
+    if not matches:
+        return []
+
+    # Section boundaries as (title, first page) anchors, with front matter if any
+    zh_anchors = [(zh_sections[i]["title"], zh_sections[i]["start"]) for i, _ in matches]
+    en_anchors = [(en_sections[j]["title"], en_sections[j]["start"]) for _, j in matches]
+    if zh_anchors[0][1] > 0 or en_anchors[0][1] > 0:
+        zh_anchors.insert(0, ("", 0))
+        en_anchors.insert(0, ("", 0))
+
+    pairs = []
+    for k in range(len(zh_anchors)):
+        zh_title, zh_start = zh_anchors[k]
+        en_title, en_start = en_anchors[k]
+        zh_end = zh_anchors[k + 1][1] if k + 1 < len(zh_anchors) else zh_pages
+        en_end = en_anchors[k + 1][1] if k + 1 < len(en_anchors) else en_pages
+        # Sections starting on the same page share it rather than leaving one empty
+        zh_end = max(zh_end, zh_start + 1)
+        en_end = max(en_end, en_start + 1)
+        pairs.append({
+            "zh_title": zh_title,
+            "en_title": en_title,
+            "zh_pages": (zh_start + 1, zh_end),
+            "en_pages": (en_start + 1, en_end),
+        })
+    return pairs
+
+
+class SectionAligner:
+    """Class for splitting a Chinese/English PDF pair into parallel sections with their text."""
+
+    def __init__(self, pdf_processor):
+        """
+        Initialize the section aligner.
+
+        Args:
+            pdf_processor (PDFProcessor): Processor used to extract the page text
+        """
+        self.pdf_processor = pdf_processor
+
+    def align(self, chinese_source, english_source):
+        """
+        Build parallel section pairs from the outlines of both documents; see align_sections().
+
+        Args:
+            chinese_source: Chinese PDF (path, bytes-like object or file-like object)
+            english_source: English PDF (path, bytes-like object or file-like object)
+
+        Returns:
+            list: Dictionaries with 'zh_title', 'en_title', 'zh_pages' and 'en_pages'
+                (1-based inclusive page ranges) and 'zh_text' and 'en_text'. Empty
+                when either document has no usable outline.
+        """
+        pairs = align_sections(chinese_source, english_source)
+        if not pairs:
+            return []
+
+        zh_texts = dict(self.pdf_processor.iter_pages(chinese_source))
+        en_texts = dict(self.pdf_processor.iter_pages(english_source))
+        for pair in pairs:
+            pair["zh_text"] = _join_pages(zh_texts, *pair["zh_pages"])
+            pair["en_text"] = _join_pages(en_texts, *pair["en_pages"])
+        return pairs
+
+
+def _join_pages(page_texts, first, last):
+    """Join the text of 1-based pages first..last (inclusive) from a page_number -> text mapping."""
+    return "".join(page_texts[page] + "\n\n" for page in range(first, last + 1) if page_texts.get(page))
@@ -0,0 +1,245 @@
+"""
+Sentence Aligner Module
+
+This module handles length-based (Gale-Church style) alignment of Chinese and
+English sentences, used to build compact parallel chunks for the model.
+"""
+import logging
+import math
+import re
+
+import numpy as np
+
+from .text_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+ZH_SENTENCE_PATTERN = re.compile(r"[^。！？；!?;\n]+[。！？；!?;]*")
+EN_SENTENCE_PATTERN = re.compile(r"\S.*?(?:[.!?;](?=\s)|\n\s*\n|$)", re.DOTALL)
+
+# Gale-Church bead types (zh sentences, en sentences) and their prior probabilities
+BEADS = ((1, 1), (1, 0), (0, 1), (2, 1), (1, 2), (2, 2))
+BEAD_PRIORS = (0.89, 0.0099 / 2, 0.0099 / 2, 0.089 / 2, 0.089 / 2, 0.011)
+
+# Variance of the length difference per character, from Gale and Church (1993)
+LENGTH_VARIANCE = 6.8
+
+
+def split_sentences(text, language):
+    """
+    Split text into sentences.
+
+    Args:
+        text (str): Text to split
+        language (str): 'zh' or 'en'
+
+    Returns:
+        list: Non-empty sentences with surrounding whitespace removed
+    """
+    pattern = ZH_SENTENCE_PATTERN if language == "zh" else EN_SENTENCE_PATTERN
+    sentences = (" ".join(match.group(0).split()) for match in pattern.finditer(text))
+    return [sentence for sentence in sentences if sentence]
+
+
+def _erfc(x):
+    """Vectorized complementary error function (Abramowitz and Stegun 7.1.26, |error| < 1.5e-7)."""
+    t = 1.0 / (1.0 + 0.3275911 * x)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    return poly * np.exp(-x * x)
+
+
+class SentenceAligner:
+    """Class for aligning Chinese and English sentences by length."""
+
+    def __init__(self, band_width=64, length_ratio=None):
+        """
+        Initialize the sentence aligner.
+
+        Args:
+            band_width (int): Half-width of the search band around the diagonal; the
+                alignment runs in O(sentences * band_width)
+            length_ratio (float, optional): English characters per Chinese character;
+                estimated from each document pair when not given
+        """
+        self.band_width = band_width
+        self.length_ratio = length_ratio
+
+    def align(self, chinese_text, english_text):
+        """
+        Align the sentences of a Chinese and an English text.
+
+        Args:
+            chinese_text (str): Chinese text
+            english_text (str): English text
+
+        Returns:
+            list: (chinese, english) sentence-group pairs for every 1-1, 2-1, 1-2 and 2-2
+                bead; sentences without a counterpart (1-0 and 0-1 beads) are kept in the
+                preceding pair, or in the first pair when they open the text
+        """
+        zh_sentences = split_sentences(chinese_text, "zh")
+        en_sentences = split_sentences(english_text, "en")
+        if not zh_sentences or not en_sentences:
+            return []
+
+        beads = self.align_lengths(
+            np.array([len(s) for s in zh_sentences], dtype=np.float64),
+            np.array([len(s) for s in en_sentences], dtype=np.float64),
+        )
+        # [zh sentences, en sentences] of each pair; leading unmatched sentences wait for the first pair
+        groups = []
+        leading = [[], []]
+        for zh_start, zh_end, en_start, en_end in beads:
+            zh_group = zh_sentences[zh_start:zh_end]
+            en_group = en_sentences[en_start:en_end]
+            if zh_group and en_group:
+                groups.append([leading[0] + zh_group, leading[1] + en_group])
+                leading = [[], []]
+            elif groups:
+                groups[-1][0].extend(zh_group)
+                groups[-1][1].extend(en_group)
+            else:
+                leading[0].extend(zh_group)
+                leading[1].extend(en_group)
+        if leading[0] or leading[1]:
+            groups.append(leading)
+        pairs = [("".join(zh_group), " ".join(en_group)) for zh_group, en_group in groups]
+        logger.info(f"Aligned {len(zh_sentences)} Chinese and {len(en_sentences)} English sentences "
+                    f"into {len(pairs)} pairs")
+        return pairs
+
+    def align_lengths(self, zh_lengths, en_lengths):
+        """
+        Run the banded Gale-Church dynamic program over sentence lengths.
+
+        Only a band of cells around the diagonal is scored. Length costs are
+        precomputed for blocks of rows with whole-array operations, so the
+        Python-level loop does a handful of slice operations per Chinese sentence.
+
+        Args:
+            zh_lengths (ndarray): Character length of each Chinese sentence
+            en_lengths (ndarray): Character length of each English sentence
+
+        Returns:
+            list: (zh_start, zh_end, en_start, en_end) sentence index ranges of each bead
+        """
+        n, m = len(zh_lengths), len(en_lengths)
+        ratio = self.length_ratio or (en_lengths.sum() / max(zh_lengths.sum(), 1.0))
+        # Express Chinese lengths in English characters so the model below has c = 1
+        zh_cumulative = np.concatenate(([0.0], np.cumsum(zh_lengths * ratio)))
+
+        # Band wide enough that consecutive rows overlap even when sentence counts differ
+        width = max(2 * self.band_width + 1, 2 * int(math.ceil(m / max(n, 1))) + 3)
+        half = width // 2
+        centers = np.rint(np.arange(n + 1) * (m / n)).astype(np.int64)
+        lows = np.clip(centers - half, 0, max(m - width + 1, 0))
+        offsets = np.arange(width)
+
+        # English prefix sums padded on both sides so band slices never go out of range
+        pad = 2
+        en_cumulative = np.concatenate((np.zeros(pad + 1), np.cumsum(en_lengths), np.full(width, en_lengths.sum())))
+
+        cost = np.full((n + 1, width), np.inf)
+        back = np.full((n + 1, width), -1, dtype=np.int8)
+
+        skip_en = BEADS.index((0, 1))
+        row_beads = [bead for bead in range(len(BEADS)) if bead != skip_en]
+        penalties = [-math.log(prior) for prior in BEAD_PRIORS]
+        candidates = np.empty((len(row_beads), width))
+        block_size = 1024
+
+        for block_start in range(0, n + 1, block_size):
+            rows = np.arange(block_start, min(block_start + block_size, n + 1))
+            columns = pad + lows[rows][:, None] + offsets[None, :]
+            valid = (lows[rows][:, None] + offsets[None, :]) <= m
+
+            # Length costs of every bead for every cell in this block of rows
+            bead_costs = []
+            for bead in row_beads:
+                di, dj = BEADS[bead]
+                zh_len = (zh_cumulative[rows] - zh_cumulative[np.maximum(rows - di, 0)])[:, None]
+                en_len = en_cumulative[columns] - en_cumulative[columns - dj]
+                bead_cost = penalties[bead] + self._length_cost(zh_len, en_len)
+                bead_cost[rows < di] = np.inf
+                bead_costs.append(bead_cost)
+            en_len = en_cumulative[columns] - en_cumulative[columns - 1]
+            steps = np.where(valid, penalties[skip_en] + self._length_cost(0.0, en_len), 0.0)
+            steps[:, 0] = 0.0
+            steps = np.cumsum(steps, axis=1)
+
+            for r, i in enumerate(rows):
+                candidates.fill(np.inf)
+                for c, bead in enumerate(row_beads):
+                    di, dj = BEADS[bead]
+                    if di > i:
+                        continue
+                    # Cell k of row i comes from cell k + shift of row i - di
+                    shift = lows[i] - dj - lows[i - di]
+                    lo, hi = max(0, -shift), min(width, width - shift)
+                    if lo < hi:
+                        candidates[c, lo:hi] = cost[i - di, lo + shift:hi + shift]
+                    candidates[c] += bead_costs[c][r]
+
+                choice = candidates.argmin(axis=0)
+                row = candidates[choice, offsets]
+                row_back = np.asarray(row_beads, dtype=np.int8)[choice]
+                if i == 0:
+                    row[0 - lows[0]] = 0.0
+                row[~valid[r]] = np.inf
+
+                # Runs of 0-1 beads: best[k] = min over k' <= k of row[k'] + step costs k'+1..k,
+                # a running minimum instead of a sequential scan along the row
+                best = np.minimum.accumulate(row - steps[r]) + steps[r]
+                better = valid[r] & (best < row - 1e-9)
+                row[better] = best[better]
+                row_back[better] = skip_en
+                row_back[np.isinf(row)] = -1
+
+                cost[i] = row
+                back[i] = row_back
+
+        # Trace the best path back from (n, m)
+        beads = []
+        i, j = n, m
+        while i > 0 or j > 0:
+            bead = back[i, j - lows[i]]
+            if bead < 0:
+                raise ValueError("Sentence alignment band too narrow; increase band_width")
+            di, dj = BEADS[bead]
+            beads.append((i - di, i, j - dj, j))
+            i, j = i - di, j - dj
+        beads.reverse()
+        return beads
+
+    @staticmethod
+    def _length_cost(zh_len, en_len):
+        """Negative log probability of the length difference between two sentence groups."""
+        mean = (zh_len + en_len) / 2.0
+        delta = np.abs(en_len - zh_len) / np.sqrt(np.maximum(mean, 1.0) * LENGTH_VARIANCE)
+        return -np.log(np.maximum(_erfc(delta / math.sqrt(2.0)), 1e-12))
+
+
+def build_parallel_chunks(pairs, max_tokens):
+    """
+    Group aligned sentence pairs into parallel chunks under a token budget.
+
+    Args:
+        pairs (list): (chinese, english) pairs from SentenceAligner.align()
+        max_tokens (int): Estimated token budget per chunk for both languages combined
+
+    Returns:
+        list: (chinese_text, english_text) chunks, in document order
+    """
+    chunks = []
+    zh_parts, en_parts, tokens = [], [], 0
+    for zh, en in pairs:
+        pair_tokens = estimate_tokens(zh) + estimate_tokens(en)
+        if zh_parts and tokens + pair_tokens > max_tokens:
+            chunks.append(("\n".join(zh_parts), "\n".join(en_parts)))
+            zh_parts, en_parts, tokens = [], [], 0
+        zh_parts.append(zh)
+        en_parts.append(en)
+        tokens += pair_tokens
+    if zh_parts:
+        chunks.append(("\n".join(zh_parts), "\n".join(en_parts)))
+    return chunks
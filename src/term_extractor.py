@@ -7,30 +7,39 @@ import csv
 import logging
 import pandas as pd
 
+from .chunked_extractor import DEFAULT_CHUNK_TOKENS, DEFAULT_PARALLELISM, ChunkedExtractor
+
 logger = logging.getLogger(__name__)
 
 class TermExtractor:
     """Class for extracting professional terminology pairs from texts."""
     
-    def __init__(self, bedrock_client, custom_prompt=None):
+    def __init__(self, bedrock_client, custom_prompt=None, chunk_tokens=DEFAULT_CHUNK_TOKENS,
+                 parallelism=DEFAULT_PARALLELISM):
         """
         Initialize the term extractor.
         
         Args:
             bedrock_client (BedrockClient): Instance of BedrockClient for API calls
             custom_prompt (str, optional): Custom prompt template to use for extraction
+            chunk_tokens (int): Estimated token budget of each model call's text; longer
+                documents are split into aligned chunks instead of being truncated
+            parallelism (int): Number of chunk calls in flight at once
         """
         self.bedrock_client = bedrock_client
         self.custom_prompt = custom_prompt
+        self.chunked_extractor = ChunkedExtractor(bedrock_client, chunk_tokens=chunk_tokens, parallelism=parallelism)
         logger.info("Term extractor initialized" + (" with custom prompt" if custom_prompt else ""))
         
-    def extract_terms(self, chinese_text, english_text):
+    def extract_terms(self, chinese_text, english_text, sections=None):
         """
         Extract professional terminology pairs from Chinese and English texts.
         
         Args:
-            chinese_text (str): Text extracted from Chinese PDF
-            english_text (str): Text extracted from English PDF
+            chinese_text (str or PageText): Text extracted from Chinese PDF
+            english_text (str or PageText): Text extracted from English PDF
+            sections (list, optional): Matched section pairs from section_aligner.align_sections(),
+                used as the first split of long documents
             
         Returns:
             list: List of dictionaries containing term pairs
@@ -38,17 +47,17 @@ class TermExtractor:
         logger.info("Extracting professional terminology pairs")
         
         # Check if we have enough text to work with
-        if not chinese_text or not chinese_text.strip():
+        if not chinese_text or not str(chinese_text).strip():
             raise ValueError("Chinese text is empty")
         
-        if not english_text or not english_text.strip():
+        if not english_text or not str(english_text).strip():
             raise ValueError("English text is empty")
         
         # Use the Bedrock client to extract terminology pairs
         try:
-            # Pass custom prompt to the BedrockClient if available
-            terminology_pairs = self.bedrock_client.extract_professional_terms(
-                chinese_text, english_text, custom_prompt=self.custom_prompt
+            # The whole of both documents is covered, in concurrent chunk calls when it is long
+            terminology_pairs = self.chunked_extractor.extract(
+                chinese_text, english_text, custom_prompt=self.custom_prompt, sections=sections
             )
             
             # Validate the returned data structure
@@ -74,6 +83,43 @@ class TermExtractor:
             logger.error(f"Error extracting terminology pairs: {str(e)}")
             raise
     
+    def stream_terms(self, chinese_text, english_text, sections=None):
+        """
+        Extract professional terminology pairs, yielding each one as soon as the model has written it.
+
+        Args:
+            chinese_text (str or PageText): Text extracted from Chinese PDF
+            english_text (str or PageText): Text extracted from English PDF
+            sections (list, optional): Matched section pairs from section_aligner.align_sections(),
+                used as the first split of long documents
+
+        Yields:
+            dict: Term pairs with the name, ZH_CN and EN_US keys
+        """
+        logger.info("Streaming professional terminology pairs")
+
+        if not chinese_text or not str(chinese_text).strip():
+            raise ValueError("Chinese text is empty")
+
+        if not english_text or not str(english_text).strip():
+            raise ValueError("English text is empty")
+
+        count = 0
+        try:
+            for pair in self.chunked_extractor.stream(chinese_text, english_text, custom_prompt=self.custom_prompt,
+                                                      sections=sections):
+                for key in ("name", "ZH_CN", "EN_US"):
+                    if key not in pair:
+                        logger.error(f"Item {count} missing required key '{key}': {pair}")
+                        raise ValueError(f"API returned item missing required key '{key}' at index {count}")
+                count += 1
+                yield pair
+        except Exception as e:
+            logger.error(f"Error extracting terminology pairs: {str(e)}")
+            raise
+
+        logger.info(f"Successfully extracted {count} terminology pairs")
+
     def save_to_csv(self, terminology_pairs, output_path):
         """
         Save terminology pairs to a CSV file.
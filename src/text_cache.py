@@ -0,0 +1,327 @@
+"""
+Text Cache Module
+
+This module handles persistent, content-addressed caches of extracted PDF text.
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import closing
+
+import pypdf
+
+from .page_text import PageText, is_serialized
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "pdf_text")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Read size used when hashing PDF files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+CACHE_SUFFIX = ".z"
+
+
+def hash_file(pdf_path):
+    """
+    Compute the SHA-256 digest of a file's bytes.
+
+    Args:
+        pdf_path (str): Path to the file
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_buffer(buffer):
+    """
+    Compute the SHA-256 digest of an in-memory or memory-mapped buffer without copying it.
+
+    Args:
+        buffer: Any object supporting the buffer protocol
+
+    Returns:
+        str: Hex digest of the buffer contents
+    """
+    return hashlib.sha256(buffer).hexdigest()
+
+
+class TextCache:
+    """On-disk cache of extracted text, keyed by PDF content and stored zlib-compressed."""
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        """
+        Initialize the text cache.
+
+        Args:
+            cache_dir (str, optional): Directory for cache entries
+                (defaults to PDF_TEXT_CACHE_DIR env var or '.cache/pdf_text')
+            max_bytes (int, optional): Total size budget for compressed entries; least
+                recently used entries are evicted beyond it (defaults to
+                PDF_TEXT_CACHE_MAX_MB env var or 512 MB)
+        """
+        self.cache_dir = cache_dir or os.environ.get("PDF_TEXT_CACHE_DIR", DEFAULT_CACHE_DIR)
+        if max_bytes is None:
+            max_mb = os.environ.get("PDF_TEXT_CACHE_MAX_MB")
+            max_bytes = int(max_mb) * 1024 * 1024 if max_mb else DEFAULT_MAX_BYTES
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def __getstate__(self):
+        # Locks cannot be pickled; a fresh one is created when the cache is sent to another process
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def key_for(self, pdf_path, variant=""):
+        """
+        Build the cache key for a PDF file.
+
+        Args:
+            pdf_path (str): Path to the PDF file
+            variant (str, optional): Extra tag for extraction options that change the output
+
+        Returns:
+            str: Cache key combining the SHA-256 of the file and the pypdf version
+        """
+        return self._make_key(hash_file(pdf_path), variant)
+
+    def key_for_buffer(self, buffer, variant=""):
+        """
+        Build the cache key for PDF bytes that are already in memory or memory-mapped.
+
+        Args:
+            buffer: Buffer holding the PDF bytes
+            variant (str, optional): Extra tag for extraction options that change the output
+
+        Returns:
+            str: Cache key, identical to key_for() on a file with the same bytes
+        """
+        return self._make_key(hash_buffer(buffer), variant)
+
+    @staticmethod
+    def _make_key(digest, variant):
+        key = f"{digest}-pypdf{pypdf.__version__}"
+        if variant:
+            key += "-" + hashlib.sha256(variant.encode("utf-8")).hexdigest()[:16]
+        return key
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def get(self, key):
+        """
+        Look up cached text.
+
+        Args:
+            key (str): Cache key from key_for()
+
+        Returns:
+            str: The cached text, or None on a miss
+        """
+        page_text = self.get_page_text(key)
+        return page_text.text if page_text is not None else None
+
+    def get_page_text(self, key):
+        """
+        Look up cached text with its page offsets.
+
+        Args:
+            key (str): Cache key from key_for()
+
+        Returns:
+            PageText: The cached text, or None on a miss. Entries written as plain
+                text come back as a single page.
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Bump the modification time so eviction treats this entry as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+
+        try:
+            data = zlib.decompress(data)
+            if is_serialized(data):
+                return PageText.from_bytes(data)
+            text = data.decode("utf-8")
+            page_text = PageText.from_pages([(1, text)])
+            return page_text.truncate(len(text))
+        except (zlib.error, UnicodeDecodeError, ValueError) as e:
+            logger.warning(f"Discarding corrupt cache entry {path}: {str(e)}")
+            self._remove(path)
+            return None
+
+    def put(self, key, text):
+        """
+        Store text in the cache and evict old entries if over budget.
+
+        Args:
+            key (str): Cache key from key_for()
+            text (str): Extracted text to store
+        """
+        self._write(key, text.encode("utf-8"))
+
+    def put_page_text(self, key, page_text):
+        """
+        Store text with its page offsets; see put().
+
+        Args:
+            key (str): Cache key from key_for()
+            page_text (PageText): Extracted text to store
+        """
+        self._write(key, page_text.to_bytes())
+
+    def _write(self, key, payload):
+        """Compress and atomically store one entry, then evict old entries if over budget."""
+        data = zlib.compress(payload, 6)
+        if len(data) > self.max_bytes:
+            logger.info(f"Not caching {key}: {len(data)} bytes exceeds cache budget")
+            return
+
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._entry_path(key))
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+        self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if not entry.name.endswith(CACHE_SUFFIX):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                logger.debug(f"Evicted cache entry {path}")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class PageIndex:
+    """Persistent map from page fingerprints to extracted page text, backed by SQLite."""
+
+    # SQLite limits the number of bound parameters per statement
+    QUERY_CHUNK_SIZE = 500
+
+    def __init__(self, path=None, max_entries=200000):
+        """
+        Initialize the page index.
+
+        Args:
+            path (str, optional): SQLite database file (defaults to 'page_index.sqlite'
+                inside the PDF_TEXT_CACHE_DIR directory)
+            max_entries (int): Number of pages kept; least recently used pages are evicted beyond it
+        """
+        if path is None:
+            cache_dir = os.environ.get("PDF_TEXT_CACHE_DIR", DEFAULT_CACHE_DIR)
+            os.makedirs(cache_dir, exist_ok=True)
+            path = os.path.join(cache_dir, "page_index.sqlite")
+        self.path = path
+        self.max_entries = max_entries
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "fingerprint TEXT PRIMARY KEY, text BLOB NOT NULL, used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS pages_used ON pages (used)")
+
+    def _connect(self):
+        # Connections are opened per call so the index can be shared across threads and processes
+        return closing(sqlite3.connect(self.path, timeout=30, isolation_level=None))
+
+    def get_many(self, fingerprints):
+        """
+        Look up the text of several pages.
+
+        Args:
+            fingerprints (iterable): Page fingerprints to look up
+
+        Returns:
+            dict: Mapping of fingerprint to text for the pages found in the index
+        """
+        fingerprints = list(dict.fromkeys(fingerprints))
+        found = {}
+        with self._connect() as conn:
+            for start in range(0, len(fingerprints), self.QUERY_CHUNK_SIZE):
+                chunk = fingerprints[start:start + self.QUERY_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT fingerprint, text FROM pages WHERE fingerprint IN ({placeholders})", chunk
+                ).fetchall()
+                for fingerprint, data in rows:
+                    found[fingerprint] = zlib.decompress(data).decode("utf-8")
+                if rows:
+                    conn.execute(
+                        f"UPDATE pages SET used = ? WHERE fingerprint IN ({','.join('?' * len(rows))})",
+                        [time.time()] + [fingerprint for fingerprint, _ in rows]
+                    )
+        return found
+
+    def put_many(self, entries):
+        """
+        Store the text of several pages and evict old pages if over max_entries.
+
+        Args:
+            entries (dict): Mapping of fingerprint to extracted page text
+        """
+        now = time.time()
+        rows = [(fingerprint, zlib.compress(text.encode("utf-8"), 6), now)
+                for fingerprint, text in entries.items()]
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO pages (fingerprint, text, used) VALUES (?, ?, ?)", rows)
+            (count,) = conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM pages WHERE fingerprint IN "
+                    "(SELECT fingerprint FROM pages ORDER BY used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+                logger.debug(f"Evicted {count - self.max_entries} pages from page index")
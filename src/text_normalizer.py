@@ -0,0 +1,216 @@
+"""
+Text Normalizer Module
+
+This module handles cleanup of extracted page text before it is sent to the model.
+"""
+import logging
+import math
+import re
+from collections import Counter
+
+from .text_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+DIGITS_PATTERN = re.compile(r"\d+")
+
+# Header and footer lines up to this length have their digits masked, so page-number footers collide
+MASK_DIGITS_MAX_LENGTH = 40
+
+HAN = "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+# Han plus CJK and full-width punctuation; text on either side of a break in these joins directly
+CJK = HAN + "\u3000-\u303f\uff00-\uffef"
+
+# Full-width letters and digits become ASCII, and the ideographic space a regular space;
+# full-width punctuation is left alone because it is correct in Chinese text
+FULLWIDTH_TABLE = str.maketrans({
+    **{chr(code): chr(code - 0xFEE0) for code in range(0xFF10, 0xFF1A)},
+    **{chr(code): chr(code - 0xFEE0) for code in range(0xFF21, 0xFF3B)},
+    **{chr(code): chr(code - 0xFEE0) for code in range(0xFF41, 0xFF5B)},
+    "\u3000": " ",
+    "\u00a0": " ",
+})
+
+# Half-width punctuation typed after a Han character gets its full-width form
+HALFWIDTH_PUNCT = {",": "，", ";": "；", ":": "：", "?": "？", "!": "！"}
+HALFWIDTH_PUNCT_PATTERN = re.compile(f"(?<=[{HAN}])([,;:?!])")
+
+HYPHENATED_BREAK_PATTERN = re.compile(r"(?<=[A-Za-z])-[ \t]*\n[ \t]*(?=[a-z])")
+CJK_LINE_BREAK_PATTERN = re.compile(f"(?<=[{CJK}])[ \t]*\n[ \t]*(?=[{CJK}])")
+CJK_SPACE_PATTERN = re.compile(f"(?<=[{CJK}])[ \t]+(?=[{CJK}])")
+SPACE_RUN_PATTERN = re.compile(r"[ \t\f\v]+")
+TRAILING_SPACE_PATTERN = re.compile(r" *\n *")
+BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+
+
+def normalize_whitespace(text):
+    """
+    Normalize whitespace, line breaks and punctuation width in extracted text.
+
+    Joins hard-wrapped CJK lines, removes stray spaces between CJK characters,
+    de-hyphenates English words split across lines, maps full-width letters and
+    digits to ASCII, gives half-width punctuation after Han characters its
+    full-width form and collapses whitespace runs. Every step is a single
+    compiled-regex or translate pass over the whole text.
+
+    Args:
+        text (str): Text to normalize
+
+    Returns:
+        str: Normalized text
+    """
+    if not text:
+        return text
+    text = text.translate(FULLWIDTH_TABLE)
+    text = SPACE_RUN_PATTERN.sub(" ", text)
+    text = HYPHENATED_BREAK_PATTERN.sub("", text)
+    text = CJK_LINE_BREAK_PATTERN.sub("", text)
+    text = CJK_SPACE_PATTERN.sub("", text)
+    text = HALFWIDTH_PUNCT_PATTERN.sub(lambda match: HALFWIDTH_PUNCT[match.group(1)], text)
+    text = TRAILING_SPACE_PATTERN.sub("\n", text)
+    text = BLANK_LINES_PATTERN.sub("\n\n", text)
+    return text.strip()
+
+
+def _line_key(line, edge):
+    """
+    Hash a line so that repeats differing only in spacing collide.
+
+    Short header and footer lines (edge=True) also collide when they differ only
+    in numbers. Edge and body lines never share a key, so a masked footer such
+    as "Page #" cannot match a numbered step or table row in the body.
+    """
+    line = " ".join(line.split())
+    if edge and len(line) <= MASK_DIGITS_MAX_LENGTH:
+        line = DIGITS_PATTERN.sub("#", line)
+    return hash((edge, line))
+
+
+class TextNormalizer:
+    """Class for stripping boilerplate and normalizing whitespace in extracted PDF pages."""
+
+    def __init__(self, strip_boilerplate=True, min_repeat_ratio=0.5, min_repeat_pages=3,
+                 sample_pages=40, max_line_length=200, normalize_whitespace=True, edge_lines=3):
+        """
+        Initialize the text normalizer.
+
+        Running headers, footers, copyright lines and page numbers are found by
+        counting, over the first sample_pages pages, on how many pages each line
+        occurs. Short lines among the first and last edge_lines lines of a page
+        are compared with digits masked, so "Page 3" and "Page 4" count as the
+        same line; lines elsewhere on the page only match exact repeats, so
+        numbered steps and table rows in the body are kept.
+
+        Args:
+            strip_boilerplate (bool): Remove lines repeated across many pages
+            min_repeat_ratio (float): Fraction of sampled pages a line must appear on
+            min_repeat_pages (int): Minimum number of pages a line must appear on
+            sample_pages (int): Number of leading pages used to learn the boilerplate
+            max_line_length (int): Longer lines are never treated as boilerplate
+            normalize_whitespace (bool): Apply normalize_whitespace() to every page
+            edge_lines (int): Non-blank lines at the top and at the bottom of a page
+                treated as its header and footer (at most a quarter of a page's lines each)
+        """
+        self.strip_boilerplate = strip_boilerplate
+        self.min_repeat_ratio = min_repeat_ratio
+        self.min_repeat_pages = min_repeat_pages
+        self.sample_pages = sample_pages
+        self.max_line_length = max_line_length
+        self.normalize_whitespace = normalize_whitespace
+        self.edge_lines = edge_lines
+
+    def cache_tag(self):
+        """Return a string identifying the settings that affect the normalized output."""
+        return (f"boilerplate={self.strip_boilerplate},{self.min_repeat_ratio},"
+                f"{self.min_repeat_pages},{self.sample_pages},{self.max_line_length},{self.edge_lines};"
+                f"whitespace={self.normalize_whitespace}")
+
+    def process_pages(self, pages, stats=None):
+        """
+        Normalize a stream of pages.
+
+        Only the first sample_pages pages are buffered to learn the boilerplate;
+        later pages are cleaned and yielded as they arrive, so this can sit in
+        front of a budget-limited consumer without decoding the whole document.
+
+        Args:
+            pages (iterable): (page_number, text) pairs as yielded by PDFProcessor.iter_pages
+            stats (dict, optional): Updated with 'lines_removed' (boilerplate lines) and the
+                'chars_saved' and 'tokens_saved' of all normalization steps
+
+        Yields:
+            tuple: (page_number, normalized_text)
+        """
+        if stats is None:
+            stats = {}
+        stats.setdefault("lines_removed", 0)
+        stats.setdefault("chars_saved", 0)
+        stats.setdefault("tokens_saved", 0)
+
+        pages = iter(pages)
+        repeated = set()
+        if self.strip_boilerplate:
+            sample = []
+            for page in pages:
+                sample.append(page)
+                if len(sample) >= self.sample_pages:
+                    break
+            repeated = self._find_repeated_lines(text for _, text in sample)
+            if repeated:
+                logger.info(f"Found {len(repeated)} boilerplate lines repeated across pages")
+            for page_number, text in sample:
+                yield page_number, self._normalize_page(text, repeated, stats)
+
+        for page_number, text in pages:
+            yield page_number, self._normalize_page(text, repeated, stats)
+
+    def _normalize_page(self, text, repeated, stats):
+        """Run all enabled normalization steps on one page."""
+        text = self._clean_page(text, repeated, stats)
+        if self.normalize_whitespace and text:
+            normalized = normalize_whitespace(text)
+            stats["chars_saved"] += len(text) - len(normalized)
+            stats["tokens_saved"] += estimate_tokens(text) - estimate_tokens(normalized)
+            text = normalized
+        return text
+
+    def _find_repeated_lines(self, texts):
+        """Return the hashes of lines that occur on enough of the given pages."""
+        counts = Counter()
+        num_pages = 0
+        for text in texts:
+            if not text:
+                continue
+            num_pages += 1
+            counts.update({key for _, key in self._line_keys(text) if key is not None})
+
+        if num_pages < self.min_repeat_pages:
+            return set()
+
+        threshold = max(self.min_repeat_pages, math.ceil(self.min_repeat_ratio * num_pages))
+        return {key for key, count in counts.items() if count >= threshold}
+
+    def _clean_page(self, text, repeated, stats):
+        """Drop boilerplate lines from one page and record what was saved."""
+        if not text or not repeated:
+            return text
+
+        kept = []
+        for line, key in self._line_keys(text):
+            if key is not None and key in repeated:
+                stats["lines_removed"] += 1
+                stats["chars_saved"] += len(line) + 1
+                stats["tokens_saved"] += estimate_tokens(line)
+            else:
+                kept.append(line)
+        return "\n".join(kept)
+
+    def _line_keys(self, text):
+        """Pair each line of a page with its key, or None for blank and overlong lines."""
+        lines = text.split("\n")
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        # On short pages the header and footer take at most a quarter of the lines each
+        edge = min(self.edge_lines, max(1, len(filled) // 4))
+        edges = set(filled[:edge] + filled[-edge:]) if edge > 0 else set()
+        return [(line, _line_key(line, i in edges) if line.strip() and len(line) <= self.max_line_length else None)
+                for i, line in enumerate(lines)]
@@ -0,0 +1,33 @@
+"""
+Text Utilities Module
+
+This module provides small text helpers shared by the extraction pipeline.
+"""
+import re
+
+# Han ideographs, CJK punctuation and full-width forms; each is roughly one model token
+CJK_PATTERN = re.compile(r"[　-〿㐀-䶿一-鿿豈-﫿＀-￯]")
+
+# Average number of non-CJK characters per model token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """
+    Estimate the number of model tokens in a text.
+
+    CJK characters are counted as one token each and everything else at
+    CHARS_PER_TOKEN characters per token. This is only a budgeting heuristic;
+    the model's own tokenizer is not available locally.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    if not text:
+        return 0
+    cjk_chars = len(CJK_PATTERN.findall(text))
+    other_chars = len(text) - cjk_chars
+    return cjk_chars + (other_chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
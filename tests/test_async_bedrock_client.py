@@ -0,0 +1,153 @@
+"""Tests for the asyncio Bedrock client's concurrency limit, retries and stream cleanup."""
+import asyncio
+import unittest
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from src import async_bedrock_client
+from src.async_bedrock_client import AsyncBedrockClient
+from src.retry import RetryMetrics, RetryPolicy
+
+
+def throttled():
+    return ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"},
+                        "ResponseMetadata": {"HTTPStatusCode": 429}}, "Converse")
+
+
+def response(text):
+    return {"output": {"message": {"content": [{"text": text}]}}}
+
+
+class FakeRuntime:
+    """boto3 bedrock-runtime stand-in: the first call for each prompt is throttled."""
+
+    def __init__(self):
+        self.failed = set()
+        self.active = 0
+        self.max_active = 0
+
+    def converse(self, modelId, messages, inferenceConfig):
+        prompt = messages[0]["content"][0]["text"]
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            if prompt == "flaky" and prompt not in self.failed:
+                self.failed.add(prompt)
+                raise throttled()
+            return response(prompt)
+        finally:
+            self.active -= 1
+
+
+class FakeStream:
+
+    def __init__(self, events, error=None):
+        self.events = events
+        self.error = error
+        self.closed = False
+
+    async def __aiter__(self):
+        for event in self.events:
+            yield event
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        self.closed = True
+
+
+class FakeAioClient:
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def converse_stream(self, **request):
+        return {"stream": self.stream}
+
+
+def message(text):
+    return [{"role": "user", "content": [{"text": text}]}]
+
+
+def delta(text):
+    return {"contentBlockDelta": {"delta": {"text": text}}}
+
+
+class ThreadPoolFallbackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.runtime = FakeRuntime()
+        sync_client = mock.Mock(bedrock=self.runtime)
+        policy = RetryPolicy(max_attempts=3, metrics=RetryMetrics())
+        policy.delay = lambda attempt: 0.3
+        for target, value in (("get_session", None), ("default_policy", policy),
+                              ("get_bedrock_client", mock.Mock(return_value=sync_client))):
+            patcher = mock.patch.object(async_bedrock_client, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_backoff_does_not_hold_a_slot(self):
+        finished = []
+
+        async def run():
+            async with AsyncBedrockClient(max_concurrency=1) as client:
+                async def call(prompt):
+                    result = await client.converse(message(prompt))
+                    finished.append(result["content"][0]["text"])
+                # "steady" runs while "flaky" waits to retry
+                await asyncio.gather(call("flaky"), call("steady"))
+
+        with self.assertLogs("src.retry", "WARNING"):
+            asyncio.run(run())
+        self.assertEqual(finished, ["steady", "flaky"])
+        self.assertEqual(self.runtime.max_active, 1)
+
+
+class StreamCleanupTest(unittest.TestCase):
+
+    def run_stream(self, stream, take=None):
+        session = mock.Mock()
+        session.create_client.return_value = FakeAioClient(stream)
+        texts = []
+
+        async def run():
+            async with AsyncBedrockClient() as client:
+                deltas = client.converse_stream(message("hi"))
+                try:
+                    async for text in deltas:
+                        texts.append(text)
+                        if take is not None and len(texts) >= take:
+                            break
+                finally:
+                    await deltas.aclose()
+
+        with mock.patch.object(async_bedrock_client, "get_session", mock.Mock(return_value=session)):
+            asyncio.run(run())
+        return texts
+
+    def test_stream_closed_after_completion(self):
+        stream = FakeStream([delta("a"), delta("b"), {"messageStop": {"stopReason": "end_turn"}}])
+        self.assertEqual(self.run_stream(stream), ["a", "b"])
+        self.assertTrue(stream.closed)
+
+    def test_stream_closed_when_consumer_stops_early(self):
+        stream = FakeStream([delta("a"), delta("b"), delta("c")])
+        self.assertEqual(self.run_stream(stream, take=1), ["a"])
+        self.assertTrue(stream.closed)
+
+    def test_stream_closed_on_error_mid_stream(self):
+        stream = FakeStream([delta("a")], error=throttled())
+        with self.assertRaises(ClientError), self.assertLogs("src.async_bedrock_client", "ERROR"):
+            self.run_stream(stream)
+        self.assertTrue(stream.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+"""Tests for detecting the optional OCR dependencies."""
+import unittest
+from unittest import mock
+
+from src import ocr
+
+
+class IsAvailableTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(ocr, "_available", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_needs_pytesseract(self):
+        with mock.patch.object(ocr, "pytesseract", None), mock.patch.object(ocr, "PIL", mock.Mock()):
+            self.assertFalse(ocr.is_available())
+
+    def test_needs_pillow(self):
+        tesseract = mock.Mock()
+        with mock.patch.object(ocr, "pytesseract", tesseract), mock.patch.object(ocr, "PIL", None):
+            self.assertFalse(ocr.is_available())
+        tesseract.get_tesseract_version.assert_not_called()
+
+    def test_needs_tesseract_binary(self):
+        tesseract = mock.Mock()
+        tesseract.get_tesseract_version.side_effect = OSError("tesseract is not installed")
+        with mock.patch.object(ocr, "pytesseract", tesseract), mock.patch.object(ocr, "PIL", mock.Mock()):
+            self.assertFalse(ocr.is_available())
+
+    def test_available(self):
+        with mock.patch.object(ocr, "pytesseract", mock.Mock()), mock.patch.object(ocr, "PIL", mock.Mock()):
+            self.assertTrue(ocr.is_available())
+            # Checked once per process
+            self.assertTrue(ocr.is_available())
+
+
+if __name__ == "__main__":
+    unittest.main()
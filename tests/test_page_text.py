@@ -0,0 +1,100 @@
+"""Tests for the page-indexed text buffer."""
+import pickle
+import unittest
+
+from src.page_text import PAGE_SEPARATOR, PageText, is_serialized
+
+PAGES = [(1, "First page"), (2, ""), (3, "第三页的中文内容"), (5, "Fifth page, ünïcode")]
+
+
+def joined(pages):
+    return "".join(text + PAGE_SEPARATOR for _, text in pages if text)
+
+
+class PageTextTest(unittest.TestCase):
+
+    def setUp(self):
+        self.text = PageText.from_pages(PAGES)
+
+    def test_joined_text(self):
+        self.assertEqual(self.text.text, joined(PAGES))
+        self.assertEqual(str(self.text), joined(PAGES))
+        self.assertEqual(len(self.text), len(joined(PAGES)))
+        self.assertEqual(self.text.nbytes, len(joined(PAGES).encode("utf-8")))
+
+    def test_empty_pages_are_left_out(self):
+        self.assertEqual(list(self.text.page_numbers), [1, 3, 5])
+        self.assertEqual(self.text.num_pages, 3)
+        with self.assertRaises(KeyError):
+            self.text.page(2)
+
+    def test_page_access(self):
+        self.assertEqual(self.text.page(3), "第三页的中文内容")
+        self.assertEqual(bytes(self.text.page_view(5)), "Fifth page, ünïcode".encode("utf-8"))
+
+    def test_pages_view(self):
+        self.assertEqual(str(self.text.pages_view(2, 4), "utf-8"), "第三页的中文内容" + PAGE_SEPARATOR)
+        self.assertEqual(str(self.text.pages_view(1, 5), "utf-8"), joined(PAGES))
+        self.assertEqual(bytes(self.text.pages_view(6, 9)), b"")
+
+    def test_character_view(self):
+        full = joined(PAGES)
+        for start, end in ((0, 5), (10, 20), (14, len(full)), (len(full) - 3, None)):
+            self.assertEqual(str(self.text.view(start, end), "utf-8"), full[start:end])
+
+    def test_without_final_separator(self):
+        text = PageText.from_pages(PAGES, ends_with_separator=False)
+        self.assertEqual(text.text, joined(PAGES)[:-len(PAGE_SEPARATOR)])
+        self.assertEqual(text.page(5), "Fifth page, ünïcode")
+
+    def test_truncate(self):
+        full = joined(PAGES)
+        for max_chars in range(len(full) + 2):
+            with self.subTest(max_chars=max_chars):
+                truncated = self.text.truncate(max_chars)
+                self.assertLessEqual(len(truncated), max_chars)
+                self.assertEqual(len(truncated), len(truncated.text))
+                self.assertTrue(full.startswith(truncated.text))
+                # Only a cut inside a page's separator gives back less than the budget
+                self.assertGreaterEqual(len(truncated), max_chars - len(PAGE_SEPARATOR))
+        self.assertIs(self.text.truncate(len(full)), self.text)
+
+    def test_truncate_without_final_separator(self):
+        text = PageText.from_pages(PAGES, ends_with_separator=False)
+        full = text.text
+        for max_chars in range(len(full) + 1):
+            with self.subTest(max_chars=max_chars):
+                # The page texts hold no newlines, so only a partial separator is dropped
+                self.assertEqual(text.truncate(max_chars).text, full[:max_chars].rstrip("\n"))
+        # The cut lands in the last page, which has no separator to drop
+        self.assertEqual(len(text.truncate(len(full) - 1)), len(full) - 1)
+        self.assertEqual(text.truncate(len(full) - 1).page(5), "Fifth page, ünïcod")
+
+    def test_truncated_pages(self):
+        truncated = self.text.truncate(len("First page") + len(PAGE_SEPARATOR) + 3)
+        self.assertEqual(list(truncated.page_numbers), [1, 3])
+        self.assertEqual(truncated.page(3), "第三页")
+        self.assertFalse(truncated.ends_with_separator)
+
+    def test_serialization_round_trip(self):
+        for text in (self.text, self.text.truncate(15), PageText.from_pages([])):
+            data = text.to_bytes()
+            self.assertTrue(is_serialized(data))
+            restored = PageText.from_bytes(data)
+            self.assertEqual(restored.text, text.text)
+            self.assertEqual(list(restored.page_numbers), list(text.page_numbers))
+            self.assertEqual(restored.ends_with_separator, text.ends_with_separator)
+
+    def test_pickle(self):
+        restored = pickle.loads(pickle.dumps(self.text))
+        self.assertEqual(restored.text, self.text.text)
+        self.assertEqual(restored.page(3), self.text.page(3))
+
+    def test_from_bytes_rejects_other_data(self):
+        self.assertFalse(is_serialized(b"plain text"))
+        with self.assertRaises(ValueError):
+            PageText.from_bytes(b"plain text")
+
+
+if __name__ == "__main__":
+    unittest.main()
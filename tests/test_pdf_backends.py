@@ -0,0 +1,90 @@
+"""Tests for the extraction backend benchmark."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from src import pdf_backends
+from src.pdf_backends import PypdfBackend, benchmark_backends, pick_backend
+
+
+def write_text_pdf(path, lines):
+    """Write a PDF with one Helvetica text line per page."""
+    writer = PdfWriter()
+    for line in lines:
+        page = writer.add_blank_page(width=300, height=100)
+        font = DictionaryObject({
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject("/Helvetica"),
+        })
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): writer._add_object(font)}),
+        })
+        contents = DecodedStreamObject()
+        contents.set_data(f"BT /F1 12 Tf 20 50 Td ({line}) Tj ET".encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(contents)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+class BenchmarkBackendsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.pdf = os.path.join(cls.directory.name, "text.pdf")
+        write_text_pdf(cls.pdf, [f"Sample page {i}" for i in range(3)])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_pypdf_modes_get_fresh_readers(self):
+        shared = PdfReader(self.pdf)
+        opened = []
+        original = PypdfBackend.open
+
+        def record(backend, source, reader):
+            opened.append(reader)
+            return original(backend, source, reader)
+
+        with mock.patch.object(PypdfBackend, "open", record):
+            results = benchmark_backends(self.pdf, shared, [0, 1], ["pypdf", "pypdf-layout"], rounds=2)
+        self.assertEqual(len(opened), 4)
+        self.assertNotIn(shared, opened)
+        self.assertEqual(len({id(reader) for reader in opened}), 4)
+        self.assertEqual([result["error"] for result in results], [None, None])
+        self.assertTrue(all(result["chars"] > 0 for result in results))
+
+    def test_rounds_alternate_order_and_average(self):
+        calls = []
+
+        def fake_time(backend, source, reader, page_indices):
+            calls.append(backend.name)
+            # The first backend to run in a round is slowed down, as if warming shared state
+            seconds = 3.0 if len(calls) % 2 == 1 else 1.0
+            return seconds, 100, 0, None
+
+        with mock.patch.object(pdf_backends, "_time_backend", fake_time):
+            results = benchmark_backends(self.pdf, None, [0], ["pypdf", "pypdf-layout"], rounds=2)
+        self.assertEqual(calls, ["pypdf", "pypdf-layout", "pypdf-layout", "pypdf"])
+        self.assertEqual([result["seconds"] for result in results], [2.0, 2.0])
+
+    def test_failed_backend_is_not_retried_or_picked(self):
+        def fake_time(backend, source, reader, page_indices):
+            if backend.name == "pypdf-layout":
+                return 0.1, 0, 0, "broken"
+            return 1.0, 100, 0, None
+
+        with mock.patch.object(pdf_backends, "_time_backend", fake_time):
+            results = benchmark_backends(self.pdf, None, [0], ["pypdf", "pypdf-layout"], rounds=3)
+        self.assertEqual(pick_backend(results), "pypdf")
+        self.assertEqual(results[1]["error"], "broken")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""Tests for PDFProcessor page selection."""
+import os
+import tempfile
+import unittest
+
+from pypdf import PdfWriter
+
+from src.pdf_processor import PDFProcessor, _split_batches
+
+
+def write_pdf(directory, name, num_pages):
+    writer = PdfWriter()
+    for _ in range(num_pages):
+        writer.add_blank_page(width=200, height=200)
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+class EmptySelectionTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.pdf = write_pdf(cls.directory.name, "blank.pdf", 4)
+        cls.empty_pdf = write_pdf(cls.directory.name, "empty.pdf", 0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_split_batches_of_nothing(self):
+        self.assertEqual(_split_batches([], 4), [])
+        self.assertEqual(_split_batches([0, 1, 2], 2), [[0, 1], [2]])
+
+    def test_page_range_past_the_end(self):
+        for processor in (PDFProcessor(), PDFProcessor(page_timeout=5)):
+            with self.subTest(guarded=processor.guarded), self.assertLogs("src.pdf_processor", "INFO"):
+                self.assertEqual(processor.extract_text(self.pdf, page_range=(100, 200)), "")
+
+    def test_document_without_pages(self):
+        for processor in (PDFProcessor(), PDFProcessor(page_timeout=5)):
+            with self.subTest(guarded=processor.guarded), self.assertLogs("src.pdf_processor", "INFO"):
+                self.assertEqual(processor.extract_text(self.empty_pdf), "")
+
+    def test_in_memory_source_past_the_end(self):
+        with open(self.pdf, "rb") as f:
+            data = f.read()
+        with self.assertLogs("src.pdf_processor", "INFO"):
+            self.assertEqual(PDFProcessor(page_timeout=5).extract_text(data, page_range=(10, 20)), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
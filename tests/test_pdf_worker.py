@@ -0,0 +1,79 @@
+"""Tests for the sandboxed PDF worker service."""
+import logging
+import os
+import time
+import unittest
+
+from src.pdf_worker import PDFWorkerService, WorkerCrashedError, WorkerTimeoutError
+
+
+def add(a, b=0):
+    return a + b
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+def crash():
+    os._exit(3)
+
+
+def sleep(seconds):
+    time.sleep(seconds)
+
+
+def log_and_return(message):
+    logging.getLogger("src.pdf_processor").warning(message)
+    return os.getpid()
+
+
+class PDFWorkerServiceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.service = PDFWorkerService(num_workers=1, timeout=5, max_requests=3)
+        self.addCleanup(self.service.shutdown)
+
+    def test_result(self):
+        self.assertEqual(self.service.submit(add, 2, b=3).result(), 5)
+
+    def test_exception_is_raised_in_caller(self):
+        with self.assertRaisesRegex(ValueError, "broken page"):
+            self.service.submit(fail, "broken page").result()
+        # The worker survives an exception in the call
+        self.assertEqual(self.service.submit(add, 1).result(), 1)
+
+    def test_crash_fails_only_its_request(self):
+        with self.assertLogs("src.pdf_worker", "WARNING"):
+            with self.assertRaises(WorkerCrashedError):
+                self.service.submit(crash).result()
+        self.assertEqual(self.service.submit(add, 4).result(), 4)
+
+    def test_timeout_kills_worker(self):
+        service = PDFWorkerService(num_workers=1, timeout=0.5)
+        self.addCleanup(service.shutdown)
+        with self.assertLogs("src.pdf_worker", "WARNING"):
+            with self.assertRaises(WorkerTimeoutError):
+                service.submit(sleep, 30).result()
+        self.assertEqual(service.submit(add, 5).result(), 5)
+
+    def test_worker_logs_reach_parent_loggers(self):
+        with self.assertLogs("src.pdf_processor", "WARNING") as logs:
+            pid = self.service.submit(log_and_return, "Skipped page 3").result()
+        self.assertNotEqual(pid, os.getpid())
+        self.assertEqual([record.getMessage() for record in logs.records], ["Skipped page 3"])
+        self.assertEqual(logs.records[0].process, pid)
+
+    def test_worker_recycled_after_max_requests(self):
+        pids = [self.service.submit(log_and_return, "x").result() for _ in range(4)]
+        self.assertEqual(len(set(pids[:3])), 1)
+        self.assertNotEqual(pids[3], pids[0])
+
+    def test_submit_after_shutdown(self):
+        self.service.shutdown()
+        with self.assertRaises(RuntimeError):
+            self.service.submit(add, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+"""Tests for retry classification, backoff, budgets and metrics."""
+import asyncio
+import unittest
+from unittest import mock
+
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+from src.retry import RetryBudget, RetryMetrics, RetryPolicy, error_code, is_retryable
+
+
+def client_error(code, status=400):
+    return ClientError({"Error": {"Code": code, "Message": code},
+                        "ResponseMetadata": {"HTTPStatusCode": status}}, "Converse")
+
+
+def failing(errors, result="ok"):
+    """Return a function that raises the given errors in turn, then returns result."""
+    errors = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+    fn.calls = calls
+    return fn
+
+
+class ClassificationTest(unittest.TestCase):
+
+    def test_retryable_codes(self):
+        self.assertTrue(is_retryable(client_error("ThrottlingException", 429)))
+        # ConverseStream reports mid-stream errors in lower camel case
+        self.assertTrue(is_retryable(client_error("throttlingException")))
+        self.assertTrue(is_retryable(client_error("Unknown", 503)))
+        self.assertTrue(is_retryable(EndpointConnectionError(endpoint_url="https://bedrock")))
+        self.assertTrue(is_retryable(asyncio.TimeoutError()))
+
+    def test_fatal_errors(self):
+        self.assertFalse(is_retryable(client_error("ValidationException")))
+        self.assertFalse(is_retryable(client_error("AccessDeniedException", 403)))
+        self.assertFalse(is_retryable(ValueError("bad response")))
+
+    def test_error_code(self):
+        self.assertEqual(error_code(client_error("ThrottlingException")), "ThrottlingException")
+        self.assertEqual(error_code(ValueError()), "ValueError")
+
+
+class RetryBudgetTest(unittest.TestCase):
+
+    def test_spend(self):
+        budget = RetryBudget(2)
+        self.assertTrue(budget.try_spend())
+        self.assertTrue(budget.try_spend())
+        self.assertFalse(budget.try_spend())
+        self.assertEqual(budget.spent, 2)
+        self.assertEqual(budget.remaining, 0)
+
+    def test_for_calls_grows_with_calls(self):
+        self.assertGreater(RetryBudget.for_calls(100).retries, RetryBudget.for_calls(1).retries)
+
+
+class RetryPolicyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = RetryMetrics()
+        self.policy = RetryPolicy(max_attempts=4, base_delay=1, max_delay=5, metrics=self.metrics)
+        sleep = mock.patch("src.retry.time.sleep")
+        self.sleep = sleep.start()
+        self.addCleanup(sleep.stop)
+
+    def test_delay_is_bounded_full_jitter(self):
+        for attempt in range(1, 10):
+            ceiling = min(5, 2 ** (attempt - 1))
+            for _ in range(20):
+                self.assertTrue(0 <= self.policy.delay(attempt) <= ceiling)
+
+    def test_recovers_from_transient_errors(self):
+        fn = failing([client_error("ThrottlingException", 429)] * 2)
+        with self.assertLogs("src.retry", "WARNING"):
+            self.assertEqual(self.policy.call(fn), "ok")
+        self.assertEqual(len(fn.calls), 3)
+        self.assertEqual(self.sleep.call_count, 2)
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["call"], 3)
+        self.assertEqual(snapshot["retry"], 2)
+        self.assertEqual(snapshot["recovered"], 1)
+        self.assertEqual(snapshot["retries_by_code"], {"ThrottlingException": 2})
+
+    def test_fatal_error_is_not_retried(self):
+        fn = failing([client_error("ValidationException")])
+        with self.assertRaises(ClientError):
+            self.policy.call(fn)
+        self.assertEqual(len(fn.calls), 1)
+        self.assertEqual(self.metrics.snapshot()["fatal"], 1)
+
+    def test_gives_up_after_max_attempts(self):
+        fn = failing([client_error("ServiceUnavailableException", 503)] * 10)
+        with self.assertRaises(ClientError), self.assertLogs("src.retry", "ERROR"):
+            self.policy.call(fn)
+        self.assertEqual(len(fn.calls), 4)
+        self.assertEqual(self.metrics.snapshot()["exhausted"], 1)
+
+    def test_shared_budget_limits_retries_across_calls(self):
+        budget = RetryBudget(2)
+        fn = failing([client_error("ThrottlingException", 429)] * 10)
+        with self.assertRaises(ClientError), self.assertLogs("src.retry", "ERROR"):
+            self.policy.call(fn, budget)
+        self.assertEqual(len(fn.calls), 3)
+        other = failing([client_error("ThrottlingException", 429)])
+        with self.assertRaises(ClientError), self.assertLogs("src.retry", "ERROR"):
+            self.policy.call(other, budget)
+        self.assertEqual(len(other.calls), 1)
+        self.assertEqual(self.metrics.snapshot()["budget_exhausted"], 2)
+
+    def test_call_async(self):
+        fn = failing([client_error("ThrottlingException", 429)])
+
+        async def attempt():
+            return fn()
+
+        with mock.patch("src.retry.asyncio.sleep", mock.AsyncMock()) as sleep, \
+                self.assertLogs("src.retry", "WARNING"):
+            self.assertEqual(asyncio.run(self.policy.call_async(attempt)), "ok")
+        self.assertEqual(len(fn.calls), 2)
+        sleep.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
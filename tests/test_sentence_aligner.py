@@ -0,0 +1,67 @@
+"""Tests for Gale-Church sentence alignment and parallel chunk building."""
+import unittest
+
+from src.sentence_aligner import SentenceAligner, build_parallel_chunks, split_sentences
+from src.text_utils import estimate_tokens
+
+ZH = "".join(f"这是第{i}个句子，它的长度{'很' * (i % 7)}不一样。" for i in range(40))
+EN = " ".join(f"This is sentence {i}, and its length is {'very ' * (i % 7)}different." for i in range(40))
+
+
+class SplitSentencesTest(unittest.TestCase):
+
+    def test_chinese(self):
+        self.assertEqual(split_sentences("第一句。第二句！\n第三句", "zh"), ["第一句。", "第二句！", "第三句"])
+
+    def test_english(self):
+        self.assertEqual(split_sentences("One. Two?  Three\n\nFour", "en"), ["One.", "Two?", "Three", "Four"])
+
+
+class SentenceAlignerTest(unittest.TestCase):
+
+    def test_parallel_sentences_align_one_to_one(self):
+        with self.assertLogs("src.sentence_aligner", "INFO"):
+            pairs = SentenceAligner().align(ZH, EN)
+        self.assertEqual(len(pairs), 40)
+        for i, (zh, en) in enumerate(pairs):
+            self.assertIn(f"第{i}个", zh)
+            self.assertIn(f"sentence {i},", en)
+
+    def test_unmatched_sentences_are_kept(self):
+        zh = "只有中文的前言。" + ZH + "只有中文的结尾。"
+        en = EN + " An English-only closing remark that has no translation."
+        with self.assertLogs("src.sentence_aligner", "INFO"):
+            pairs = SentenceAligner().align(zh, en)
+        self.assertEqual("".join(zh for zh, _ in pairs), "".join(split_sentences(zh, "zh")))
+        self.assertEqual(" ".join(en for _, en in pairs), " ".join(split_sentences(en, "en")))
+        self.assertTrue(pairs[0][0].startswith("只有中文的前言。"))
+        self.assertTrue(all(zh and en for zh, en in pairs))
+
+    def test_narrow_band_matches_wide_band(self):
+        with self.assertLogs("src.sentence_aligner", "INFO"):
+            self.assertEqual(SentenceAligner(band_width=4).align(ZH, EN), SentenceAligner().align(ZH, EN))
+
+    def test_empty_side(self):
+        self.assertEqual(SentenceAligner().align("", EN), [])
+
+
+class BuildParallelChunksTest(unittest.TestCase):
+
+    def test_chunks_respect_budget_and_order(self):
+        pairs = [(f"中文句子{i}。", f"English sentence {i}.") for i in range(100)]
+        budget = 60
+        chunks = build_parallel_chunks(pairs, budget)
+        self.assertGreater(len(chunks), 1)
+        for zh, en in chunks:
+            tokens = sum(estimate_tokens(part) for part in zh.split("\n") + en.split("\n"))
+            self.assertLessEqual(tokens, budget)
+        self.assertEqual("\n".join(zh for zh, _ in chunks), "\n".join(zh for zh, _ in pairs))
+        self.assertEqual("\n".join(en for _, en in chunks), "\n".join(en for _, en in pairs))
+
+    def test_oversized_pair_gets_its_own_chunk(self):
+        pairs = [("短。", "Short."), ("长" * 500, "long " * 500), ("短。", "Short.")]
+        self.assertEqual(len(build_parallel_chunks(pairs, 50)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Tests for the incremental terminology XML parser."""
+import unittest
+
+from src.bedrock_client import TermStreamParser, parse_terminology
+
+RESPONSE = """Here are the terms:
+<terminology>
+  <term>
+    <name>A2B3C4</name>
+    <ZH_CN>数据库</ZH_CN>
+    <EN_US>database</EN_US>
+  </term>
+  <term>
+    <name>X7Y8Z9</name>
+    <zh_cn>云计算</zh_cn>
+    <en_us>cloud computing</en_us>
+  </term>
+</terminology>
+Trailing text <with <broken markup"""
+
+
+class TermStreamParserTest(unittest.TestCase):
+
+    def feed_all(self, pieces):
+        parser = TermStreamParser()
+        terms = []
+        for piece in pieces:
+            terms.extend(parser.feed(piece))
+        parser.close()
+        return parser, terms
+
+    def test_whole_response(self):
+        parser, terms = self.feed_all([RESPONSE])
+        self.assertTrue(parser.done)
+        self.assertEqual(terms, [
+            {"name": "A2B3C4", "ZH_CN": "数据库", "EN_US": "database"},
+            {"name": "X7Y8Z9", "ZH_CN": "云计算", "EN_US": "cloud computing"},
+        ])
+
+    def test_any_split_gives_the_same_terms(self):
+        _, expected = self.feed_all([RESPONSE])
+        for size in (1, 2, 3, 7, 13):
+            with self.subTest(size=size):
+                _, terms = self.feed_all([RESPONSE[i:i + size] for i in range(0, len(RESPONSE), size)])
+                self.assertEqual(terms, expected)
+
+    def test_matches_batch_parser(self):
+        _, terms = self.feed_all([RESPONSE])
+        self.assertEqual(terms, parse_terminology(RESPONSE))
+
+    def test_terms_returned_as_soon_as_closed(self):
+        parser = TermStreamParser()
+        end = RESPONSE.index("</term>") + len("</term>")
+        self.assertEqual(parser.feed(RESPONSE[:end - 1]), [])
+        self.assertEqual(len(parser.feed(RESPONSE[end - 1:end])), 1)
+        self.assertFalse(parser.done)
+
+    def test_truncated_response_keeps_complete_terms(self):
+        cut = RESPONSE.index("<term>", RESPONSE.index("</term>")) + 20
+        with self.assertLogs("src.bedrock_client", "WARNING"):
+            parser, terms = self.feed_all([RESPONSE[:cut]])
+        self.assertFalse(parser.done)
+        self.assertEqual([term["EN_US"] for term in terms], ["database"])
+
+    def test_input_after_end_is_ignored(self):
+        parser = TermStreamParser()
+        parser.feed(RESPONSE)
+        self.assertEqual(parser.feed("<term><name>x</name></term>"), [])
+        self.assertEqual(parser.count, 2)
+
+    def test_missing_xml_raises_on_close(self):
+        parser = TermStreamParser()
+        self.assertEqual(parser.feed("I could not find any terms."), [])
+        with self.assertRaises(ValueError), self.assertLogs("src.bedrock_client", "ERROR"):
+            parser.close()
+
+    def test_malformed_xml_raises(self):
+        parser = TermStreamParser()
+        with self.assertRaises(ValueError), self.assertLogs("src.bedrock_client", "ERROR"):
+            parser.feed("<terminology><term><name>a</nam></term></terminology>")
+
+
+if __name__ == "__main__":
+    unittest.main()
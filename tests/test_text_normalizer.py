@@ -0,0 +1,99 @@
+"""Tests for boilerplate removal and whitespace normalization."""
+import unittest
+
+from src.text_normalizer import TextNormalizer, normalize_whitespace
+
+
+def make_pages(count):
+    return [(i, f"ACME Corp Confidential\n{body(i)}\nPage {i} of {count}") for i in range(1, count + 1)]
+
+
+def body(i):
+    # Longer than MASK_DIGITS_MAX_LENGTH and different on every page, so never boilerplate
+    return f"Body text of page {i} describes {'several ' * (i % 4)}topics in some detail."
+
+
+class NormalizeWhitespaceTest(unittest.TestCase):
+
+    def test_joins_wrapped_cjk_lines(self):
+        self.assertEqual(normalize_whitespace("数据库管理\n系统 的 设计"), "数据库管理系统的设计")
+
+    def test_dehyphenates_english(self):
+        self.assertEqual(normalize_whitespace("data-\nbase  systems"), "database systems")
+
+    def test_keeps_real_hyphens(self):
+        self.assertEqual(normalize_whitespace("Wi-\nFi"), "Wi-\nFi")
+
+    def test_fullwidth_and_punctuation(self):
+        self.assertEqual(normalize_whitespace("ＡＢＣ１２３　版本,说明"), "ABC123 版本，说明")
+
+    def test_collapses_blank_lines(self):
+        self.assertEqual(normalize_whitespace("  one \n\n\n\n two  "), "one\n\ntwo")
+
+    def test_empty(self):
+        self.assertEqual(normalize_whitespace(""), "")
+
+
+class TextNormalizerTest(unittest.TestCase):
+
+    def test_removes_repeated_headers_and_page_numbers(self):
+        stats = {}
+        with self.assertLogs("src.text_normalizer", "INFO"):
+            pages = list(TextNormalizer().process_pages(make_pages(10), stats))
+        self.assertEqual([number for number, _ in pages], list(range(1, 11)))
+        for number, text in pages:
+            self.assertEqual(text, body(number))
+        self.assertEqual(stats["lines_removed"], 20)
+        self.assertGreater(stats["chars_saved"], 0)
+        self.assertGreater(stats["tokens_saved"], 0)
+
+    def test_numeric_body_rows_survive(self):
+        pages = []
+        for i in range(1, 11):
+            rows = [f"{i}. Tighten bolt {i} to {i * 5} Nm", f"{i}.2 kg  {100 + i} V",
+                    f"第{i}章的重量为{i}公斤，电压为{i}伏。", "Body text repeated nowhere else " + "x" * i]
+            pages.append((i, "\n".join(["ACME Manual"] + rows + [f"Page {i}"])))
+        stats = {}
+        with self.assertLogs("src.text_normalizer", "INFO"):
+            cleaned = list(TextNormalizer(normalize_whitespace=False).process_pages(pages, stats))
+        for (_, original), (_, text) in zip(pages, cleaned):
+            self.assertEqual(text.split("\n"), original.split("\n")[1:-1])
+        self.assertEqual(stats["lines_removed"], 20)
+
+    def test_exact_repeats_in_the_body_are_removed(self):
+        pages = [(i, "\n".join(["Header", "a", "b", f"Unique body line {i}", "DRAFT - DO NOT DISTRIBUTE",
+                                f"Another body line {i}", "c", "d", "Footer"]))
+                 for i in range(1, 6)]
+        with self.assertLogs("src.text_normalizer", "INFO"):
+            cleaned = list(TextNormalizer(normalize_whitespace=False).process_pages(pages))
+        self.assertNotIn("DRAFT", cleaned[0][1])
+        self.assertIn("Unique body line 1", cleaned[0][1])
+
+    def test_too_few_pages_keep_everything(self):
+        pages = list(TextNormalizer(normalize_whitespace=False).process_pages(make_pages(2)))
+        self.assertEqual(pages, make_pages(2))
+
+    def test_pages_after_the_sample_are_cleaned(self):
+        with self.assertLogs("src.text_normalizer", "INFO"):
+            pages = list(TextNormalizer(sample_pages=5).process_pages(make_pages(12)))
+        self.assertNotIn("Confidential", pages[-1][1])
+
+    def test_is_lazy_after_the_sample(self):
+        consumed = []
+
+        def source():
+            for page in make_pages(100):
+                consumed.append(page[0])
+                yield page
+
+        with self.assertLogs("src.text_normalizer", "INFO"):
+            pages = TextNormalizer(sample_pages=5).process_pages(source())
+            next(pages)
+        self.assertEqual(len(consumed), 5)
+
+    def test_cache_tag_reflects_settings(self):
+        self.assertNotEqual(TextNormalizer().cache_tag(), TextNormalizer(strip_boilerplate=False).cache_tag())
+
+
+if __name__ == "__main__":
+    unittest.main()